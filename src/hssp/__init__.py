@@ -2,3 +2,4 @@ __version__ = "0.4.18"
 
 from hssp.network import downloader
 from hssp.network.net import Net
+from hssp.network.sync_net import SyncNet
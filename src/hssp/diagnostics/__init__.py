@@ -0,0 +1,2 @@
+from hssp.diagnostics.loop import LoopMonitor, collapse_stack
+from hssp.diagnostics.memory import MemoryDiagnostics
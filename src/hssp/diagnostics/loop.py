@@ -0,0 +1,181 @@
+import asyncio
+import contextlib
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from pathlib import Path
+
+from hssp.logger.log import hssp_logger
+from hssp.models.diagnostics import LoopLagReportModel
+from hssp.settings.settings import settings
+
+
+def collapse_stack(frame) -> str:
+    """
+    把调用栈转为火焰图使用的折叠格式，从最外层到最内层用分号连接
+    Args:
+        frame: 最内层的帧
+
+    Returns:
+
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopMonitor:
+    """
+    事件循环监控：定时测量事件循环的延迟，卡顿时由后台线程抓取事件循环线程的调用栈
+    调用栈中可以直接看到卡住事件循环的同步信号接收者、解析或阻塞IO
+    开启采样后，卡顿期间持续采样调用栈，结束后写入折叠格式的文件，可以用 flamegraph.pl 或 speedscope 生成火焰图
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float | None = None,
+        profile_dir: str | Path | None = None,
+        sample_interval: float = 0.005,
+    ):
+        """
+        Args:
+            interval: 测量间隔，单位是秒
+            threshold: 延迟超过该秒数时视为卡顿，默认使用设置中的值
+            profile_dir: 卡顿时采样调用栈写入的目录，为空时不采样，只打印一次调用栈
+            sample_interval: 后台线程检查和采样的间隔，单位是秒
+        """
+        self.interval = interval
+        self.threshold = threshold if threshold is not None else settings.loop_lag_threshold
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.sample_interval = sample_interval
+        self.logger = hssp_logger.getChild("monitor")
+
+        self._beat = time.perf_counter()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+
+        self._samples = 0
+        self._lag_sum = 0.0
+        self._max_lag = 0.0
+        self._stalls = 0
+        self._stall_time = 0.0
+        self._profiles: list[str] = []
+
+    def start(self) -> "LoopMonitor":
+        """
+        在事件循环中启动监控
+        Returns:
+
+        """
+        if self._task is not None:
+            return self
+
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="hssp-loop-monitor", daemon=True)
+        self._watchdog.start()
+        return self
+
+    async def stop(self):
+        """
+        停止监控
+        Returns:
+
+        """
+        if self._task is None:
+            return
+
+        self._stop.set()
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        await asyncio.to_thread(self._watchdog.join)
+        self._task = None
+        self._watchdog = None
+
+    async def __aenter__(self) -> "LoopMonitor":
+        return self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def _measure(self):
+        while True:
+            start_time = time.perf_counter()
+            self._beat = start_time
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - start_time - self.interval, 0)
+            self._samples += 1
+            self._lag_sum += lag
+            self._max_lag = max(self._max_lag, lag)
+
+    def _loop_frame(self):
+        return sys._current_frames().get(self._loop_thread_id)
+
+    def _watch(self):
+        stall_start = None
+        stacks: Counter[str] = Counter()
+        while not self._stop.wait(self.sample_interval):
+            since_beat = time.perf_counter() - self._beat
+            if since_beat > self.interval + self.threshold:
+                frame = self._loop_frame()
+                if stall_start is None:
+                    stall_start = self._beat + self.interval
+                    self._stalls += 1
+                    if frame is not None:
+                        stack = "".join(traceback.format_stack(frame))
+                        self.logger.warning(f"事件循环卡顿超过 {self.threshold}s，当前调用栈:\n{stack}")
+                if self.profile_dir is not None and frame is not None:
+                    stacks[collapse_stack(frame)] += 1
+                continue
+
+            if stall_start is not None:
+                duration = self._beat - stall_start
+                self._stall_time += duration
+                self._max_lag = max(self._max_lag, duration)
+                self.logger.warning(f"事件循环卡顿结束，持续 {duration:.3f}s")
+                if stacks:
+                    self._write_profile(stacks)
+                stall_start = None
+                stacks = Counter()
+
+    def _write_profile(self, stacks: Counter):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"loop-stall-{time.strftime('%Y%m%d-%H%M%S')}-{self._stalls}.folded"
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.most_common()), encoding="utf-8")
+        self._profiles.append(str(path))
+        self.logger.info(f"卡顿期间的调用栈采样已写入 {path}")
+
+    @property
+    def lag(self) -> float:
+        """
+        当前距离上次测量的延迟，可以用于判断是否需要降低负载
+        Returns:
+
+        """
+        return max(time.perf_counter() - self._beat - self.interval, 0)
+
+    def report(self) -> LoopLagReportModel:
+        """
+        延迟统计
+        Returns:
+
+        """
+        return LoopLagReportModel(
+            samples=self._samples,
+            mean_lag=self._lag_sum / self._samples if self._samples else 0,
+            max_lag=self._max_lag,
+            stalls=self._stalls,
+            stall_time=self._stall_time,
+            profiles=list(self._profiles),
+        )
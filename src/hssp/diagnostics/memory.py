@@ -0,0 +1,154 @@
+import asyncio
+import gc
+import tracemalloc
+from collections import Counter
+
+from aiohttp import ClientSession
+from blinker import default_namespace
+from curl_cffi.requests import AsyncSession
+from httpx import AsyncClient
+
+from hssp.logger.log import hssp_logger
+from hssp.models.diagnostics import MemoryReportModel
+from hssp.network.downloader.base import DownloaderBase
+from hssp.network.net import Net
+from hssp.network.response import Response
+
+# 报告中忽略的分配位置，在对比结果上过滤，比过滤快照中的每条记录快得多
+IGNORED_FILES = frozenset(
+    {
+        tracemalloc.__file__,
+        "<frozen importlib._bootstrap>",
+        "<frozen importlib._bootstrap_external>",
+        "<unknown>",
+    }
+)
+
+
+class MemoryDiagnostics:
+    """
+    内存诊断：每完成N个请求，对比两次tracemalloc快照，打印增长最多的分配位置和存活的Response、Net、下载器、客户端数量
+    开启tracemalloc会明显降低速度，只在排查内存增长时使用
+    """
+
+    def __init__(self, every: int = 1000, top: int = 10, frames: int = 1, key_type: str = "lineno"):
+        """
+        Args:
+            every: 每完成多少个请求报告一次
+            top: 报告增长最多的分配位置数量
+            frames: tracemalloc记录的调用栈深度，越深越慢
+            key_type: 快照对比的分组方式，lineno、filename或traceback
+        """
+        self.every = every
+        self.top = top
+        self.frames = frames
+        self.key_type = key_type
+        self.logger = hssp_logger.getChild("memory")
+
+        self.requests = 0
+        self.reports: list[MemoryReportModel] = []
+        self._started_tracing = False
+        self._previous: tracemalloc.Snapshot | None = None
+        self._check_task: asyncio.Task | None = None
+        self._types: tuple[type, ...] = (Response, Net, DownloaderBase, ClientSession, AsyncClient, AsyncSession)
+
+    def start(self) -> "MemoryDiagnostics":
+        """
+        开始跟踪内存分配，记录基准快照
+        Returns:
+
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._previous = self._snapshot()
+        return self
+
+    def stop(self):
+        """
+        停止跟踪，只停止由自己开启的跟踪
+        Returns:
+
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._previous = None
+
+    def attach(self, net: Net) -> "MemoryDiagnostics":
+        """
+        挂载到Net的响应后信号，按请求数定期报告
+        Args:
+            net: 网络请求对象
+
+        Returns:
+
+        """
+        if self._previous is None:
+            self.start()
+        net.response_after_signal.connect(self._on_response)
+        return self
+
+    def detach(self, net: Net):
+        net.response_after_signal.disconnect(self._on_response)
+
+    def _on_response(self, response: Response):
+        self.requests += 1
+        if self.requests % self.every or (self._check_task is not None and not self._check_task.done()):
+            return
+        # 快照对比和对象统计比较慢，放到线程中执行，不阻塞事件循环
+        self._check_task = asyncio.ensure_future(asyncio.to_thread(self.check))
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot()
+
+    def object_counts(self) -> dict[str, int]:
+        """
+        统计存活的Response、Net、下载器和客户端数量
+        Returns:
+
+        """
+        # 先回收循环引用，只统计真正存活的对象
+        gc.collect()
+        counts = Counter()
+        for obj in gc.get_objects():
+            if isinstance(obj, self._types):
+                counts[type(obj).__name__] += 1
+        return dict(counts)
+
+    def check(self) -> MemoryReportModel:
+        """
+        和上次的快照对比，生成报告并打印
+        Returns:
+
+        """
+        if self._previous is None:
+            self.start()
+
+        snapshot = self._snapshot()
+        stats = [
+            stat
+            for stat in snapshot.compare_to(self._previous, self.key_type)
+            if stat.traceback[0].filename not in IGNORED_FILES
+        ]
+        self._previous = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        report = MemoryReportModel(
+            requests=self.requests,
+            current=current,
+            peak=peak,
+            growth=sum(stat.size_diff for stat in stats),
+            objects=self.object_counts(),
+            signals=len(default_namespace),
+            top=[str(stat) for stat in stats[: self.top] if stat.size_diff > 0],
+        )
+        self.reports.append(report)
+
+        top = "\n".join(report.top)
+        self.logger.info(
+            f"内存诊断 请求数: {report.requests} 当前: {current / 1024 / 1024:.2f}MB "
+            f"峰值: {peak / 1024 / 1024:.2f}MB 增长: {report.growth / 1024:.1f}KB "
+            f"存活对象: {report.objects} 命名信号: {report.signals}\n{top}"
+        )
+        return report
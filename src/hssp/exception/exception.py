@@ -15,3 +15,34 @@ class RequestStateException(Exception):
 
     def __init__(self, code):
         self.code = code
+
+
+class ResponseTooLargeException(Exception):
+    """
+    响应体超过大小限制
+    """
+
+    def __init__(self, size: int, limit: int):
+        self.size = size
+        self.limit = limit
+
+
+class SegmentDownloadException(Exception):
+    """
+    分段下载失败
+    """
+
+    def __init__(self, index: int, reason: str):
+        self.index = index
+        self.reason = reason
+        super().__init__(f"分段 {index} 下载失败: {reason}")
+
+
+class RobotsDisallowException(Exception):
+    """
+    robots.txt不允许抓取
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        super().__init__(f"robots.txt 不允许抓取 {url}")
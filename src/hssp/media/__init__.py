@@ -0,0 +1,2 @@
+from hssp.media.file import RangeDownloader
+from hssp.media.hls import HlsDownloader, parse_m3u8
@@ -0,0 +1,277 @@
+import asyncio
+import itertools
+import os
+from pathlib import Path
+
+from hssp.exception.exception import SegmentDownloadException
+from hssp.logger.log import hssp_logger
+from hssp.models.media import RangeControlModel, RemoteFileModel
+from hssp.network.net import Net
+from hssp.network.response import Response
+from hssp.utils.crypto import hash_stream
+
+
+def _get_header(headers, name: str) -> str | None:
+    name = name.lower()
+    return next((value for key, value in headers.items() if key.lower() == name), None)
+
+
+def _parse_content_range(value: str | None) -> int | None:
+    # bytes 0-0/12345
+    if not value or "/" not in value:
+        return None
+    total = value.rsplit("/", 1)[1].strip()
+    return int(total) if total.isdigit() else None
+
+
+class RangeDownloader:
+    """
+    分段下载器：服务端支持Range时把文件分成多段，通过多个连接或代理并发下载
+    失败时只重试失败的分段，进度保存在控制文件中，中断后可以继续下载，分段和整个文件都可以校验哈希
+    """
+
+    def __init__(
+        self,
+        net: Net,
+        segment_size: int = 8 * 1024 * 1024,
+        concurrency: int = 4,
+        proxies: list[str] | None = None,
+        segment_retries: int = 5,
+        algorithm: str = "md5",
+    ):
+        """
+        Args:
+            net: 用于请求的Net
+            segment_size: 每段的大小
+            concurrency: 同时下载的分段数
+            proxies: 代理列表，分段按顺序轮流使用，重试时换下一个代理
+            segment_retries: 每个分段的重试次数
+            algorithm: 分段和文件校验使用的哈希算法
+        """
+        self.net = net
+        self.segment_size = segment_size
+        self.concurrency = concurrency
+        self.proxies = proxies or []
+        self.segment_retries = segment_retries
+        self.algorithm = algorithm
+        self.logger = hssp_logger.getChild("range")
+        self._proxy_cycle = itertools.cycle(self.proxies) if self.proxies else None
+
+    def _next_proxy(self) -> str | None:
+        return next(self._proxy_cycle) if self._proxy_cycle else None
+
+    async def probe(self, url: str) -> RemoteFileModel:
+        """
+        获取文件大小和是否支持分段下载，HEAD拿不到时用 Range: bytes=0-0 的GET请求确认
+        Args:
+            url: 文件地址
+
+        Returns:
+            返回文件信息
+        """
+        resp = await self.net.head(url, raise_status=False)
+        info = RemoteFileModel(url=resp.url)
+        if resp.status_code < 400:
+            content_length = _get_header(resp.headers, "Content-Length")
+            info.size = int(content_length) if content_length and content_length.isdigit() else None
+            info.accept_ranges = (_get_header(resp.headers, "Accept-Ranges") or "").lower() == "bytes"
+            info.etag = _get_header(resp.headers, "ETag")
+            info.last_modified = _get_header(resp.headers, "Last-Modified")
+
+        if info.size is None or not info.accept_ranges:
+            resp = await self.net.get(url, headers={"Range": "bytes=0-0"}, raise_status=False)
+            if resp.status_code == 206:
+                info.url = resp.url
+                info.size = _parse_content_range(_get_header(resp.headers, "Content-Range")) or info.size
+                info.accept_ranges = info.size is not None
+                info.etag = info.etag or _get_header(resp.headers, "ETag")
+                info.last_modified = info.last_modified or _get_header(resp.headers, "Last-Modified")
+
+        return info
+
+    @staticmethod
+    def _control_path(output: Path) -> Path:
+        return output.with_name(f"{output.name}.hssp")
+
+    @staticmethod
+    def _part_path(output: Path) -> Path:
+        return output.with_name(f"{output.name}.part")
+
+    @staticmethod
+    def _save_control(path: Path, control: RangeControlModel):
+        # 先写临时文件再改名，中断时不会留下损坏的控制文件
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(control.model_dump_json(), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def _load_control(self, output: Path, info: RemoteFileModel) -> RangeControlModel:
+        """
+        读取控制文件，文件变化或分段大小变化时重新开始
+        """
+        control_path = self._control_path(output)
+        part_path = self._part_path(output)
+        if control_path.exists() and part_path.exists():
+            try:
+                control = RangeControlModel.model_validate_json(control_path.read_text(encoding="utf-8"))
+            except ValueError:
+                control = None
+            if (
+                control is not None
+                and control.size == info.size
+                and control.etag == info.etag
+                and control.last_modified == info.last_modified
+                and control.segment_size == self.segment_size
+                and control.algorithm == self.algorithm
+            ):
+                self._verify_done(part_path, control)
+                return control
+
+        control = RangeControlModel(
+            url=info.url,
+            size=info.size,
+            etag=info.etag,
+            last_modified=info.last_modified,
+            segment_size=self.segment_size,
+            algorithm=self.algorithm,
+        )
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(part_path, "wb") as file:
+            file.truncate(info.size)
+        self._save_control(control_path, control)
+        return control
+
+    def _segment_range(self, control: RangeControlModel, index: int) -> tuple[int, int]:
+        start = index * control.segment_size
+        return start, min(start + control.segment_size, control.size) - 1
+
+    def _verify_done(self, part_path: Path, control: RangeControlModel):
+        """
+        续传前校验已完成的分段，哈希不一致的重新下载
+        """
+        with open(part_path, "rb") as file:
+            for index, expected in list(control.done.items()):
+                start, end = self._segment_range(control, index)
+                file.seek(start)
+                if hash_stream(file.read(end - start + 1), self.algorithm) != expected:
+                    self.logger.warning(f"分段 {index} 校验失败，重新下载")
+                    control.done.pop(index)
+
+    @staticmethod
+    def _write_segment(part_path: Path, start: int, content: bytes):
+        with open(part_path, "r+b") as file:
+            file.seek(start)
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+
+    async def _fetch_segment(self, url: str, index: int, start: int, end: int, proxy: str | None) -> bytes:
+        resp: Response = await self.net.get(
+            url,
+            headers={"Range": f"bytes={start}-{end}"},
+            proxy=proxy,
+            retrys_count=0,
+            raise_status=False,
+        )
+        if resp.status_code != 206:
+            raise SegmentDownloadException(index, f"响应状态: {resp.status_code}")
+
+        content = bytes(resp.content)
+        if len(content) != end - start + 1:
+            raise SegmentDownloadException(index, f"长度不一致: {len(content)} != {end - start + 1}")
+        return content
+
+    async def download_segment(self, control: RangeControlModel, index: int, part_path: Path) -> str:
+        """
+        下载单个分段，失败时换代理重试，写入后返回分段的哈希
+        Args:
+            control: 控制信息
+            index: 分段序号
+            part_path: 临时文件
+
+        Returns:
+            返回分段的哈希
+        """
+        start, end = self._segment_range(control, index)
+        for attempt in range(1, self.segment_retries + 1):
+            proxy = self._next_proxy()
+            try:
+                content = await self._fetch_segment(control.url, index, start, end, proxy)
+            except Exception as exception:
+                self.logger.warning(f"分段 {index} 第{attempt}次下载失败 代理: {proxy} 异常: {exception}")
+                if attempt < self.segment_retries:
+                    continue
+                if isinstance(exception, SegmentDownloadException):
+                    raise
+                raise SegmentDownloadException(index, str(exception)) from exception
+
+            digest = await asyncio.to_thread(hash_stream, content, self.algorithm)
+            await asyncio.to_thread(self._write_segment, part_path, start, content)
+            return digest
+
+        raise SegmentDownloadException(index, "没有重试机会")
+
+    async def _download_whole(self, url: str, output: Path) -> Path:
+        self.logger.warning(f"{url} 不支持分段下载，使用单个请求下载")
+        resp = await self.net.get(url)
+        part_path = self._part_path(output)
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(part_path.write_bytes, bytes(resp.content))
+        part_path.replace(output)
+        return output
+
+    async def download(self, url: str, output: str | Path, expected_hash: str | None = None) -> Path:
+        """
+        下载文件，已下载的分段保存在 .part 文件和 .hssp 控制文件中，再次下载时跳过
+        Args:
+            url: 文件地址
+            output: 输出文件
+            expected_hash: 整个文件的哈希，设置时下载完成后校验
+
+        Returns:
+            返回输出文件
+        """
+        output = Path(output)
+        info = await self.probe(url)
+        if not info.accept_ranges or not info.size:
+            await self._download_whole(info.url, output)
+        else:
+            await self._download_segments(info, output)
+
+        if expected_hash:
+            with open(output, "rb") as file:
+                digest = await asyncio.to_thread(hash_stream, file, self.algorithm)
+            if digest.lower() != expected_hash.lower():
+                raise ValueError(f"{output} 哈希校验失败: {digest} != {expected_hash}")
+
+        self.logger.info(f"{url} 下载完成: {output}")
+        return output
+
+    async def _download_segments(self, info: RemoteFileModel, output: Path):
+        control = await asyncio.to_thread(self._load_control, output, info)
+        control_path = self._control_path(output)
+        part_path = self._part_path(output)
+
+        segments_count = (control.size + control.segment_size - 1) // control.segment_size
+        pending = [index for index in range(segments_count) if index not in control.done]
+        self.logger.info(
+            f"{info.url} 大小: {control.size} 共 {segments_count} 段，已完成 {segments_count - len(pending)} 段"
+        )
+
+        sem = asyncio.Semaphore(self.concurrency)
+        control_lock = asyncio.Lock()
+
+        async def _download(_index: int):
+            async with sem:
+                digest = await self.download_segment(control, _index, part_path)
+            async with control_lock:
+                control.done[_index] = digest
+                await asyncio.to_thread(self._save_control, control_path, control)
+
+        results = await asyncio.gather(*[_download(index) for index in pending], return_exceptions=True)
+        failed = [result for result in results if isinstance(result, BaseException)]
+        if failed:
+            # 已完成的分段保存在控制文件中，再次下载时只下载失败的分段
+            raise failed[0]
+
+        part_path.replace(output)
+        control_path.unlink(missing_ok=True)
@@ -0,0 +1,279 @@
+import asyncio
+import re
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+from urllib.parse import urljoin
+
+from hssp.logger.log import hssp_logger
+from hssp.models.media import HlsKeyModel, HlsPlaylistModel, HlsSegmentModel, HlsVariantModel
+from hssp.network.net import Net
+from hssp.settings.settings import settings
+from hssp.utils.crypto import decrypt_aes_cbc_async_stream
+
+# 标签属性，如 BANDWIDTH=1280000,RESOLUTION=1280x720,CODECS="avc1,mp4a"
+_ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def _parse_attributes(value: str) -> dict[str, str]:
+    return {key: val.strip('"') for key, val in _ATTRIBUTE_RE.findall(value)}
+
+
+def _parse_byterange(value: str, offset: int) -> tuple[int, int]:
+    length, _, start = value.partition("@")
+    return int(length), int(start) if start else offset
+
+
+def parse_m3u8(text: str, url: str) -> HlsPlaylistModel:
+    """
+    解析m3u8播放列表，支持主播放列表和媒体播放列表
+    Args:
+        text: 播放列表内容
+        url: 播放列表地址，用于补全相对地址
+
+    Returns:
+        返回播放列表
+    """
+    playlist = HlsPlaylistModel(url=url)
+    key: HlsKeyModel | None = None
+    duration = 0.0
+    byterange = None
+    next_offset = 0
+    variant_attributes = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith("#"):
+            tag, _, value = line.partition(":")
+            match tag:
+                case "#EXT-X-STREAM-INF":
+                    variant_attributes = _parse_attributes(value)
+                case "#EXT-X-TARGETDURATION":
+                    playlist.target_duration = float(value)
+                case "#EXT-X-MEDIA-SEQUENCE":
+                    playlist.media_sequence = int(value)
+                case "#EXTINF":
+                    duration = float(value.split(",")[0])
+                case "#EXT-X-BYTERANGE":
+                    byterange = _parse_byterange(value, next_offset)
+                case "#EXT-X-KEY":
+                    attributes = _parse_attributes(value)
+                    method = attributes.get("METHOD", "NONE")
+                    if method == "NONE":
+                        key = None
+                    elif method == "AES-128":
+                        iv = attributes.get("IV")
+                        key = HlsKeyModel(
+                            method=method,
+                            uri=urljoin(url, attributes["URI"]),
+                            iv=bytes.fromhex(iv[2:] if iv.lower().startswith("0x") else iv) if iv else None,
+                        )
+                    else:
+                        raise ValueError(f"不支持的加密方式: {method}")
+                case "#EXT-X-MAP":
+                    attributes = _parse_attributes(value)
+                    map_range = attributes.get("BYTERANGE")
+                    playlist.init_segment = HlsSegmentModel(
+                        index=-1,
+                        url=urljoin(url, attributes["URI"]),
+                        key=key,
+                        byterange=_parse_byterange(map_range, 0) if map_range else None,
+                    )
+            continue
+
+        segment_url = urljoin(url, line)
+        if variant_attributes is not None:
+            playlist.variants.append(
+                HlsVariantModel(
+                    url=segment_url,
+                    bandwidth=int(variant_attributes.get("BANDWIDTH", 0)),
+                    resolution=variant_attributes.get("RESOLUTION"),
+                    codecs=variant_attributes.get("CODECS"),
+                )
+            )
+            variant_attributes = None
+            continue
+
+        index = len(playlist.segments)
+        playlist.segments.append(
+            HlsSegmentModel(
+                index=index,
+                url=segment_url,
+                duration=duration,
+                sequence=playlist.media_sequence + index,
+                key=key,
+                byterange=byterange,
+            )
+        )
+        if byterange:
+            next_offset = byterange[1] + byterange[0]
+        duration = 0.0
+        byterange = None
+
+    return playlist
+
+
+class HlsDownloader:
+    """
+    HLS视频下载器：选择码率、并发下载分片、缓存密钥、流式解密，分片按顺序合并，支持断点续传
+    """
+
+    def __init__(self, net: Net, concurrency: int = 8, chunk_size: int = 64 * 1024):
+        """
+        Args:
+            net: 用于请求的Net
+            concurrency: 同时下载的分片数
+            chunk_size: 下载、解密和写入时每块的大小
+        """
+        self.net = net
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.logger = hssp_logger.getChild("hls")
+        self._keys: dict[str, asyncio.Task] = {}
+
+    async def fetch_playlist(
+        self, url: str, variant: str | Callable[[list[HlsVariantModel]], HlsVariantModel] = "best"
+    ) -> HlsPlaylistModel:
+        """
+        获取媒体播放列表，是主播放列表时按码率选择后再获取
+        Args:
+            url: 播放列表地址
+            variant: 码率选择，best为最高码率，worst为最低码率，也可以传入选择函数
+
+        Returns:
+            返回媒体播放列表
+        """
+        resp = await self.net.get(url)
+        playlist = parse_m3u8(resp.text, resp.url)
+        if not playlist.is_master:
+            return playlist
+
+        variants = sorted(playlist.variants, key=lambda item: item.bandwidth)
+        if callable(variant):
+            selected = variant(variants)
+        elif variant == "worst":
+            selected = variants[0]
+        else:
+            selected = variants[-1]
+
+        self.logger.info(f"选择码率: {selected.bandwidth} 分辨率: {selected.resolution} {selected.url}")
+        return await self.fetch_playlist(selected.url, variant)
+
+    async def _fetch_key(self, uri: str) -> bytes:
+        resp = await self.net.get(uri)
+        return bytes(resp.content)
+
+    async def get_key(self, uri: str) -> bytes:
+        """
+        获取密钥，同一个地址只请求一次
+        Args:
+            uri: 密钥地址
+
+        Returns:
+
+        """
+        task = self._keys.get(uri)
+        # 上次请求失败或被取消时重新请求
+        if task is None or (task.done() and (task.cancelled() or task.exception())):
+            task = asyncio.ensure_future(self._fetch_key(uri))
+            self._keys[uri] = task
+        return await asyncio.shield(task)
+
+    async def _write_segment(self, path: Path, url: str, headers: dict | None, key: bytes | None, iv: bytes | None):
+        """
+        边下载边解密写入分片，先写临时文件再改名，中断时不会留下不完整的分片
+        """
+        chunks = self.net.stream(url, headers=headers, chunk_size=self.chunk_size)
+        if key is not None:
+            chunks = decrypt_aes_cbc_async_stream(chunks, key, iv)
+
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as file:
+            async for chunk in chunks:
+                file.write(chunk)
+        tmp_path.replace(path)
+
+    async def download_segment(self, segment: HlsSegmentModel, path: Path):
+        """
+        下载单个分片，流式下载和解密，分片不会完整读入内存；流式下载不经过Net的重试，在这里按设置重试
+        Args:
+            segment: 分片
+            path: 保存路径
+
+        Returns:
+
+        """
+        headers = None
+        if segment.byterange:
+            length, start = segment.byterange
+            headers = {"Range": f"bytes={start}-{start + length - 1}"}
+
+        key = iv = None
+        if segment.key:
+            key = await self.get_key(segment.key.uri)
+            iv = segment.key.iv or segment.sequence.to_bytes(16, "big")
+
+        for attempt in range(settings.retrys_count + 1):
+            try:
+                await self._write_segment(path, segment.url, headers, key, iv)
+                return
+            except Exception as exception:
+                if attempt >= settings.retrys_count:
+                    raise
+                self.logger.warning(f"下载分片 {segment.url} 失败，第 {attempt + 1} 次重试: {exception}")
+                await asyncio.sleep(settings.retrys_delay)
+
+    async def download(
+        self,
+        url: str,
+        output: str | Path,
+        variant: str | Callable[[list[HlsVariantModel]], HlsVariantModel] = "best",
+        keep_parts: bool = False,
+    ) -> Path:
+        """
+        下载HLS视频并合并为一个文件，已下载的分片会保留在分片目录中，再次下载时跳过
+        Args:
+            url: 播放列表地址
+            output: 输出文件
+            variant: 码率选择，best为最高码率，worst为最低码率，也可以传入选择函数
+            keep_parts: 合并后是否保留分片目录
+
+        Returns:
+            返回输出文件
+        """
+        output = Path(output)
+        parts_dir = output.with_name(f"{output.name}.parts")
+        parts_dir.mkdir(parents=True, exist_ok=True)
+
+        playlist = await self.fetch_playlist(url, variant)
+        segments = ([playlist.init_segment] if playlist.init_segment else []) + playlist.segments
+        paths = [parts_dir / f"{segment.index + 1:06d}.part" for segment in segments]
+
+        pending = [(segment, path) for segment, path in zip(segments, paths, strict=True) if not path.exists()]
+        self.logger.info(f"{url} 共 {len(segments)} 个分片，已下载 {len(segments) - len(pending)} 个")
+
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _download(_segment: HlsSegmentModel, _path: Path):
+            async with sem:
+                await self.download_segment(_segment, _path)
+
+        await asyncio.gather(*[_download(segment, path) for segment, path in pending])
+        await asyncio.to_thread(self._merge, paths, output)
+        if not keep_parts:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+        self.logger.info(f"{url} 下载完成: {output}")
+        return output
+
+    @staticmethod
+    def _merge(paths: list[Path], output: Path):
+        tmp_output = output.with_name(f"{output.name}.tmp")
+        with open(tmp_output, "wb") as file:
+            for path in paths:
+                with open(path, "rb") as part:
+                    shutil.copyfileobj(part, file)
+        tmp_output.replace(output)
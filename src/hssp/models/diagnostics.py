@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+
+
+class LoopLagReportModel(BaseModel):
+    """
+    事件循环延迟报告
+    """
+
+    samples: int = Field(title="采样次数", default=0)
+    mean_lag: float = Field(title="平均延迟，单位是秒", default=0)
+    max_lag: float = Field(title="最大延迟，单位是秒", default=0)
+    stalls: int = Field(title="卡顿次数", default=0)
+    stall_time: float = Field(title="卡顿总时长，单位是秒", default=0)
+    profiles: list[str] = Field(title="卡顿时采样的调用栈文件", default_factory=list)
+
+
+class MemoryReportModel(BaseModel):
+    """
+    内存诊断报告
+    """
+
+    requests: int = Field(title="已完成的请求数", default=0)
+    current: int = Field(title="tracemalloc跟踪的当前内存，单位是字节", default=0)
+    peak: int = Field(title="tracemalloc跟踪的峰值内存，单位是字节", default=0)
+    growth: int = Field(title="距离上次报告增长的内存，单位是字节", default=0)
+    objects: dict[str, int] = Field(title="存活的对象数量", default_factory=dict)
+    signals: int = Field(title="blinker全局命名信号的数量", default=0)
+    top: list[str] = Field(title="增长最多的分配位置", default_factory=list)
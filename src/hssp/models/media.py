@@ -0,0 +1,78 @@
+from pydantic import BaseModel, Field
+
+
+class HlsKeyModel(BaseModel):
+    """
+    HLS分片的加密信息
+    """
+
+    method: str = Field(title="加密方式，NONE或AES-128")
+    uri: str | None = Field(title="密钥地址", default=None)
+    iv: bytes | None = Field(title="初始向量，为空时使用分片序号", default=None)
+
+
+class HlsSegmentModel(BaseModel):
+    """
+    HLS分片
+    """
+
+    index: int = Field(title="分片在播放列表中的位置")
+    url: str = Field(title="分片地址")
+    duration: float = Field(title="分片时长，单位是秒", default=0)
+    sequence: int = Field(title="分片序号，用于计算默认的初始向量", default=0)
+    key: HlsKeyModel | None = Field(title="加密信息", default=None)
+    byterange: tuple[int, int] | None = Field(title="字节范围：(长度, 起始位置)", default=None)
+
+
+class HlsVariantModel(BaseModel):
+    """
+    主播放列表中的码率
+    """
+
+    url: str = Field(title="播放列表地址")
+    bandwidth: int = Field(title="码率", default=0)
+    resolution: str | None = Field(title="分辨率", default=None)
+    codecs: str | None = Field(title="编码", default=None)
+
+
+class HlsPlaylistModel(BaseModel):
+    """
+    HLS播放列表
+    """
+
+    url: str = Field(title="播放列表地址")
+    variants: list[HlsVariantModel] = Field(title="码率列表，主播放列表才有", default_factory=list)
+    segments: list[HlsSegmentModel] = Field(title="分片列表", default_factory=list)
+    init_segment: HlsSegmentModel | None = Field(title="初始化分片，EXT-X-MAP", default=None)
+    target_duration: float = Field(title="分片最大时长", default=0)
+    media_sequence: int = Field(title="第一个分片的序号", default=0)
+
+    @property
+    def is_master(self) -> bool:
+        return bool(self.variants)
+
+
+class RemoteFileModel(BaseModel):
+    """
+    远程文件的信息
+    """
+
+    url: str = Field(title="文件地址，跳转后的最终地址")
+    size: int | None = Field(title="文件大小", default=None)
+    accept_ranges: bool = Field(title="是否支持分段下载", default=False)
+    etag: str | None = Field(title="ETag", default=None)
+    last_modified: str | None = Field(title="Last-Modified", default=None)
+
+
+class RangeControlModel(BaseModel):
+    """
+    分段下载的控制文件，用于断点续传
+    """
+
+    url: str = Field(title="文件地址")
+    size: int = Field(title="文件大小")
+    etag: str | None = Field(title="ETag，变化时重新下载", default=None)
+    last_modified: str | None = Field(title="Last-Modified，变化时重新下载", default=None)
+    segment_size: int = Field(title="每段的大小")
+    algorithm: str = Field(title="分段哈希的算法", default="md5")
+    done: dict[int, str] = Field(title="已完成的分段：序号 -> 哈希", default_factory=dict)
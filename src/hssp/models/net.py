@@ -14,6 +14,9 @@ class DownloaderEnum(Enum):
     REQUESTS = "requests"
     CURL_CFFI = "curl_cffi"
     REQUESTS_GO = "requests_go"
+    DRISSIONPAGE = "drissionpage"
+    REPLAY = "replay"
+    ROUTER = "router"
 
 
 class RequestModel(BaseModel):
@@ -35,3 +38,30 @@ class RequestModel(BaseModel):
     proxy: str | None = Field(title="代理设置", default=None)
     retrys_count: int | None = Field(title="重试次数", default=None)
     retrys_delay: float | None = Field(title="重试延时", default=None)
+
+
+class WarmupReportModel(BaseModel):
+    """
+    连接预热报告
+    """
+
+    host: str = Field(title="预热的主机")
+    connections: int = Field(title="预热成功的连接数", default=0)
+    failed: int = Field(title="预热失败的连接数", default=0)
+    cold_time: float = Field(title="新建连接请求的平均耗时，单位是秒", default=0)
+    warm_time: float | None = Field(title="复用连接请求的耗时，单位是秒", default=None)
+    saved_time: float = Field(title="预计节省的握手时间，单位是秒", default=0)
+
+
+class RouteStatsModel(BaseModel):
+    """
+    路由下载器中某个主机使用某个下载器的统计
+    """
+
+    host: str = Field(title="主机")
+    downloader: str = Field(title="下载器")
+    attempts: int = Field(title="请求数", default=0)
+    successes: int = Field(title="成功数", default=0)
+    failures: int = Field(title="失败数", default=0)
+    success_rate: float = Field(title="成功率", default=0)
+    latency: float | None = Field(title="成功请求的平均耗时，单位是秒", default=None)
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+
+
+class UrlStateModel(BaseModel):
+    """
+    增量抓取中每个url的状态
+    """
+
+    url: str = Field(title="地址")
+    etag: str | None = Field(title="上次响应的ETag", default=None)
+    last_modified: str | None = Field(title="上次响应的Last-Modified", default=None)
+    content_hash: str | None = Field(title="上次响应体的哈希", default=None)
+    interval: float = Field(title="重新访问的间隔，单位是秒", default=3600)
+    next_visit: float = Field(title="下次访问的时间戳", default=0)
+    last_visit: float | None = Field(title="上次访问的时间戳", default=None)
+    last_changed: float | None = Field(title="上次内容变化的时间戳", default=None)
+    visits: int = Field(title="访问次数", default=0)
+    changes: int = Field(title="内容变化次数", default=0)
+
+
+class IncrementalReportModel(BaseModel):
+    """
+    一轮增量抓取的统计
+    """
+
+    total: int = Field(title="本轮到期的url数量", default=0)
+    changed: int = Field(title="内容变化的数量", default=0)
+    not_modified: int = Field(title="服务端返回304的数量", default=0)
+    unchanged: int = Field(title="返回了内容但哈希没有变化的数量", default=0)
+    failed: int = Field(title="请求失败的数量", default=0)
+    bytes_received: int = Field(title="接收的响应体字节数", default=0)
+    elapsed: float = Field(title="耗时，单位是秒", default=0)
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+
+
+class SitemapUrlModel(BaseModel):
+    """
+    站点地图中的url
+    """
+
+    loc: str = Field(title="地址")
+    lastmod: str | None = Field(title="最后修改时间", default=None)
+    changefreq: str | None = Field(title="更新频率", default=None)
+    priority: float | None = Field(title="优先级", default=None)
+    sitemap: str = Field(title="所在的站点地图")
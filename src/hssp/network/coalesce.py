@@ -0,0 +1,144 @@
+import asyncio
+import copy
+from collections.abc import Awaitable, Callable
+
+from furl import furl
+
+from hssp.logger.log import hssp_logger
+from hssp.models.net import RequestModel
+from hssp.network.recorder import body_digest, request_body, request_url
+from hssp.network.response import Response
+from hssp.settings.settings import settings
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """
+    合并进行中的相同请求：相同指纹的请求正在进行时，后来的调用者等待并共用它的响应，不再重复请求
+    默认只合并GET、HEAD这类没有副作用的请求，其他方法需要按主机显式开启
+    请求在独立的任务中执行，某个调用者被取消不影响其他调用者，所有调用者都取消后才取消请求
+    """
+
+    def __init__(self):
+        self._flights: dict[tuple, _Flight] = {}
+        # 规则匹配结果的缓存
+        self._rule_cache: dict[str, list[str] | None] = {}
+        self._rules: dict[str, list[str]] | None = None
+        self.coalesced = 0
+        self.logger = hssp_logger.getChild("coalesce")
+
+    def _match_rule(self, host: str) -> list[str] | None:
+        # 设置重新加载后规则可能变化，重新建立缓存
+        if self._rules is not settings.coalesce_rules:
+            self._rules = settings.coalesce_rules
+            self._rule_cache = {}
+        if host in self._rule_cache:
+            return self._rule_cache[host]
+
+        # 最长的规则优先
+        matched, matched_len = None, -1
+        for rule_host, methods in self._rules.items():
+            rule_host = rule_host.lower().lstrip(".")
+            if (host == rule_host or host.endswith(f".{rule_host}")) and len(rule_host) > matched_len:
+                matched, matched_len = [method.upper() for method in methods], len(rule_host)
+        self._rule_cache[host] = matched
+        return matched
+
+    def allowed(self, request_data: RequestModel) -> bool:
+        """
+        请求是否可以合并，按主机规则允许的方法判断，没有规则时使用设置中的默认方法
+        Args:
+            request_data: 请求模型
+
+        Returns:
+
+        """
+        methods = self._match_rule((furl(request_data.url).host or "").lower())
+        if methods is None:
+            if not settings.coalesce:
+                return False
+            methods = settings.coalesce_methods
+        return request_data.method.upper() in methods
+
+    @staticmethod
+    def fingerprint(request_data: RequestModel) -> tuple:
+        """
+        请求的指纹：方法、带参数的地址、请求体摘要、代理、cookies和影响响应的请求头
+        Args:
+            request_data: 请求模型
+
+        Returns:
+
+        """
+        headers = {name.lower(): value for name, value in (request_data.headers or {}).items()}
+        return (
+            request_data.method.upper(),
+            request_url(request_data),
+            body_digest(request_body(request_data)),
+            request_data.proxy,
+            request_data.raise_status,
+            tuple(sorted((request_data.cookies or {}).items())),
+            tuple(headers.get(name.lower()) for name in settings.coalesce_headers),
+        )
+
+    async def run(self, request_data: RequestModel, send: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        执行请求，有相同的请求正在进行时等待它的结果
+        Args:
+            request_data: 请求模型
+            send: 真正发起请求的方法
+
+        Returns:
+            返回响应，共用响应的调用者得到拷贝，修改属性和json互不影响
+        """
+        if not self.allowed(request_data):
+            return await send()
+
+        key = self.fingerprint(request_data)
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = self._flights[key] = _Flight(asyncio.create_task(send()))
+            flight.task.add_done_callback(lambda _: self._remove(key, flight))
+        else:
+            self.coalesced += 1
+            self.logger.debug(f"[{request_data.method}] {request_data.url} 已经在请求中，等待共用响应")
+
+        flight.waiters += 1
+        try:
+            response = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # 调用者被取消，没有其他调用者时取消请求；先移除，取消过程中新来的调用者重新发起请求
+            if not flight.task.done() and flight.waiters == 1:
+                self._remove(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+        return response if leader else self._share(response)
+
+    def _remove(self, key: tuple, flight: _Flight):
+        # 可能已经被新的请求替换
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    @staticmethod
+    def _share(response: Response) -> Response:
+        """
+        给共用响应的调用者一份拷贝，json、响应头、cookies各自一份，解析的选择器不共用
+        响应体和客户端的cookies仍然是共用的
+        """
+        shared = copy.copy(response)
+        shared.json = copy.deepcopy(response.json)
+        shared.headers = copy.copy(response.headers)
+        shared.cookies = copy.copy(response.cookies)
+        shared.__dict__.pop("selector", None)
+        return shared
@@ -1,5 +1,9 @@
 from hssp.network.downloader.aiohttp import AiohttpDownloader
 from hssp.network.downloader.curl_cffi import CurlCffiDownloader
+from hssp.network.downloader.drissionpage import DrissionPageDownloader
 from hssp.network.downloader.httpx import HttpxDownloader
+from hssp.network.downloader.registry import DOWNLOADERS, get_downloader_cls
+from hssp.network.downloader.replay import ReplayDownloader
 from hssp.network.downloader.requests import RequestsDownloader
 from hssp.network.downloader.requests_go import RequestsGoDownloader
+from hssp.network.downloader.router import RouterDownloader
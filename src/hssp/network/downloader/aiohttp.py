@@ -1,43 +1,118 @@
+import socket
 from asyncio import Semaphore
+from collections.abc import AsyncIterator
 
-from aiohttp import ClientSession, ClientTimeout, ContentTypeError, TCPConnector
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from aiohttp.abc import AbstractResolver, ResolveResult
 
 from hssp.exception.exception import RequestStateException
 from hssp.models.net import RequestModel
-from hssp.network.downloader.base import DownloaderBase
+from hssp.network.downloader.base import DownloaderBase, loads_json, prepare_body
+from hssp.network.memory import CHUNK_SIZE, is_streaming_body, read_body
+from hssp.network.resolver import DnsResolver, shared_resolver
 from hssp.network.response import Response
+from hssp.network.transport import shared_transport
+from hssp.settings.settings import settings
+
+
+class SharedResolver(AbstractResolver):
+    """
+    把共享的DNS解析缓存适配为aiohttp的解析器
+    """
+
+    def __init__(self, resolver: DnsResolver):
+        self.resolver = resolver
+
+    async def resolve(
+        self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET
+    ) -> list[ResolveResult]:
+        addresses = await self.resolver.resolve(host, family)
+        return [
+            ResolveResult(
+                hostname=host,
+                host=address,
+                port=port,
+                family=address_family,
+                proto=0,
+                flags=socket.AI_NUMERICHOST,
+            )
+            for address_family, address in addresses
+        ]
+
+    async def close(self): ...
+
+
+def create_connector() -> TCPConnector:
+    """
+    创建aiohttp的连接池，开启DNS缓存时接入共享的解析器
+    Returns:
+
+    """
+    if settings.dns_cache:
+        return TCPConnector(ssl=False, resolver=SharedResolver(shared_resolver), use_dns_cache=False)
+    return TCPConnector(ssl=False)
+
+
+async def close_connector(connector: TCPConnector):
+    await connector.close()
 
 
 class AiohttpDownloader(DownloaderBase):
     def __init__(self, sem: Semaphore, headers: dict = None, cookies=None):
         super().__init__(sem, headers, cookies)
 
+        # 同一个事件循环中的下载器共用连接池，每个下载器有自己的会话
+        self._transport_key, connector = shared_transport.acquire("aiohttp", create_connector, close_connector)
         self.client = ClientSession(
             headers=self._default_headers,
             cookies=self._default_cookies,
-            connector=TCPConnector(ssl=False),
+            connector=connector or create_connector(),
+            connector_owner=self._transport_key is None,
             trust_env=True,
         )
 
     async def close(self):
         await self.client.close()
+        # 重复关闭时不会多次释放
+        key, self._transport_key = self._transport_key, None
+        await shared_transport.release(key)
 
-    def set_proxy(self, proxy: str): ...
+    def set_proxy(self, proxy: str | None): ...
 
     @property
     def cookies(self):
         return {cookie.key: cookie.value for cookie in self.client.cookie_jar}
 
+    async def _stream(self, request_data: RequestModel, chunk_size: int) -> AsyncIterator[bytes]:
+        # 流式读取时总耗时不可控，超时只限制连接和每次读取
+        timeout = ClientTimeout(sock_connect=request_data.timeout, sock_read=request_data.timeout)
+        data, headers = prepare_body(request_data)
+        async with self.client.request(
+            method=request_data.method,
+            url=request_data.url,
+            params=request_data.url_params,
+            data=data,
+            cookies=request_data.cookies,
+            headers=headers,
+            proxy=request_data.proxy,
+            timeout=timeout,
+        ) as response:
+            if not response.ok and request_data.raise_status:
+                raise RequestStateException(code=response.status)
+
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+
     async def _download(self, request_data: RequestModel) -> Response:
         timeout = ClientTimeout(total=request_data.timeout)
+        data, headers = prepare_body(request_data)
         response = await self.client.request(
             method=request_data.method,
             url=request_data.url,
             params=request_data.url_params,
-            data=request_data.form_data,
-            json=request_data.json_data,
+            data=data,
             cookies=request_data.cookies,
-            headers=request_data.headers,
+            headers=headers,
             proxy=request_data.proxy,
             timeout=timeout,
         )
@@ -46,19 +121,18 @@ class AiohttpDownloader(DownloaderBase):
             raise RequestStateException(code=response.status)
 
         resp_headers = dict(response.headers)
-        resp_content = await response.read()
-
-        # 图片等二进制数据无法解码的，直接返回空字符串
-        try:
-            resp_text = await response.text()
-        except UnicodeDecodeError:
-            resp_text = ""
-
         resp_cookies = {name: cookie.value for name, cookie in response.cookies.items()}
-        try:
-            resp_json = await response.json()
-        except (ContentTypeError, UnicodeDecodeError):
-            resp_json = None
+
+        if is_streaming_body():
+            # 流式读取，大响应体写入临时文件，文本由Response按需解码
+            resp_content = await read_body(response.content.iter_chunked(CHUNK_SIZE), response.content_length)
+            resp_text = None
+            resp_json = loads_json(resp_content, resp_headers)
+        else:
+            resp_content = await response.read()
+            # 文本由Response按需解码，只解码一次
+            resp_text = None
+            resp_json = loads_json(resp_content, resp_headers)
 
         return Response(
             url=response.url.__str__(),
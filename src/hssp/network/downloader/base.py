@@ -1,8 +1,74 @@
+import asyncio
+import codecs
+import contextlib
 from abc import ABC, abstractmethod
 from asyncio import Semaphore
+from collections.abc import AsyncIterator, Callable
+from typing import Any
 
+from hssp.exception.exception import RequestStateException
 from hssp.models.net import RequestModel
+from hssp.network.memory import CHUNK_SIZE, check_body_size, memory_budget, spill_bytes
 from hssp.network.response import Response
+from hssp.network.response.encoding import header_encoding
+from hssp.settings.settings import settings
+from hssp.utils.codec import json_dumps, json_loads
+
+# json文本可能的第一个字符，其他开头的响应体（比如网页）不尝试解析
+_JSON_START = frozenset(b'{["-0123456789tfn')
+
+
+def loads_json(content, headers, check_type: bool = True) -> dict | None:
+    """
+    解析json响应体，响应头声明了非utf编码时先按该编码解码，写入临时文件的响应体不解析
+    Args:
+        content: 响应体
+        headers: 响应头
+        check_type: 是否要求Content-Type包含json
+
+    Returns:
+
+    """
+    if not isinstance(content, bytes):
+        return None
+    if check_type:
+        content_type = next((v for k, v in headers.items() if k.lower() == "content-type"), "")
+        if "json" not in content_type:
+            return None
+
+    stripped = content.lstrip()
+    if stripped.startswith(codecs.BOM_UTF8):
+        # 不是所有编解码器都支持BOM
+        content = stripped = stripped[len(codecs.BOM_UTF8) :]
+    if not stripped or stripped[0] not in _JSON_START:
+        return None
+
+    encoding = header_encoding(headers)
+    try:
+        if encoding and not encoding.startswith("utf"):
+            return json_loads(content.decode(encoding))
+        return json_loads(content)
+    except ValueError:
+        # 各编解码器的解析错误和UnicodeDecodeError都是ValueError的子类
+        return None
+
+
+def prepare_body(request_data: RequestModel) -> tuple[Any, dict | None]:
+    """
+    准备请求体，json数据使用设置的编解码器序列化，不交给客户端用标准库序列化
+    Args:
+        request_data: 请求模型
+
+    Returns:
+        返回 (请求体, 请求头)
+    """
+    if request_data.json_data is None:
+        return request_data.form_data, request_data.headers
+
+    headers = dict(request_data.headers or {})
+    if not any(key.lower() == "content-type" for key in headers):
+        headers["Content-Type"] = "application/json"
+    return json_dumps(request_data.json_data), headers
 
 
 class DownloaderBase(ABC):
@@ -17,18 +83,81 @@ class DownloaderBase(ABC):
 
     async def download(self, request: RequestModel) -> Response:
         """
-        下载方法，受信号量控制
+        下载方法，受信号量和内存预算控制，等待预算超时后下载的响应体写入临时文件
         Args:
             request:
 
         Returns:
 
         """
+        within_budget = await memory_budget.wait()
+
         if self.sem:
             async with self.sem:
-                return await self._download(request)
+                response = await self._download(request)
         else:
-            return await self._download(request)
+            response = await self._download(request)
+
+        return self._limit_body(response, spill=not within_budget)
+
+    async def stream(self, request: RequestModel, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """
+        流式下载响应体，受信号量控制，响应体不进入内存，所以不受内存预算控制
+        Args:
+            request: 请求模型
+            chunk_size: 每块的大小
+
+        Returns:
+            返回字节块的异步迭代器
+        """
+        if self.sem:
+            async with self.sem:
+                async for chunk in self._stream(request, chunk_size):
+                    yield chunk
+        else:
+            async for chunk in self._stream(request, chunk_size):
+                yield chunk
+
+    async def _stream(self, request: RequestModel, chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        流式下载，默认下载完成后分块返回，支持流式读取的下载器覆盖这个方法
+        Args:
+            request: 请求模型
+            chunk_size: 每块的大小
+
+        Returns:
+
+        """
+        response = await self._download(request)
+        content = response.content
+        for start in range(0, len(content), chunk_size):
+            yield bytes(content[start : start + chunk_size])
+
+    @staticmethod
+    def _limit_body(response: Response, spill: bool = False) -> Response:
+        """
+        检查响应体大小，超过阈值的写入临时文件，其余的计入内存预算
+        不支持流式读取的下载器在这里补充检查，此时响应体已经完整读入过内存
+        Args:
+            response: 响应
+            spill: 是否直接写入临时文件，内存预算不足时使用
+
+        Returns:
+
+        """
+        content = response.content
+        if not isinstance(content, bytes):
+            return response
+
+        check_body_size(len(content))
+        if content and (spill or (settings.spill_threshold and len(content) > settings.spill_threshold)):
+            response.content = spill_bytes(content)
+            response.text = None
+            return response
+
+        # 响应体加上解码后的文本，粗略按两倍估算
+        memory_budget.track(response, len(content) * 2)
+        return response
 
     @property
     @abstractmethod
@@ -41,11 +170,11 @@ class DownloaderBase(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def set_proxy(self, proxy: str):
+    def set_proxy(self, proxy: str | None):
         """
         设置代理，有些客户端不可以在请求时设置代理，所以提供一个入口
         Args:
-            proxy: 代理
+            proxy: 代理，为None时清除之前设置的代理
 
         Returns:
 
@@ -74,21 +203,300 @@ class DownloaderBase(ABC):
         raise NotImplementedError
 
 
+class BrowserSlot:
+    """
+    渲染池中的一个浏览器，记录它打开的标签页数量和已经渲染的页面数量
+    """
+
+    def __init__(self, browser):
+        self.browser = browser
+        # 借出和空闲的标签页数量
+        self.tabs = 0
+        # 已经渲染的页面数量
+        self.pages = 0
+        # 达到最大页面数或出错后不再借出，所有标签页归还后关闭
+        self.retiring = False
+
+
+class RenderDriver:
+    """
+    从渲染池借出的标签页
+    """
+
+    def __init__(self, slot: BrowserSlot, tab):
+        self.slot = slot
+        self.tab = tab
+
+
 class RenderDownloader(DownloaderBase, ABC):
-    def put_back(self, driver):
+    """
+    渲染下载器的基类：维护浏览器和标签页池，借出标签页渲染，渲染完归还
+    浏览器渲染一定数量的页面后回收重建，避免内存持续增长
+    浏览器的操作都是同步的，在线程中执行，不阻塞事件循环
+    """
+
+    def __init__(
+        self,
+        sem: Semaphore,
+        headers: dict = None,
+        cookies=None,
+        browser_factory: Callable[[str | None], Any] | None = None,
+        pool_size: int | None = None,
+        tabs_per_browser: int | None = None,
+        max_pages: int | None = None,
+    ):
+        """
+        Args:
+            sem: 信号量，控制并发
+            browser_factory: 创建浏览器的函数，传入代理，默认使用 create_browser
+            pool_size: 最多同时打开的浏览器数量，默认使用设置中的值
+            tabs_per_browser: 每个浏览器最多打开的标签页数量，默认使用设置中的值
+            max_pages: 每个浏览器渲染多少页面后回收，默认使用设置中的值
+        """
+        super().__init__(sem, headers, cookies)
+        self.browser_factory = browser_factory or self.create_browser
+        self.pool_size = pool_size or settings.render_pool_size
+        self.tabs_per_browser = tabs_per_browser or settings.render_tabs_per_browser
+        self.max_pages = max_pages or settings.render_max_pages
+
+        self._proxy: str | None = None
+        self._cookies = dict(self._default_cookies)
+        self._slots: list[BrowserSlot] = []
+        self._idle: list[RenderDriver] = []
+        self._launching = 0
+        self._waiters: list[asyncio.Future] = []
+
+    @property
+    def cookies(self):
+        return self._cookies
+
+    def set_proxy(self, proxy: str | None):
+        """
+        浏览器只能在启动时设置代理，代理变化后回收现有的浏览器，之后按新代理启动
+        Args:
+            proxy: 代理
+
+        Returns:
+
+        """
+        if proxy == self._proxy:
+            return
+
+        self._proxy = proxy
+        for slot in self._slots:
+            slot.retiring = True
+        idle, self._idle = self._idle, []
+        for driver in idle:
+            self._release(driver)
+
+    @abstractmethod
+    def create_browser(self, proxy: str | None = None):
+        """
+        启动浏览器
+        Args:
+            proxy: 代理
+
+        Returns:
+            返回浏览器对象
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def new_tab(self, browser):
+        """
+        在浏览器中打开标签页
+        Args:
+            browser: 浏览器对象
+
+        Returns:
+            返回标签页对象
         """
-        释放浏览器对象
+        raise NotImplementedError
+
+    @abstractmethod
+    def close_tab(self, tab):
         """
-        pass
+        关闭标签页
+        """
+        raise NotImplementedError
 
-    def close(self):
+    @abstractmethod
+    def quit_browser(self, browser):
         """
         关闭浏览器
         """
-        pass
+        raise NotImplementedError
+
+    @abstractmethod
+    def render(self, tab, request: RequestModel) -> Response:
+        """
+        在标签页中渲染页面，在线程中执行
+        Args:
+            tab: 标签页对象
+            request: 请求模型
+
+        Returns:
+            返回响应
+        """
+        raise NotImplementedError
+
+    async def checkout(self) -> RenderDriver:
+        """
+        借出一个标签页，优先使用空闲的，其次在现有浏览器中打开，再次启动新的浏览器，都不行时等待归还
+        Returns:
+
+        """
+        while True:
+            if self._idle:
+                driver = self._idle.pop()
+                # 空闲期间浏览器可能已经被回收
+                if driver.slot.retiring or driver.slot not in self._slots:
+                    self._release(driver)
+                    continue
+                return driver
+
+            slot = next(
+                (slot for slot in self._slots if not slot.retiring and slot.tabs < self.tabs_per_browser),
+                None,
+            )
+            if slot is not None:
+                return RenderDriver(slot, await self._open_tab(slot))
+
+            if len(self._slots) + self._launching < self.pool_size:
+                self._launching += 1
+                try:
+                    browser = await asyncio.to_thread(self.browser_factory, self._proxy)
+                finally:
+                    self._launching -= 1
+                    self._wake()
+                self._slots.append(BrowserSlot(browser))
+                continue
+
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            finally:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+
+    async def _open_tab(self, slot: BrowserSlot):
+        """
+        在浏览器中打开标签页，失败时回收浏览器，被取消时归还名额
+        Args:
+            slot: 浏览器
+
+        Returns:
+            返回标签页对象
+        """
+        slot.tabs += 1
+        future = asyncio.ensure_future(asyncio.to_thread(self.new_tab, slot.browser))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # 线程中仍会打开标签页，打开后直接关闭
+            def _close_opened(done: asyncio.Future):
+                if not done.cancelled() and done.exception() is None:
+                    self._run_in_thread(self.close_tab, done.result())
+
+            future.add_done_callback(_close_opened)
+            slot.tabs -= 1
+            self._cleanup(slot)
+            self._wake()
+            raise
+        except Exception:
+            slot.tabs -= 1
+            slot.retiring = True
+            self._cleanup(slot)
+            raise
+
+    def put_back(self, driver: RenderDriver, broken: bool = False):
+        """
+        归还标签页，浏览器达到最大页面数或标签页出错时回收
+        Args:
+            driver: 借出的标签页
+            broken: 是否出错，出错的浏览器不再使用
+
+        Returns:
+
+        """
+        slot = driver.slot
+        slot.pages += 1
+        if broken or slot.pages >= self.max_pages or slot not in self._slots:
+            slot.retiring = True
+
+        if slot.retiring:
+            self._release(driver)
+        else:
+            self._idle.append(driver)
+        self._wake()
+
+    def _release(self, driver: RenderDriver):
+        driver.slot.tabs -= 1
+        self._run_in_thread(self.close_tab, driver.tab)
+        self._cleanup(driver.slot)
+
+    def _cleanup(self, slot: BrowserSlot):
+        if not slot.retiring or slot.tabs > 0 or slot not in self._slots:
+            return
+
+        self._slots.remove(slot)
+        self._run_in_thread(self.quit_browser, slot.browser)
+        self._wake()
+
+    @staticmethod
+    def _run_in_thread(func: Callable, *args):
+        # 关闭浏览器比较慢，放到线程中执行，关闭时出错也不影响其他请求
+        def _call():
+            with contextlib.suppress(Exception):
+                func(*args)
+
+        try:
+            asyncio.get_running_loop().run_in_executor(None, _call)
+        except RuntimeError:
+            _call()
+
+    def _wake(self):
+        waiters, self._waiters = self._waiters, []
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+
+    async def _download(self, request: RequestModel) -> Response:
+        driver = await self.checkout()
+        try:
+            response = await asyncio.to_thread(self.render, driver.tab, request)
+        except BaseException:
+            # 出错或被取消时标签页的状态不确定，不再使用
+            self.put_back(driver, broken=True)
+            raise
+
+        self.put_back(driver)
+        # 状态码不对说明页面本身有问题，浏览器仍然可以使用，归还之后再抛出
+        if not 200 <= response.status_code < 300 and request.raise_status:
+            raise RequestStateException(code=response.status_code)
+
+        self._cookies.update(response.cookies)
+        response.client_cookies = self.cookies
+        return response
 
     def close_all(self):
         """
         关闭所有浏览器
+        Returns:
+
+        """
+        slots, self._slots = self._slots, []
+        self._idle = []
+        for slot in slots:
+            with contextlib.suppress(Exception):
+                self.quit_browser(slot.browser)
+        self._wake()
+
+    async def close(self):
+        """
+        关闭下载器的所有浏览器
+        Returns:
+
         """
-        pass
+        await asyncio.to_thread(self.close_all)
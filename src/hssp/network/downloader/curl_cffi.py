@@ -1,20 +1,29 @@
 import asyncio
-from json import JSONDecodeError
+from collections.abc import AsyncIterator
 
+from curl_cffi import AsyncCurl
 from curl_cffi.const import CurlHttpVersion
 from curl_cffi.requests import AsyncSession
 
 from hssp.exception.exception import RequestStateException
 from hssp.models.net import RequestModel
-from hssp.network.downloader.base import DownloaderBase
+from hssp.network.downloader.base import DownloaderBase, loads_json, prepare_body
 from hssp.network.response import Response
+from hssp.network.transport import shared_transport
+
+
+async def close_async_curl(async_curl: AsyncCurl):
+    await async_curl.close()
 
 
 class CurlCffiDownloader(DownloaderBase):
     def __init__(self, sem: asyncio.Semaphore, headers: dict = None, cookies=None):
         super().__init__(sem, headers, cookies)
 
+        # 同一个事件循环中的下载器共用curl的multi句柄和其中的连接缓存，每个下载器有自己的会话
+        self._transport_key, async_curl = shared_transport.acquire("curl_cffi", AsyncCurl, close_async_curl)
         self.client = AsyncSession(
+            async_curl=async_curl,
             verify=False,
             headers=self._default_headers,
             cookies=self._default_cookies,
@@ -24,25 +33,51 @@ class CurlCffiDownloader(DownloaderBase):
 
     async def close(self):
         await self.client.close()
+        # 重复关闭时不会多次释放
+        key, self._transport_key = self._transport_key, None
+        await shared_transport.release(key)
 
     @property
     def cookies(self):
         return self.client.cookies.get_dict()
 
-    def set_proxy(self, proxy: str): ...
+    def set_proxy(self, proxy: str | None): ...
+
+    async def _stream(self, request_data: RequestModel, chunk_size: int) -> AsyncIterator[bytes]:
+        # noinspection PyTypeChecker
+        data, headers = prepare_body(request_data)
+        response = await self.client.request(
+            method=request_data.method,
+            url=request_data.url,
+            params=request_data.url_params,
+            data=data,
+            headers=headers,
+            cookies=request_data.cookies,
+            proxies={"https": request_data.proxy, "http": request_data.proxy},
+            timeout=request_data.timeout,
+            stream=True,
+        )
+        try:
+            if not response.ok and request_data.raise_status:
+                raise RequestStateException(code=response.status_code)
+
+            async for chunk in response.aiter_content(chunk_size):
+                yield chunk
+        finally:
+            await response.aclose()
 
     async def _download(self, request_data: RequestModel) -> Response:
         proxies = {"https": request_data.proxy, "http": request_data.proxy}
 
         # noinspection PyTypeChecker
+        data, headers = prepare_body(request_data)
         response = await self.client.request(
             method=request_data.method,
             url=request_data.url,
             params=request_data.url_params,
-            data=request_data.form_data,
-            json=request_data.json_data,
+            data=data,
             cookies=request_data.cookies,
-            headers=request_data.headers,
+            headers=headers,
             proxies=proxies,
             timeout=request_data.timeout,
         )
@@ -52,12 +87,8 @@ class CurlCffiDownloader(DownloaderBase):
 
         resp_headers = dict(response.headers)
         resp_content = response.content
-        resp_text = response.text
         resp_cookies = response.cookies.get_dict()
-        try:
-            resp_json = response.json()
-        except (JSONDecodeError, UnicodeDecodeError):
-            resp_json = None
+        resp_json = loads_json(resp_content, resp_headers, check_type=False)
 
         return Response(
             url=response.url,
@@ -66,7 +97,8 @@ class CurlCffiDownloader(DownloaderBase):
             cookies=resp_cookies,
             client_cookies=self.cookies,
             content=resp_content,
-            text=resp_text,
+            # 文本由Response按需解码，只解码一次
+            text=None,
             json=resp_json,
             request_data=request_data,
         )
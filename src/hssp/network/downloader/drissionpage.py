@@ -0,0 +1,134 @@
+from asyncio import Semaphore
+from collections.abc import Callable
+from typing import Any
+
+from hssp.exception.exception import RequestException
+from hssp.models.net import RequestModel
+from hssp.network.downloader.base import RenderDownloader
+from hssp.network.response import Response
+from hssp.settings.settings import settings
+
+# 屏蔽的资源，节省带宽
+BLOCKED_RESOURCES = (
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.webp",
+    "*.svg",
+    "*.ico",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.otf",
+    "*.eot",
+    "*.mp4",
+    "*.webm",
+    "*.m4a",
+    "*.mp3",
+    "*.ogg",
+    "*.flv",
+    "*.m3u8",
+    "*.ts",
+)
+
+# 响应体是渲染后重新编码的html，这些响应头不再符合响应体
+RENDERED_HEADERS = frozenset({"content-type", "content-encoding", "content-length", "transfer-encoding"})
+
+
+class DrissionPageDownloader(RenderDownloader):
+    """
+    基于DrissionPage的渲染下载器，只支持GET请求
+    """
+
+    def __init__(
+        self,
+        sem: Semaphore,
+        headers: dict = None,
+        cookies=None,
+        browser_factory: Callable[[str | None], Any] | None = None,
+        pool_size: int | None = None,
+        tabs_per_browser: int | None = None,
+        max_pages: int | None = None,
+    ):
+        super().__init__(sem, headers, cookies, browser_factory, pool_size, tabs_per_browser, max_pages)
+
+    def create_browser(self, proxy: str | None = None):
+        from DrissionPage import Chromium, ChromiumOptions
+
+        options = ChromiumOptions()
+        options.auto_port()
+        options.headless(settings.render_headless)
+        options.mute(True)
+        if settings.render_block_resources:
+            options.no_imgs(True)
+        if proxy:
+            options.set_proxy(proxy)
+        return Chromium(options)
+
+    def new_tab(self, browser):
+        tab = browser.new_tab()
+        if settings.render_block_resources:
+            tab.set.blocked_urls(list(BLOCKED_RESOURCES))
+        return tab
+
+    def close_tab(self, tab):
+        tab.close()
+
+    def quit_browser(self, browser):
+        browser.quit()
+
+    @staticmethod
+    def _document_response(tab) -> tuple[int, dict]:
+        """
+        从监听到的数据包中取出主文档的状态码和响应头
+        页面来自浏览器缓存等没有监听到数据包的情况，状态码为200，响应头只有Content-Type，都是占位的值
+        Args:
+            tab: 标签页对象
+
+        Returns:
+            返回状态码和响应头
+        """
+        status_code, headers = 200, {}
+        packet = tab.listen.wait(timeout=1, raise_err=False)
+        if packet and not packet.is_failed and packet.response.status:
+            status_code = packet.response.status
+            headers = {
+                key: value for key, value in packet.response.headers.items() if key.lower() not in RENDERED_HEADERS
+            }
+        # 响应体是渲染后的html，统一按utf-8编码
+        headers["Content-Type"] = "text/html; charset=utf-8"
+        return status_code, headers
+
+    def render(self, tab, request: RequestModel) -> Response:
+        if request.method.upper() != "GET":
+            raise ValueError(f"渲染下载器不支持 {request.method} 请求")
+
+        headers = {**self._default_headers, **(request.headers or {})}
+        cookies = {**self._default_cookies, **(request.cookies or {})}
+        if cookies:
+            headers["Cookie"] = "; ".join(f"{key}={value}" for key, value in cookies.items())
+        if headers:
+            tab.set.headers(headers)
+
+        # 监听主文档的响应，取得真实的状态码和响应头
+        tab.listen.start(res_type="Document")
+        try:
+            if not tab.get(request.url, timeout=request.timeout):
+                raise RequestException("RenderException", [f"渲染 {request.url} 失败"])
+            status_code, headers = self._document_response(tab)
+        finally:
+            tab.listen.stop()
+
+        html = tab.html
+        return Response(
+            url=tab.url,
+            status_code=status_code,
+            headers=headers,
+            cookies=tab.cookies().as_dict(),
+            client_cookies=self.cookies,
+            content=html.encode("utf-8"),
+            text=html,
+            json=None,
+            request_data=request,
+        )
@@ -1,60 +1,246 @@
+import contextlib
 from asyncio import Semaphore
-from json import JSONDecodeError
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable
 
-from httpx import AsyncClient
+from httpcore import AsyncNetworkBackend, AsyncNetworkStream, ConnectError, ConnectTimeout
+from httpx import AsyncBaseTransport, AsyncClient, AsyncHTTPTransport, Request
+from httpx import Response as HttpxResponse
 
 from hssp.exception.exception import RequestStateException
 from hssp.models.net import RequestModel
-from hssp.network.downloader.base import DownloaderBase
+from hssp.network.downloader.base import DownloaderBase, loads_json, prepare_body
+from hssp.network.memory import CHUNK_SIZE, is_streaming_body, read_body
+from hssp.network.resolver import DnsResolver, is_ip_address, shared_resolver
 from hssp.network.response import Response
+from hssp.network.transport import shared_transport
+from hssp.settings.settings import settings
+
+
+class ResolverNetworkBackend(AsyncNetworkBackend):
+    """
+    连接前先通过共享的DNS解析缓存解析主机，TLS的SNI仍然使用原来的主机名
+    """
+
+    def __init__(self, backend: AsyncNetworkBackend, resolver: DnsResolver):
+        self.backend = backend
+        self.resolver = resolver
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: float | None = None,
+        local_address: str | None = None,
+        socket_options: Iterable | None = None,
+    ) -> AsyncNetworkStream:
+        if is_ip_address(host):
+            return await self.backend.connect_tcp(host, port, timeout, local_address, socket_options)
+
+        try:
+            addresses = await self.resolver.resolve(host)
+        except OSError as exception:
+            # 和httpx自己解析失败时一样抛出连接异常
+            raise ConnectError(str(exception)) from exception
+
+        for index, (_, address) in enumerate(addresses):
+            try:
+                return await self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (ConnectError, ConnectTimeout, OSError):
+                # 多个地址依次尝试，比如IPv6不通时换IPv4，最后一个也失败时抛出异常
+                if index == len(addresses) - 1:
+                    raise
+
+    async def connect_unix_socket(
+        self, path: str, timeout: float | None = None, socket_options: Iterable | None = None
+    ) -> AsyncNetworkStream:
+        return await self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self.backend.sleep(seconds)
+
+
+def create_transport(proxy: str | None = None, http2: bool = True) -> AsyncHTTPTransport:
+    """
+    创建httpx的传输层，开启DNS缓存时接入共享的解析器
+    Args:
+        proxy: 代理
+        http2: 是否开启http2
+
+    Returns:
+
+    """
+    transport = AsyncHTTPTransport(verify=False, http2=http2, proxy=proxy)
+    if settings.dns_cache:
+        # noinspection PyProtectedMember
+        pool = transport._pool
+        pool._network_backend = ResolverNetworkBackend(pool._network_backend, shared_resolver)
+    return transport
+
+
+class SharedTransport(AsyncBaseTransport):
+    """
+    共享的传输层，客户端关闭时不关闭，由共享连接池按引用计数关闭
+    """
+
+    def __init__(self, transport: AsyncHTTPTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: Request) -> HttpxResponse:
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self): ...
+
+
+async def close_transport(transport: AsyncHTTPTransport):
+    await transport.aclose()
 
 
 class HttpxDownloader(DownloaderBase):
     def __init__(self, sem: Semaphore, headers: dict = None, cookies=None):
         super().__init__(sem, headers, cookies)
 
+        # 同一个事件循环中的下载器共用无代理的传输层，每个下载器有自己的客户端
+        self._transport_key, transport = shared_transport.acquire("httpx", create_transport, close_transport)
         self.client = AsyncClient(
             verify=False,
             http2=True,
             headers=self._default_headers,
             cookies=self._default_cookies,
+            transport=SharedTransport(transport) if transport else create_transport(),
         )
 
+        # 默认代理，请求没有指定代理时使用
+        self._proxy: str | None = None
+        # 每个代理一个客户端，复用连接，超出数量后关闭最久未使用的
+        self._proxy_clients: OrderedDict[str, AsyncClient] = OrderedDict()
+        # 客户端正在进行的请求数
+        self._in_use: dict[AsyncClient, int] = {}
+        # 被淘汰的客户端，请求都结束后关闭
+        self._retired: set[AsyncClient] = set()
+
     async def close(self):
-        await self.client.aclose()
+        clients = [self.client, *self._proxy_clients.values(), *self._retired]
+        self._proxy_clients.clear()
+        self._retired.clear()
+        for client in clients:
+            await client.aclose()
+        # 重复关闭时不会多次释放
+        key, self._transport_key = self._transport_key, None
+        await shared_transport.release(key)
 
     @property
     def cookies(self):
-        return {cookie.name: cookie.value for cookie in self.client.cookies.jar}
+        cookies = {}
+        for client in (*self._proxy_clients.values(), self.client):
+            cookies.update({cookie.name: cookie.value for cookie in client.cookies.jar})
+        return cookies
 
-    def set_proxy(self, proxy: str):
-        self.client = AsyncClient(headers=self.client.headers, cookies=self.client.cookies, proxy=proxy, verify=False)
+    def set_proxy(self, proxy: str | None):
+        self._proxy = proxy
 
-    async def _download(self, request_data: RequestModel) -> Response:
-        request = self.client.build_request(
+    def _get_client(self, proxy: str | None) -> AsyncClient:
+        proxy = proxy or self._proxy
+        if not proxy:
+            return self.client
+
+        client = self._proxy_clients.get(proxy)
+        if client is not None:
+            self._proxy_clients.move_to_end(proxy)
+            return client
+
+        client = AsyncClient(
+            headers=self.client.headers,
+            cookies=self.client.cookies,
+            verify=False,
+            transport=create_transport(proxy, http2=False),
+        )
+        self._proxy_clients[proxy] = client
+        while len(self._proxy_clients) > settings.max_proxy_clients:
+            _, retired = self._proxy_clients.popitem(last=False)
+            self._retired.add(retired)
+        return client
+
+    @contextlib.asynccontextmanager
+    async def _use_client(self, proxy: str | None) -> AsyncIterator[AsyncClient]:
+        """
+        借用代理对应的客户端，记录正在进行的请求数，被淘汰的客户端在请求都结束后关闭
+        Args:
+            proxy: 代理
+
+        Returns:
+
+        """
+        client = self._get_client(proxy)
+        self._in_use[client] = self._in_use.get(client, 0) + 1
+        try:
+            yield client
+        finally:
+            count = self._in_use.pop(client) - 1
+            if count:
+                self._in_use[client] = count
+            for retired in [retired for retired in self._retired if retired not in self._in_use]:
+                self._retired.discard(retired)
+                await retired.aclose()
+
+    @staticmethod
+    def _build_request(client: AsyncClient, request_data: RequestModel):
+        body, headers = prepare_body(request_data)
+        # httpx的原始请求体需要通过content传入
+        content, data = (body, None) if isinstance(body, bytes | str) else (None, body)
+        return client.build_request(
             request_data.method,
             request_data.url,
-            headers=request_data.headers,
+            headers=headers,
             timeout=request_data.timeout,
             cookies=request_data.cookies,
             params=request_data.url_params,
-            data=request_data.form_data,
-            json=request_data.json_data,
+            content=content,
+            data=data,
         )
-        response = await self.client.send(request, follow_redirects=True)
-        if not response.is_success and request_data.raise_status:
-            raise RequestStateException(code=response.status_code)
 
-        try:
-            json_data = response.json()
-        except (JSONDecodeError, UnicodeDecodeError):
-            json_data = None
+    async def _stream(self, request_data: RequestModel, chunk_size: int) -> AsyncIterator[bytes]:
+        async with self._use_client(request_data.proxy) as client:
+            response = await client.send(self._build_request(client, request_data), follow_redirects=True, stream=True)
+            try:
+                if not response.is_success and request_data.raise_status:
+                    raise RequestStateException(code=response.status_code)
 
-        # 图片等二进制数据无法解码的，直接返回空字符串
-        try:
-            text_data = response.text
-        except UnicodeDecodeError:
-            text_data = ""
+                async for chunk in response.aiter_bytes(chunk_size):
+                    yield chunk
+            finally:
+                await response.aclose()
+
+    async def _download(self, request_data: RequestModel) -> Response:
+        async with self._use_client(request_data.proxy) as client:
+            return await self._send(client, request_data)
+
+    async def _send(self, client: AsyncClient, request_data: RequestModel) -> Response:
+        request = self._build_request(client, request_data)
+        if is_streaming_body():
+            # 流式读取，大响应体写入临时文件，文本由Response按需解码
+            response = await client.send(request, follow_redirects=True, stream=True)
+            try:
+                if not response.is_success and request_data.raise_status:
+                    raise RequestStateException(code=response.status_code)
+
+                content_length = response.headers.get("Content-Length")
+                content = await read_body(
+                    response.aiter_bytes(CHUNK_SIZE), int(content_length) if content_length else None
+                )
+            finally:
+                await response.aclose()
+            json_data = loads_json(content, response.headers)
+            text_data = None
+        else:
+            response = await client.send(request, follow_redirects=True)
+            if not response.is_success and request_data.raise_status:
+                raise RequestStateException(code=response.status_code)
+
+            content = response.content
+            json_data = loads_json(content, response.headers, check_type=False)
+            # 文本由Response按需解码，只解码一次
+            text_data = None
 
         resp_cookies = {cookie.name: cookie.value for cookie in response.cookies.jar}
         return Response(
@@ -63,7 +249,7 @@ class HttpxDownloader(DownloaderBase):
             headers=response.headers,
             cookies=resp_cookies,
             client_cookies=self.cookies,
-            content=response.content,
+            content=content,
             text=text_data,
             json=json_data,
             request_data=request_data,
@@ -0,0 +1,37 @@
+from hssp.models.net import DownloaderEnum
+from hssp.network.downloader.aiohttp import AiohttpDownloader
+from hssp.network.downloader.base import DownloaderBase
+from hssp.network.downloader.curl_cffi import CurlCffiDownloader
+from hssp.network.downloader.drissionpage import DrissionPageDownloader
+from hssp.network.downloader.httpx import HttpxDownloader
+from hssp.network.downloader.replay import ReplayDownloader
+from hssp.network.downloader.requests import RequestsDownloader
+from hssp.network.downloader.requests_go import RequestsGoDownloader
+
+# 下载器枚举对应的下载器
+DOWNLOADERS: dict[DownloaderEnum, type[DownloaderBase]] = {
+    DownloaderEnum.AIOHTTP: AiohttpDownloader,
+    DownloaderEnum.HTTPX: HttpxDownloader,
+    DownloaderEnum.REQUESTS: RequestsDownloader,
+    DownloaderEnum.CURL_CFFI: CurlCffiDownloader,
+    DownloaderEnum.REQUESTS_GO: RequestsGoDownloader,
+    DownloaderEnum.DRISSIONPAGE: DrissionPageDownloader,
+    DownloaderEnum.REPLAY: ReplayDownloader,
+}
+
+
+def get_downloader_cls(downloader: type[DownloaderBase] | DownloaderEnum | str) -> type[DownloaderBase]:
+    """
+    获取下载器类
+    Args:
+        downloader: 下载器类、枚举或枚举的值
+
+    Returns:
+
+    """
+    if isinstance(downloader, type):
+        return downloader
+    try:
+        return DOWNLOADERS[DownloaderEnum(downloader)]
+    except (KeyError, ValueError) as exception:
+        raise ValueError(f"未知的下载器 {downloader}") from exception
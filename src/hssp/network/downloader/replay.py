@@ -0,0 +1,161 @@
+import asyncio
+import gzip
+import threading
+from asyncio import Semaphore
+from pathlib import Path
+
+from hssp.exception.exception import RequestStateException
+from hssp.logger.log import hssp_logger
+from hssp.models.net import RequestModel
+from hssp.network.downloader.base import DownloaderBase, loads_json
+from hssp.network.recorder import (
+    REPLAY_PATTERNS,
+    iter_records,
+    parse_har_entry,
+    parse_warc_record,
+    read_record,
+    request_key,
+)
+from hssp.network.response import Response
+from hssp.settings.settings import settings
+
+# 记录的位置：(文件序号, 偏移, 长度, 是否压缩)
+RecordLocation = tuple[int, int, int, bool]
+
+
+class ReplayDownloader(DownloaderBase):
+    """
+    回放下载器：不访问网络，从录制的HAR或WARC文件中返回响应，用于可重复的解析和管道压测
+    第一次请求时建立索引，只记录每条记录的位置，请求时再按位置读取
+    建立索引和读取、解压记录都在线程中执行，不阻塞事件循环
+    同一个请求录制了多次时依次循环返回
+    """
+
+    def __init__(self, sem: Semaphore, headers: dict = None, cookies=None, path: str | Path | None = None):
+        """
+        Args:
+            sem: 信号量，控制并发
+            path: 录制文件或目录，默认使用设置中的值
+        """
+        super().__init__(sem, headers, cookies)
+        path = path or settings.replay_path
+        if not path:
+            raise ValueError("回放下载器需要设置录制文件的路径 replay_path")
+
+        self.path = Path(path)
+        self.logger = hssp_logger.getChild("replay")
+        self._cookies = dict(self._default_cookies)
+        self._files: list[Path] = []
+        self._handles: dict[int, object] = {}
+        # 多个线程共用文件对象，定位和读取需要加锁
+        self._handles_lock = threading.Lock()
+        self._index: dict[tuple[str, str, str], list[RecordLocation]] = {}
+        self._cursor: dict[tuple[str, str, str], int] = {}
+        self._index_task: asyncio.Task | None = None
+
+    @property
+    def cookies(self):
+        return self._cookies
+
+    def set_proxy(self, proxy: str | None): ...
+
+    def _record_files(self) -> list[Path]:
+        if self.path.is_file():
+            return [self.path]
+        return sorted({file for pattern in REPLAY_PATTERNS for file in self.path.rglob(pattern)})
+
+    @staticmethod
+    def _parse(file: Path, data: bytes) -> dict | None:
+        if ".warc" in file.name:
+            return parse_warc_record(data)
+        return parse_har_entry(data)
+
+    def build_index(self):
+        """
+        遍历录制文件，记录每个请求对应的记录位置
+        Returns:
+
+        """
+        self._files = self._record_files()
+        index: dict[tuple[str, str, str], list[RecordLocation]] = {}
+        for file_index, file in enumerate(self._files):
+            for offset, length, compressed, data in iter_records(file):
+                record = self._parse(file, data)
+                if record is None:
+                    continue
+                index.setdefault(record["key"], []).append((file_index, offset, length, compressed))
+        self._index = index
+        self.logger.info(f"回放索引建立完成，共 {len(self._files)} 个文件 {len(index)} 个请求")
+
+    async def _ensure_index(self):
+        if self._index_task is None:
+            self._index_task = asyncio.create_task(asyncio.to_thread(self.build_index))
+        await self._index_task
+
+    def _load(self, location: RecordLocation) -> dict:
+        """
+        按位置读取并解析一条记录，在线程中调用
+        Args:
+            location: 记录的位置
+
+        Returns:
+
+        """
+        file_index, offset, length, compressed = location
+        with self._handles_lock:
+            handle = self._handles.get(file_index)
+            if handle is None:
+                handle = self._handles[file_index] = open(self._files[file_index], "rb")  # noqa: SIM115
+            data = read_record(handle, offset, length, False)
+        # 解压和解析不需要持有锁
+        if compressed:
+            data = gzip.decompress(data)
+        return self._parse(self._files[file_index], data)
+
+    async def _download(self, request_data: RequestModel) -> Response:
+        await self._ensure_index()
+
+        key = request_key(request_data)
+        locations = self._index.get(key)
+        if not locations:
+            if request_data.raise_status:
+                raise RequestStateException(code=404)
+            return Response(
+                url=request_data.url,
+                status_code=404,
+                headers={},
+                cookies={},
+                client_cookies=self.cookies,
+                content=b"",
+                text="",
+                json=None,
+                request_data=request_data,
+            )
+
+        cursor = self._cursor.get(key, 0)
+        self._cursor[key] = cursor + 1
+        record = await asyncio.to_thread(self._load, locations[cursor % len(locations)])
+
+        status_code = record["status_code"]
+        if not 200 <= status_code < 300 and request_data.raise_status:
+            raise RequestStateException(code=status_code)
+
+        self._cookies.update(record["cookies"])
+        return Response(
+            url=record["url"],
+            status_code=status_code,
+            headers=record["headers"],
+            cookies=record["cookies"],
+            client_cookies=self.cookies,
+            content=record["content"],
+            # 文本由Response按需解码
+            text=None,
+            json=loads_json(record["content"], record["headers"]),
+            request_data=request_data,
+        )
+
+    async def close(self):
+        with self._handles_lock:
+            handles, self._handles = self._handles, {}
+        for handle in handles.values():
+            handle.close()
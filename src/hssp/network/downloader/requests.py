@@ -1,11 +1,11 @@
 from asyncio import Semaphore
 
-from requests import JSONDecodeError, Session
+from requests import Session
 from requests.utils import cookiejar_from_dict, dict_from_cookiejar
 
 from hssp.exception.exception import RequestStateException
 from hssp.models.net import RequestModel
-from hssp.network.downloader.base import DownloaderBase
+from hssp.network.downloader.base import DownloaderBase, loads_json, prepare_body
 from hssp.network.response import Response
 
 
@@ -21,7 +21,7 @@ class RequestsDownloader(DownloaderBase):
     async def close(self):
         self.client.close()
 
-    def set_proxy(self, proxy: str): ...
+    def set_proxy(self, proxy: str | None): ...
 
     @property
     def cookies(self):
@@ -30,14 +30,14 @@ class RequestsDownloader(DownloaderBase):
     async def _download(self, request_data: RequestModel) -> Response:
         proxies = {"https": request_data.proxy, "http": request_data.proxy}
 
+        data, headers = prepare_body(request_data)
         response = self.client.request(
             method=request_data.method,
             url=request_data.url,
             params=request_data.url_params,
-            data=request_data.form_data,
-            json=request_data.json_data,
+            data=data,
             cookies=request_data.cookies,
-            headers=request_data.headers,
+            headers=headers,
             proxies=proxies,
             timeout=request_data.timeout,
         )
@@ -47,12 +47,8 @@ class RequestsDownloader(DownloaderBase):
 
         resp_headers = dict(response.headers)
         resp_content = response.content
-        resp_text = response.text
         resp_cookies = dict_from_cookiejar(response.cookies)
-        try:
-            resp_json = response.json()
-        except (JSONDecodeError, UnicodeDecodeError):
-            resp_json = None
+        resp_json = loads_json(resp_content, resp_headers, check_type=False)
 
         return Response(
             url=response.url.__str__(),
@@ -61,7 +57,8 @@ class RequestsDownloader(DownloaderBase):
             cookies=resp_cookies,
             client_cookies=self.cookies,
             content=resp_content,
-            text=resp_text,
+            # 文本由Response按需解码，只解码一次
+            text=None,
             json=resp_json,
             request_data=request_data,
         )
@@ -0,0 +1,243 @@
+import random
+import time
+from asyncio import Semaphore
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+
+from furl import furl
+
+from hssp.exception.exception import RequestStateException
+from hssp.logger.log import hssp_logger
+from hssp.models.net import DownloaderEnum, RequestModel, RouteStatsModel
+from hssp.network.downloader.base import DownloaderBase
+from hssp.network.downloader.registry import get_downloader_cls
+from hssp.network.response import Response
+from hssp.settings.settings import settings
+
+# 说明下载器被拦截或服务不可用的状态码，其余状态码说明下载器本身工作正常
+FAILURE_STATUS = frozenset({403, 429})
+
+# 平均耗时的平滑系数
+LATENCY_ALPHA = 0.2
+
+
+class _BackendStats:
+    """
+    某个主机使用某个下载器的统计
+    """
+
+    __slots__ = ("attempts", "successes", "failures", "latency")
+
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.latency: float | None = None
+
+    @property
+    def finished(self) -> int:
+        return self.successes + self.failures
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.finished if self.finished else 0
+
+    def record(self, success: bool, elapsed: float):
+        if not success:
+            self.failures += 1
+            return
+
+        self.successes += 1
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += LATENCY_ALPHA * (elapsed - self.latency)
+
+
+class RouterDownloader(DownloaderBase):
+    """
+    路由下载器：按主机规则把请求交给不同的下载器，比如需要TLS指纹的站点使用curl_cffi，其余使用aiohttp
+    自动模式下为没有规则的主机轮流尝试候选下载器，统计成功率和耗时，之后使用表现最好的一个
+    所有下载器共用一个Net，请求前、响应后的信号和重试只有一套
+    """
+
+    def __init__(
+        self,
+        sem: Semaphore,
+        headers: dict = None,
+        cookies=None,
+        rules: dict[str, DownloaderEnum | str | type[DownloaderBase]] | None = None,
+        default: DownloaderEnum | str | type[DownloaderBase] | None = None,
+        auto: bool | None = None,
+        candidates: list[DownloaderEnum | str | type[DownloaderBase]] | None = None,
+    ):
+        """
+        Args:
+            sem: 信号量，控制并发，所有下载器共用
+            rules: 主机对应的下载器，包含子域名，默认使用设置中的值
+            default: 没有匹配规则时使用的下载器，默认使用设置中的值
+            auto: 是否为没有规则的主机自动选择下载器，默认使用设置中的值
+            candidates: 自动选择时尝试的下载器，默认使用设置中的值
+        """
+        super().__init__(sem, headers, cookies)
+        self.logger = hssp_logger.getChild("router")
+
+        rules = settings.route_rules if rules is None else rules
+        self.rules = {host.lower().lstrip("."): get_downloader_cls(value) for host, value in rules.items()}
+        self.default = get_downloader_cls(default or settings.route_default)
+        self.auto = settings.route_auto if auto is None else auto
+        self.candidates = [get_downloader_cls(value) for value in (candidates or settings.route_candidates)]
+
+        self._downloaders: dict[type[DownloaderBase], DownloaderBase] = {}
+        self._proxy: str | None = None
+        # 主机 -> 下载器 -> 统计，按最近使用淘汰，跨大量域名抓取时不会一直增长
+        self._stats: OrderedDict[str, dict[type[DownloaderBase], _BackendStats]] = OrderedDict()
+        # 规则匹配结果的缓存
+        self._route_cache: OrderedDict[str, type[DownloaderBase] | None] = OrderedDict()
+
+    def _get_downloader(self, downloader_cls: type[DownloaderBase]) -> DownloaderBase:
+        downloader = self._downloaders.get(downloader_cls)
+        if downloader is None:
+            # 并发由路由下载器控制，子下载器不再使用信号量
+            downloader = downloader_cls(None, self._default_headers, self._default_cookies)
+            if self._proxy:
+                downloader.set_proxy(self._proxy)
+            self._downloaders[downloader_cls] = downloader
+        return downloader
+
+    @staticmethod
+    def _trim(cache: OrderedDict):
+        while len(cache) > settings.route_cache_size:
+            cache.popitem(last=False)
+
+    def _match_rule(self, host: str) -> type[DownloaderBase] | None:
+        if host in self._route_cache:
+            self._route_cache.move_to_end(host)
+            return self._route_cache[host]
+
+        # 最长的规则优先
+        matched, matched_len = None, -1
+        for rule_host, downloader_cls in self.rules.items():
+            if (host == rule_host or host.endswith(f".{rule_host}")) and len(rule_host) > matched_len:
+                matched, matched_len = downloader_cls, len(rule_host)
+        self._route_cache[host] = matched
+        self._trim(self._route_cache)
+        return matched
+
+    def _choose_auto(self, host: str) -> type[DownloaderBase]:
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = self._stats[host] = {}
+            self._trim(self._stats)
+        else:
+            self._stats.move_to_end(host)
+        for downloader_cls in self.candidates:
+            stats.setdefault(downloader_cls, _BackendStats())
+
+        # 每个候选下载器都有足够的完成次数之前，轮流分配给请求数最少的，避免并发时都分给同一个
+        if any(stats[cls].finished < settings.route_min_samples for cls in self.candidates):
+            return min(self.candidates, key=lambda cls: stats[cls].attempts)
+
+        if random.random() < settings.route_explore_rate:
+            return random.choice(self.candidates)
+
+        # 成功率优先，相近时选耗时少的
+        return max(
+            self.candidates,
+            key=lambda cls: (round(stats[cls].success_rate, 1), -(stats[cls].latency or float("inf"))),
+        )
+
+    def route(self, url: str) -> type[DownloaderBase]:
+        """
+        获取url使用的下载器
+        Args:
+            url: 地址
+
+        Returns:
+
+        """
+        return self._route_host(self._host(url))
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return (furl(url).host or "").lower()
+
+    def _route_host(self, host: str) -> type[DownloaderBase]:
+        downloader_cls = self._match_rule(host)
+        if downloader_cls is not None:
+            return downloader_cls
+        if self.auto:
+            return self._choose_auto(host)
+        return self.default
+
+    def _is_success(self, response: Response | None, exception: BaseException | None) -> bool:
+        if isinstance(exception, RequestStateException):
+            return exception.code not in FAILURE_STATUS and exception.code < 500
+        if exception is not None:
+            return False
+        return response.status_code not in FAILURE_STATUS and response.status_code < 500
+
+    def _record(self, host: str, downloader_cls, success: bool, elapsed: float):
+        stats = self._stats.get(host, {}).get(downloader_cls)
+        if stats is not None:
+            stats.record(success, elapsed)
+
+    async def _download(self, request: RequestModel) -> Response:
+        host = self._host(request.url)
+        downloader_cls = self._route_host(host)
+        stats = self._stats.get(host, {}).get(downloader_cls)
+        if stats is not None:
+            stats.attempts += 1
+
+        start_time = time.perf_counter()
+        try:
+            response = await self._get_downloader(downloader_cls)._download(request)
+        except Exception as exception:
+            self._record(host, downloader_cls, self._is_success(None, exception), time.perf_counter() - start_time)
+            raise
+
+        self._record(host, downloader_cls, self._is_success(response, None), time.perf_counter() - start_time)
+        self.logger.debug(f"{request.url} 使用 {downloader_cls.__name__} 下载")
+        return response
+
+    async def _stream(self, request: RequestModel, chunk_size: int) -> AsyncIterator[bytes]:
+        downloader = self._get_downloader(self.route(request.url))
+        async for chunk in downloader._stream(request, chunk_size):
+            yield chunk
+
+    def report(self) -> list[RouteStatsModel]:
+        """
+        自动选择的统计
+        Returns:
+
+        """
+        return [
+            RouteStatsModel(
+                host=host,
+                downloader=downloader_cls.__name__,
+                attempts=stats.attempts,
+                successes=stats.successes,
+                failures=stats.failures,
+                success_rate=stats.success_rate,
+                latency=stats.latency,
+            )
+            for host, host_stats in self._stats.items()
+            for downloader_cls, stats in host_stats.items()
+        ]
+
+    @property
+    def cookies(self):
+        cookies = dict(self._default_cookies)
+        for downloader in self._downloaders.values():
+            cookies.update(downloader.cookies)
+        return cookies
+
+    def set_proxy(self, proxy: str | None):
+        self._proxy = proxy
+        for downloader in self._downloaders.values():
+            downloader.set_proxy(proxy)
+
+    async def close(self):
+        downloaders, self._downloaders = self._downloaders, {}
+        for downloader in downloaders.values():
+            await downloader.close()
@@ -0,0 +1,195 @@
+import asyncio
+import contextlib
+import mmap
+import tempfile
+import weakref
+from collections.abc import AsyncIterator
+
+from hssp.exception.exception import ResponseTooLargeException
+from hssp.logger.log import hssp_logger
+from hssp.settings.settings import settings
+
+# 流式读取响应体时每块的大小
+CHUNK_SIZE = 64 * 1024
+
+
+def is_streaming_body() -> bool:
+    """
+    是否需要流式读取响应体，设置了写入临时文件或最大响应体时才需要
+    Returns:
+
+    """
+    return bool(settings.spill_threshold or settings.max_body_size)
+
+
+def check_body_size(size: int | None):
+    """
+    检查响应体大小是否超过限制
+    Args:
+        size: 响应体大小
+
+    Returns:
+
+    """
+    if size and settings.max_body_size and size > settings.max_body_size:
+        raise ResponseTooLargeException(size, settings.max_body_size)
+
+
+def _mmap_file(file) -> mmap.mmap:
+    file.flush()
+    # mmap会持有自己的文件描述符，临时文件关闭后自动删除，映射依然可用
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def spill_bytes(content: bytes) -> mmap.mmap:
+    """
+    把响应体写入临时文件并通过mmap访问
+    Args:
+        content: 响应体
+
+    Returns:
+        返回只读的mmap对象
+    """
+    with tempfile.TemporaryFile() as file:
+        file.write(content)
+        return _mmap_file(file)
+
+
+async def read_body(chunks: AsyncIterator[bytes], content_length: int | None = None) -> bytes | mmap.mmap:
+    """
+    流式读取响应体，超过最大响应体时放弃，超过写入阈值时转为写入临时文件
+    Args:
+        chunks: 响应体的异步迭代器
+        content_length: 响应头中的长度，可以提前判断是否超过限制
+
+    Returns:
+        返回字节或mmap对象
+    """
+    check_body_size(content_length)
+
+    spill_threshold = settings.spill_threshold
+    buffer = bytearray()
+    file = None
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            check_body_size(size)
+            if file is not None:
+                file.write(chunk)
+                continue
+
+            buffer += chunk
+            if spill_threshold and len(buffer) > spill_threshold:
+                # 文件在读取结束后关闭
+                file = tempfile.TemporaryFile()  # noqa: SIM115
+                file.write(buffer)
+                buffer = bytearray()
+        if file is not None:
+            return _mmap_file(file)
+    finally:
+        if file is not None:
+            file.close()
+
+    return bytes(buffer)
+
+
+class MemoryBudget:
+    """
+    在途响应体的内存预算：响应对象存活期间占用预算，被回收后释放
+    预算用完时新的下载会等待，等待超时后照常下载，响应体写入临时文件；写入临时文件的响应体不占用预算
+    """
+
+    def __init__(self, limit: int | None = None):
+        """
+        Args:
+            limit: 字节预算，默认使用设置中的值
+        """
+        self._limit = limit
+        self.used = 0
+        self._waiters: list[asyncio.Future] = []
+        self.logger = hssp_logger.getChild("memory")
+
+    @property
+    def limit(self) -> int | None:
+        return self._limit if self._limit is not None else settings.memory_budget
+
+    def exhausted(self) -> bool:
+        limit = self.limit
+        return bool(limit) and self.used >= limit
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """
+        等待预算可用，响应对象一直不被回收时（比如gather收集全部结果）不会一直等待
+        Args:
+            timeout: 最多等待的秒数，默认使用设置中的值，None为一直等待
+
+        Returns:
+            预算可用时返回True，超时返回False
+        """
+        if timeout is None:
+            timeout = settings.memory_budget_timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        while self.exhausted():
+            remaining = deadline - loop.time() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                self.logger.debug(f"等待内存预算超时 {self.used}/{self.limit}，响应体写入临时文件")
+                return False
+
+            future = loop.create_future()
+            self._waiters.append(future)
+            self.logger.debug(f"内存预算已用完 {self.used}/{self.limit}，等待释放")
+            try:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(future, remaining)
+            finally:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+        return True
+
+    def track(self, response, size: int):
+        """
+        记录响应占用的预算，响应被回收时自动释放
+        Args:
+            response: 响应对象
+            size: 占用的字节数
+
+        Returns:
+
+        """
+        if not size or not self.limit:
+            return
+
+        self.used += size
+        weakref.finalize(response, self.release, size)
+
+    def release(self, size: int):
+        """
+        释放预算并唤醒等待的下载
+        Args:
+            size: 释放的字节数
+
+        Returns:
+
+        """
+        self.used = max(self.used - size, 0)
+        if self.exhausted():
+            return
+
+        waiters, self._waiters = self._waiters, []
+        for future in waiters:
+            if future.done():
+                continue
+            # finalize可能不在事件循环中执行，通过call_soon_threadsafe唤醒
+            # 事件循环已经关闭时忽略
+            with contextlib.suppress(RuntimeError):
+                future.get_loop().call_soon_threadsafe(self._wake, future)
+
+    @staticmethod
+    def _wake(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+
+
+memory_budget = MemoryBudget()
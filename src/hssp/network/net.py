@@ -1,74 +1,138 @@
+import asyncio
 import functools
+import time
+import weakref
 from asyncio import Semaphore
+from collections.abc import AsyncIterator, Callable
 from inspect import iscoroutinefunction
+from types import MappingProxyType
 from typing import Any
 
-from blinker import Signal
-from blinker import signal as get_signal
-from fake_useragent import FakeUserAgent
+from blinker import NamedSignal, Signal
+from furl import furl
 from httpx import QueryParams
 from tenacity import (
     AsyncRetrying,
     Future,
     RetryCallState,
+    retry_if_not_exception_type,
     stop_after_attempt,
     wait_fixed,
     wait_random,
 )
 
-from hssp.exception.exception import RequestException, RequestStateException
-from hssp.logger.log import hssp_logger
-from hssp.models.net import DownloaderEnum, RequestModel
-from hssp.network.downloader import (
-    AiohttpDownloader,
-    CurlCffiDownloader,
-    HttpxDownloader,
-    RequestsDownloader,
-    RequestsGoDownloader,
+from hssp.exception.exception import (
+    RequestException,
+    RequestStateException,
+    ResponseTooLargeException,
+    RobotsDisallowException,
 )
+from hssp.logger.log import hssp_logger
+from hssp.models.net import DownloaderEnum, RequestModel, WarmupReportModel
+from hssp.network.coalesce import RequestCoalescer
+from hssp.network.downloader import RequestsDownloader, RouterDownloader, get_downloader_cls
 from hssp.network.downloader.base import DownloaderBase
+from hssp.network.memory import CHUNK_SIZE
+from hssp.network.paginate import PageIterator, Paginator
+from hssp.network.resolver import shared_resolver
 from hssp.network.response import Response
 from hssp.settings.settings import settings
+from hssp.settings.watcher import settings_changed_signal
+from hssp.utils.concurrency import ResizableSemaphore
+from hssp.utils.rand import FAKE_USER_AGENT_ATTRS, rand_user_agent
+
+
+def disconnect_all(signal: Signal):
+    """
+    断开信号的所有接收者
+    Args:
+        signal: 信号
+
+    Returns:
+
+    """
+    for receiver in list(signal.receivers.values()):
+        # 弱引用连接的接收者需要先取出来
+        if isinstance(receiver, weakref.ref):
+            receiver = receiver()
+        if receiver is not None:
+            signal.disconnect(receiver)
 
 
 class Net:
     def __init__(
         self,
         downloader_cls: type[DownloaderBase] | DownloaderEnum = DownloaderEnum.AIOHTTP,
-        sem: Semaphore = None,
+        sem: Semaphore | ResizableSemaphore = None,
     ):
         """
         Args:
             downloader_cls: 使用的下载器
-            sem: 信号量，控制并发
+            sem: 信号量，控制并发，默认在配置了并发量时按配置限制，否则不限制，设置重新加载后自动调整
         """
+        # 没有传入信号量时，并发量跟随设置
+        self._own_sem = sem is None
+        if self._own_sem:
+            sem = ResizableSemaphore(self._configured_concurrency())
+
         match downloader_cls:
-            case DownloaderEnum.AIOHTTP:
-                downloader_cls = AiohttpDownloader
-            case DownloaderEnum.HTTPX:
-                downloader_cls = HttpxDownloader
-            case DownloaderEnum.REQUESTS:
-                downloader_cls = RequestsDownloader
-            case DownloaderEnum.CURL_CFFI:
-                downloader_cls = CurlCffiDownloader
-            case DownloaderEnum.REQUESTS_GO:
-                downloader_cls = RequestsGoDownloader
+            case DownloaderEnum.ROUTER:
+                downloader_cls = RouterDownloader
+            case DownloaderEnum():
+                downloader_cls = get_downloader_cls(downloader_cls)
 
+        # 默认请求头只读，创建请求时复制，避免修改到设置中的请求头
+        self._default_headers = self._build_default_headers()
         self._downloader = downloader_cls(sem, settings.headers, settings.cookies)
         self.logger = hssp_logger.getChild("net")
+        # 合并进行中的相同请求，是否合并由设置决定
+        self._coalescer = RequestCoalescer()
 
         if downloader_cls.__name__ == RequestsDownloader.__name__:
             self.logger.warning("不建议使用request下载器，无法发挥异步的性能")
 
-        # net id
-        self_id = id(self)
-
+        # 每个Net独立的信号，不注册到blinker的全局命名空间，Net被回收或关闭后随之释放
         # 请求重试信号
-        self.request_retry_signal = get_signal(f"request_retry##{self_id}")
+        self.request_retry_signal = NamedSignal("request_retry")
         # 请求之前信号
-        self.request_before_signal = get_signal(f"request_before##{self_id}")
+        self.request_before_signal = NamedSignal("request_before")
         # 响应之后信号
-        self.response_after_signal = get_signal(f"response_signal##{self_id}")
+        self.response_after_signal = NamedSignal("response_after")
+
+        # 设置重新加载时调整，弱引用连接，Net被回收后自动断开
+        settings_changed_signal.connect(self._on_settings_changed)
+
+    def _on_settings_changed(self, changes: dict[str, tuple[Any, Any]]):
+        """
+        设置重新加载后，把需要调整的设置应用到下载器，其余设置在创建请求时读取，自动生效
+        Args:
+            changes: 变化的字段
+
+        Returns:
+
+        """
+        sem = self._downloader.sem
+        if "concurrency" in changes and self._own_sem and isinstance(sem, ResizableSemaphore):
+            sem.resize(self._configured_concurrency())
+            self.logger.info(f"并发量调整为 {sem.value}，当前进行中的请求数 {sem.in_use}")
+        if "headers" in changes:
+            self._default_headers = self._build_default_headers()
+        if "proxy" in changes:
+            # 没有指定代理的请求会使用下载器的默认代理，代理被清除时也要同步
+            self._downloader.set_proxy(settings.proxy)
+
+    @staticmethod
+    def _configured_concurrency() -> int | None:
+        """
+        配置文件或环境变量中设置了并发量时返回并发量，否则返回None，不限制并发
+        Returns:
+
+        """
+        return settings.concurrency if "concurrency" in settings.model_fields_set else None
+
+    @staticmethod
+    def _build_default_headers() -> MappingProxyType:
+        return MappingProxyType(dict(settings.headers or {}))
 
     def get_cookies(self):
         """
@@ -86,6 +150,98 @@ class Net:
         """
         await self._downloader.close()
 
+        # 释放挂载的钩子，钩子持有的对象可以被回收
+        for signal in (self.request_retry_signal, self.request_before_signal, self.response_after_signal):
+            disconnect_all(signal)
+        settings_changed_signal.disconnect(self._on_settings_changed)
+
+    async def prefetch_dns(self, urls: list[str]) -> dict[str, bool]:
+        """
+        预解析待请求url的主机，结果写入共享的DNS缓存
+        Args:
+            urls: url列表
+
+        Returns:
+            返回每个主机是否解析成功
+        """
+        return await shared_resolver.prefetch(urls)
+
+    async def warmup(
+        self,
+        hosts: list[str],
+        connections_per_host: int = 2,
+        path: str = "/",
+        method: str = "HEAD",
+        proxy: str | None = None,
+    ) -> list[WarmupReportModel]:
+        """
+        预热连接：提前为每个主机建立连接放入连接池，之后的请求直接复用，省去DNS、TCP和TLS握手
+        TLS会话是否复用取决于下载器，curl_cffi默认缓存TLS会话，aiohttp、httpx通过连接池的长连接复用
+        预热请求不会触发请求前、响应后的信号，也不会重试
+        Args:
+            hosts: 主机列表，可以是主机名或url，没有协议时默认使用https
+            connections_per_host: 每个主机预热的连接数
+            path: 预热请求的路径
+            method: 预热请求的方法
+            proxy: 代理设置，默认使用设置中的代理，和之后的请求一致才能复用预热的连接
+
+        Returns:
+            返回每个主机的预热报告
+        """
+        urls = [host if "://" in host else f"https://{host}" for host in hosts]
+        await self.prefetch_dns(urls)
+
+        reports = await asyncio.gather(
+            *[self._warmup_host(furl(url).set(path=path).url, connections_per_host, method, proxy) for url in urls]
+        )
+        for report in reports:
+            self.logger.info(
+                f"预热 {report.host} 成功连接数: {report.connections} 失败连接数: {report.failed} "
+                f"新建连接耗时: {report.cold_time:.3f}s 复用连接耗时: {report.warm_time} "
+                f"预计节省: {report.saved_time:.3f}s"
+            )
+        return list(reports)
+
+    async def _warmup_host(self, url: str, connections: int, method: str, proxy: str | None) -> WarmupReportModel:
+        """
+        预热单个主机，先并发建立连接，再发一个请求测量复用连接的耗时
+        Args:
+            url: 地址
+            connections: 连接数
+            method: 请求方法
+            proxy: 代理设置
+
+        Returns:
+            返回预热报告
+        """
+
+        async def _timed_request() -> float:
+            request_data = self.create_request_model(url, method, proxy=proxy, retrys_count=0, raise_status=False)
+            self._use_proxy(request_data)
+            start_time = time.perf_counter()
+            await self._downloader.download(request_data)
+            return time.perf_counter() - start_time
+
+        results = await asyncio.gather(*[_timed_request() for _ in range(connections)], return_exceptions=True)
+        cold_times = [result for result in results if isinstance(result, float)]
+        report = WarmupReportModel(
+            host=furl(url).host,
+            connections=len(cold_times),
+            failed=len(results) - len(cold_times),
+        )
+        if not cold_times:
+            return report
+
+        report.cold_time = sum(cold_times) / len(cold_times)
+        try:
+            report.warm_time = await _timed_request()
+        except Exception as exception:
+            self.logger.warning(f"预热 {url} 测量复用连接耗时失败: {exception}")
+            return report
+
+        report.saved_time = max(report.cold_time - report.warm_time, 0) * report.connections
+        return report
+
     async def _retry_handler(self, req_data: RequestModel, retry_state: RetryCallState):
         """
         处理重试之后和重试失败
@@ -131,11 +287,20 @@ class Net:
         Returns:
 
         """
+        slow_threshold = settings.slow_receiver_threshold
         for receiver in signal.receivers_for(None):
             if iscoroutinefunction(receiver):
                 result = await receiver(*args, **kwargs)
             else:
+                # 同步的接收者会卡住事件循环，执行太久时指出是哪个接收者
+                start_time = time.perf_counter()
                 result = receiver(*args, **kwargs)
+                elapsed = time.perf_counter() - start_time
+                if slow_threshold is not None and elapsed > slow_threshold:
+                    self.logger.warning(
+                        f"信号 {signal.name} 的同步接收者 {getattr(receiver, '__qualname__', receiver)} "
+                        f"耗时 {elapsed:.3f}s，阻塞了事件循环，建议改为异步或放到线程中执行"
+                    )
 
             yield receiver, result
 
@@ -174,6 +339,47 @@ class Net:
 
         return resp
 
+    async def stream(
+        self,
+        url: str,
+        method: str = "GET",
+        params: dict = None,
+        headers: dict = None,
+        timeout: float = None,
+        proxy: str | None = None,
+        raise_status: bool = True,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> AsyncIterator[bytes]:
+        """
+        流式下载响应体，适合大文件，不经过请求前、响应后的信号，也不重试
+        Args:
+            url: 地址
+            method: 请求方法
+            params: url参数
+            headers: 请求头
+            timeout: 超时时间，流式读取时限制连接和每次读取的时间
+            proxy: 代理设置
+            raise_status: 是否抛出状态码“不符合”的异常
+            chunk_size: 每块的大小
+
+        Returns:
+            返回字节块的异步迭代器
+        """
+        request_data = self.create_request_model(
+            url=url,
+            method=method,
+            params=params,
+            headers=headers,
+            timeout=timeout,
+            proxy=proxy,
+            retrys_count=0,
+            raise_status=raise_status,
+        )
+        self._use_proxy(request_data)
+
+        async for chunk in self._downloader.stream(request_data, chunk_size):
+            yield chunk
+
     def create_request_model(
         self,
         url: str,
@@ -213,13 +419,13 @@ class Net:
 
         # 如果传入的UA是符合FakeUserAgent属性的，则使用FakeUserAgent获取一个假的UA
         user_agent = user_agent or settings.user_agent
-        fake_user_agent_attrs = ["random", "chrome", "googlechrome", "edge", "firefox", "ff", "safari"]
-        user_agent = getattr(FakeUserAgent(), user_agent) if user_agent in fake_user_agent_attrs else user_agent
+        if user_agent in FAKE_USER_AGENT_ATTRS:
+            user_agent = rand_user_agent(user_agent)
 
-        # 更新请求头的UA
-        headers = headers or settings.headers or {}
+        # 复制一份请求头再修改，不影响传入的请求头和默认请求头
+        headers = dict(headers) if headers else dict(self._default_headers)
         if user_agent:
-            headers.update({"User-Agent": user_agent})
+            headers["User-Agent"] = user_agent
 
         # 处理 POST form的数据
         # 有些情况form数据的key是相同的，而且还要求顺序，这时使用dict就无法实现
@@ -247,18 +453,40 @@ class Net:
 
         return request_data
 
+    def _use_proxy(self, request_data: RequestModel):
+        """
+        请求带有代理时设置到下载器，有些下载器不能在请求时设置代理
+        Args:
+            request_data: 请求模型
+
+        Returns:
+
+        """
+        if request_data.proxy:
+            self._downloader.set_proxy(request_data.proxy)
+
     async def request(self, data: RequestModel) -> Response:
         """
-        发起异步请求
+        发起异步请求，开启合并时相同的请求正在进行中则等待并共用它的响应
         Args:
             data: 请求参数
 
         Returns:
             返回响应
         """
-        if data.proxy:
-            self._downloader.set_proxy(data.proxy)
+        self._use_proxy(data)
+
+        return await self._coalescer.run(data, functools.partial(self._request_with_retry, data))
 
+    async def _request_with_retry(self, data: RequestModel) -> Response:
+        """
+        按请求的重试设置发起请求
+        Args:
+            data: 请求参数
+
+        Returns:
+            返回响应
+        """
         if data.retrys_count < 1:
             return await self._request(data)
 
@@ -268,6 +496,10 @@ class Net:
         # 异步重试
         retry_resp = AsyncRetrying(
             stop=stop_after_attempt(data.retrys_count),
+            # 响应体超过限制、robots.txt不允许时重试也没有意义，被取消的请求不能重试
+            retry=retry_if_not_exception_type(
+                (ResponseTooLargeException, RobotsDisallowException, asyncio.CancelledError)
+            ),
             after=functools.partial(self._retry_handler, data),
             retry_error_callback=functools.partial(self._retry_handler, data),
             wait=wait,
@@ -424,3 +656,115 @@ class Net:
         )
 
         return await self.request(request_data)
+
+    def template(self, url: str, method: str = "GET", **kwargs) -> "RequestTemplate":
+        """
+        创建请求模板，适用于只有参数变化的接口
+        Args:
+            url: 地址
+            method: 请求方法
+            **kwargs: 其他参数，同 create_request_model
+
+        Returns:
+            返回请求模板
+        """
+        return RequestTemplate(self, self.create_request_model(url, method, **kwargs))
+
+    def paginate(
+        self,
+        url: str,
+        paginator: Paginator,
+        method: str = "GET",
+        items: str | Callable[[Response], Any] | None = None,
+        prefetch: int | None = None,
+        max_pages: int | None = None,
+        **kwargs,
+    ) -> PageIterator:
+        """
+        分页迭代，按顺序返回每一页的响应，遇到空页或重复页时结束
+        页码、偏移量可以预测时最多提前请求 prefetch 页；游标、下一页链接只能在拿到当前页后请求下一页
+        中途退出循环时用 contextlib.aclosing 包裹，立即取消提前请求的页
+        Args:
+            url: 地址
+            paginator: 分页方式，PagePaginator、OffsetPaginator、CursorPaginator 或 NextLinkPaginator
+            method: 请求方法
+            items: 取出页中数据的方法，用于判断空页和重复页。可以是json中点分隔的路径，或者接收响应返回数据的函数
+            prefetch: 最多提前请求的页数，默认使用设置中的值
+            max_pages: 最多请求的页数，为空时不限制
+            **kwargs: 其他参数，同 create_request_model
+
+        Returns:
+            返回响应的异步迭代器
+        """
+        return PageIterator(self.template(url, method, **kwargs), paginator, items, prefetch, max_pages)
+
+
+class RequestTemplate:
+    """
+    请求模板：默认设置、请求头、UA和form编码只处理一次，每次请求只复制模型并替换变化的部分
+    UA在创建模板时确定，使用 random 等随机UA时每个模板固定为同一个
+    """
+
+    def __init__(self, net: Net, request_data: RequestModel):
+        """
+        Args:
+            net: 网络请求对象
+            request_data: 校验过的请求模型
+        """
+        self.net = net
+        self.request_data = request_data
+
+    def build(
+        self,
+        params: dict = None,
+        json_data: dict = None,
+        form_data: dict[str, Any] | list[tuple[str]] | str | bytes | None = None,
+        url: str | None = None,
+    ) -> RequestModel:
+        """
+        基于模板创建请求模型，不再校验
+        Args:
+            params: url参数，和模板的参数合并
+            json_data: json参数，替换模板的参数
+            form_data: form参数，替换模板的参数
+            url: 地址，替换模板的地址
+
+        Returns:
+            返回请求模型
+        """
+        # 请求头复制一份，请求中间件修改时不影响模板
+        headers = dict(self.request_data.headers or {})
+        update: dict[str, Any] = {"headers": headers}
+        if url is not None:
+            update["url"] = url
+        if params:
+            update["url_params"] = {**(self.request_data.url_params or {}), **params}
+        if json_data is not None:
+            update["json_data"] = json_data
+        if form_data is not None:
+            if isinstance(form_data, list | dict):
+                form_data = QueryParams(form_data).__str__()
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+            update["form_data"] = form_data
+
+        return self.request_data.model_copy(update=update)
+
+    async def request(
+        self,
+        params: dict = None,
+        json_data: dict = None,
+        form_data: dict[str, Any] | list[tuple[str]] | str | bytes | None = None,
+        url: str | None = None,
+    ) -> Response:
+        """
+        基于模板发起请求
+        Args:
+            params: url参数，和模板的参数合并
+            json_data: json参数，替换模板的参数
+            form_data: form参数，替换模板的参数
+            url: 地址，替换模板的地址
+
+        Returns:
+            返回响应
+        """
+        return await self.net.request(self.build(params, json_data, form_data, url))
@@ -0,0 +1,308 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+from urllib.parse import urljoin
+
+from hssp.logger.log import hssp_logger
+from hssp.models.net import RequestModel
+from hssp.network.response import Response
+from hssp.settings.settings import settings
+from hssp.utils.codec import get_path, json_loads
+
+
+def _response_json(response: Response) -> Any:
+    if response.json is not None:
+        return response.json
+    return json_loads(response.content if isinstance(response.content, bytes) else bytes(response.content))
+
+
+def _with_value(template, key: str, value: Any, in_json: bool) -> RequestModel:
+    """
+    基于模板创建请求，把分页参数放到url参数或json参数中
+    """
+    if in_json:
+        return template.build(json_data={**(template.request_data.json_data or {}), key: value})
+    return template.build(params={key: value})
+
+
+class Paginator:
+    """
+    分页方式的基类
+    页码可以预测时实现 request_for，可以提前请求后面的页；否则实现 next_request，从当前页中取出下一页
+    """
+
+    # 是否可以不看响应直接算出第N页的请求
+    predictable: bool = False
+
+    def request_for(self, template, index: int) -> RequestModel:
+        """
+        第N页的请求，只有页码可以预测时调用
+        Args:
+            template: 请求模板
+            index: 页的序号，从0开始
+
+        Returns:
+
+        """
+        raise NotImplementedError
+
+    def first_request(self, template) -> RequestModel:
+        """
+        第一页的请求
+        Args:
+            template: 请求模板
+
+        Returns:
+
+        """
+        return template.build()
+
+    def next_request(self, template, response: Response) -> RequestModel | None:
+        """
+        从当前页中取出下一页的请求，没有下一页时返回None
+        Args:
+            template: 请求模板
+            response: 当前页的响应
+
+        Returns:
+
+        """
+        raise NotImplementedError
+
+
+class PagePaginator(Paginator):
+    """
+    按页码分页，比如 ?page=1、?page=2
+    """
+
+    predictable = True
+
+    def __init__(self, param: str = "page", start: int = 1, step: int = 1, in_json: bool = False):
+        """
+        Args:
+            param: 页码参数名
+            start: 第一页的页码
+            step: 每页页码的增量
+            in_json: 页码是否放在json参数中，否则放在url参数中
+        """
+        self.param = param
+        self.start = start
+        self.step = step
+        self.in_json = in_json
+
+    def request_for(self, template, index: int) -> RequestModel:
+        return _with_value(template, self.param, self.start + index * self.step, self.in_json)
+
+    def first_request(self, template) -> RequestModel:
+        return self.request_for(template, 0)
+
+
+class OffsetPaginator(PagePaginator):
+    """
+    按偏移量分页，比如 ?offset=0&limit=20、?offset=20&limit=20
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        param: str = "offset",
+        limit_param: str | None = "limit",
+        start: int = 0,
+        in_json: bool = False,
+    ):
+        """
+        Args:
+            limit: 每页的数量
+            param: 偏移量参数名
+            limit_param: 每页数量的参数名，为空时不传
+            start: 第一页的偏移量
+            in_json: 参数是否放在json参数中，否则放在url参数中
+        """
+        super().__init__(param, start, limit, in_json)
+        self.limit = limit
+        self.limit_param = limit_param
+
+    def request_for(self, template, index: int) -> RequestModel:
+        request_data = super().request_for(template, index)
+        if not self.limit_param:
+            return request_data
+        if self.in_json:
+            request_data.json_data[self.limit_param] = self.limit
+        else:
+            request_data.url_params[self.limit_param] = self.limit
+        return request_data
+
+
+class CursorPaginator(Paginator):
+    """
+    按游标分页，下一页的游标从当前页的json中取出，没有游标时结束
+    """
+
+    def __init__(self, path: str, param: str = "cursor", in_json: bool = False):
+        """
+        Args:
+            path: 游标在响应json中点分隔的路径，比如 data.next_cursor
+            param: 游标参数名
+            in_json: 游标是否放在json参数中，否则放在url参数中
+        """
+        self.path = path
+        self.param = param
+        self.in_json = in_json
+
+    def next_request(self, template, response: Response) -> RequestModel | None:
+        try:
+            cursor = get_path(_response_json(response), self.path)
+        except (KeyError, IndexError, TypeError):
+            return None
+        if cursor in (None, ""):
+            return None
+        return _with_value(template, self.param, cursor, self.in_json)
+
+
+class NextLinkPaginator(Paginator):
+    """
+    按下一页链接分页，链接从当前页中用xpath取出，相对地址按当前页补全
+    """
+
+    def __init__(self, xpath: str = "//a[@rel='next']/@href | //link[@rel='next']/@href"):
+        """
+        Args:
+            xpath: 下一页链接的xpath
+        """
+        self.xpath = xpath
+
+    def next_request(self, template, response: Response) -> RequestModel | None:
+        link = response.xpath_get(self.xpath)
+        if not link or not link.strip():
+            return None
+        # 下一页链接中已经带有查询参数，不再合并模板的url参数
+        request_data = template.build(url=urljoin(response.url, link.strip()))
+        request_data.url_params = None
+        return request_data
+
+
+class PageIterator:
+    """
+    分页迭代：页码可以预测时最多提前请求K页，否则在返回当前页之前就开始请求下一页，解析和下载同时进行
+    按页的顺序返回，遇到空页或和之前重复的页时结束；提前请求的页在结束时取消，最多多请求K-1页
+    """
+
+    def __init__(
+        self,
+        template,
+        paginator: Paginator,
+        items: str | Callable[[Response], Any] | None = None,
+        prefetch: int | None = None,
+        max_pages: int | None = None,
+    ):
+        """
+        Args:
+            template: 请求模板
+            paginator: 分页方式
+            items: 取出页中数据的方法，用于判断空页和重复页。可以是json中点分隔的路径，或者接收响应返回数据的函数，
+                   为空时使用整个响应体
+            prefetch: 最多提前请求的页数，默认使用设置中的值，1为不提前请求
+            max_pages: 最多请求的页数，为空时不限制
+        """
+        self.template = template
+        self.paginator = paginator
+        self.items = items
+        self.prefetch = max(prefetch if prefetch is not None else settings.paginate_prefetch, 1)
+        self.max_pages = max_pages
+        self.logger = hssp_logger.getChild("paginate")
+
+    def _page_items(self, response: Response) -> Any:
+        if callable(self.items):
+            return self.items(response)
+        if isinstance(self.items, str):
+            try:
+                return get_path(_response_json(response), self.items)
+            except (KeyError, IndexError, TypeError):
+                return None
+        if response.json is not None:
+            return response.json
+        return response.content if isinstance(response.content, bytes) else bytes(response.content)
+
+    def _is_last(self, response: Response, seen: set[int]) -> bool:
+        """
+        是否已经没有数据了，空页或者和之前的页重复
+        Args:
+            response: 响应
+            seen: 已经返回的页的指纹
+
+        Returns:
+
+        """
+        items = self._page_items(response)
+        if not items:
+            self.logger.debug(f"{response.url} 是空页，分页结束")
+            return True
+
+        # 超出最后一页时有些接口会一直返回最后一页
+        fingerprint = hash(items if isinstance(items, bytes) else repr(items))
+        if fingerprint in seen:
+            self.logger.debug(f"{response.url} 和之前的页重复，分页结束")
+            return True
+        seen.add(fingerprint)
+        return False
+
+    def _reached_max(self, count: int) -> bool:
+        return self.max_pages is not None and count >= self.max_pages
+
+    def __aiter__(self) -> AsyncIterator[Response]:
+        if self.paginator.predictable:
+            return self._iter_predictable()
+        return self._iter_linked()
+
+    async def _iter_predictable(self) -> AsyncIterator[Response]:
+        net = self.template.net
+        tasks: dict[int, asyncio.Task] = {}
+        seen: set[int] = set()
+        next_index = 0
+
+        def _schedule():
+            nonlocal next_index
+            while len(tasks) < self.prefetch and not self._reached_max(next_index):
+                request_data = self.paginator.request_for(self.template, next_index)
+                tasks[next_index] = asyncio.create_task(net.request(request_data))
+                next_index += 1
+
+        index = 0
+        try:
+            _schedule()
+            while index in tasks:
+                response = await tasks.pop(index)
+                if self._is_last(response, seen):
+                    return
+                index += 1
+                # 先补上后面的页再返回，调用者处理当前页时下载继续进行
+                _schedule()
+                yield response
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    async def _iter_linked(self) -> AsyncIterator[Response]:
+        net = self.template.net
+        seen: set[int] = set()
+        count = 1
+        task = asyncio.create_task(net.request(self.paginator.first_request(self.template)))
+        try:
+            while task is not None:
+                response = await task
+                task = None
+                if self._is_last(response, seen):
+                    return
+
+                request_data = None
+                if not self._reached_max(count):
+                    request_data = self.paginator.next_request(self.template, response)
+                if request_data is not None:
+                    task = asyncio.create_task(net.request(request_data))
+                    count += 1
+                yield response
+        finally:
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
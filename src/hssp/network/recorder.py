@@ -0,0 +1,495 @@
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import time
+import uuid
+import zlib
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode, urlsplit
+
+from hssp.logger.log import hssp_logger
+from hssp.models.net import RequestModel
+from hssp.network.response import Response
+
+# 录制文件的格式
+RECORD_FORMATS = ("har", "warc")
+
+# 回放目录时读取的录制文件
+REPLAY_PATTERNS = ("*.har.jsonl", "*.har.jsonl.gz", "*.warc", "*.warc.gz")
+
+# gzip文件的开头
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# 录制时去掉的响应头，响应体已经是解压后的内容
+_SKIP_HEADERS = frozenset({"content-encoding", "transfer-encoding", "content-length"})
+
+
+def request_url(request_data: RequestModel) -> str:
+    """
+    拼接带参数的请求地址，录制和回放使用同一个规则
+    Args:
+        request_data: 请求模型
+
+    Returns:
+
+    """
+    if not request_data.url_params:
+        return request_data.url
+    separator = "&" if "?" in request_data.url else "?"
+    return f"{request_data.url}{separator}{urlencode(request_data.url_params, doseq=True)}"
+
+
+def request_body(request_data: RequestModel) -> bytes:
+    """
+    请求体，json按键排序后序列化，保证相同的数据得到相同的结果
+    Args:
+        request_data: 请求模型
+
+    Returns:
+
+    """
+    if request_data.json_data is not None:
+        return json.dumps(request_data.json_data, sort_keys=True, separators=(",", ":")).encode()
+    if isinstance(request_data.form_data, str):
+        return request_data.form_data.encode()
+    if isinstance(request_data.form_data, bytes):
+        return request_data.form_data
+    return b""
+
+
+def body_digest(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest() if body else ""  # nosec
+
+
+def request_key(request_data: RequestModel) -> tuple[str, str, str]:
+    """
+    回放时匹配录制记录的键：方法、带参数的地址、请求体摘要
+    Args:
+        request_data: 请求模型
+
+    Returns:
+
+    """
+    return request_data.method.upper(), request_url(request_data), body_digest(request_body(request_data))
+
+
+def _header_items(headers) -> list[tuple[str, str]]:
+    items = headers.multi_items() if hasattr(headers, "multi_items") else headers.items()
+    return [(str(name), str(value)) for name, value in items]
+
+
+def _http_date() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")  # noqa: UP017
+
+
+def _har_entry(response: Response) -> bytes:
+    request_data = response.request_data
+    body = request_body(request_data)
+    content = bytes(response.content or b"")
+    content_type = next((v for k, v in _header_items(response.headers) if k.lower() == "content-type"), "")
+    entry: dict[str, Any] = {
+        "startedDateTime": _http_date(),
+        "time": 0,
+        "request": {
+            "method": request_data.method.upper(),
+            "url": request_url(request_data),
+            "httpVersion": "HTTP/1.1",
+            "headers": [{"name": k, "value": str(v)} for k, v in (request_data.headers or {}).items()],
+            "cookies": [{"name": k, "value": str(v)} for k, v in (request_data.cookies or {}).items()],
+            "queryString": [],
+            "headersSize": -1,
+            "bodySize": len(body),
+        },
+        "response": {
+            "status": response.status_code,
+            "statusText": "",
+            "httpVersion": "HTTP/1.1",
+            "headers": [
+                {"name": k, "value": v} for k, v in _header_items(response.headers) if k.lower() not in _SKIP_HEADERS
+            ],
+            "cookies": [{"name": k, "value": str(v)} for k, v in (response.cookies or {}).items()],
+            "content": {
+                "size": len(content),
+                "mimeType": content_type,
+                "text": base64.b64encode(content).decode(),
+                "encoding": "base64",
+            },
+            "redirectURL": "",
+            "headersSize": -1,
+            "bodySize": len(content),
+        },
+        "cache": {},
+        "timings": {"send": 0, "wait": 0, "receive": 0},
+        "_finalUrl": response.url,
+        "_bodyDigest": body_digest(body),
+    }
+    if body:
+        entry["request"]["postData"] = {
+            "mimeType": "application/json" if request_data.json_data is not None else "",
+            "text": base64.b64encode(body).decode(),
+            "encoding": "base64",
+        }
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+def _warc_record(record_type: str, url: str, block: bytes, extra: dict[str, str]) -> bytes:
+    headers = {
+        "WARC-Type": record_type,
+        "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+        "WARC-Date": _http_date(),
+        "WARC-Target-URI": url,
+        "Content-Type": f"application/http;msgtype={record_type}",
+        **extra,
+        "Content-Length": str(len(block)),
+    }
+    head = "WARC/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+    return head.encode() + block + b"\r\n\r\n"
+
+
+def _warc_records(response: Response) -> list[bytes]:
+    request_data = response.request_data
+    url = request_url(request_data)
+    body = request_body(request_data)
+    method = request_data.method.upper()
+
+    parts = urlsplit(url)
+    target = parts.path or "/"
+    if parts.query:
+        target = f"{target}?{parts.query}"
+    request_head = f"{method} {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+    request_head += "".join(f"{k}: {v}\r\n" for k, v in (request_data.headers or {}).items())
+    request_record = _warc_record("request", url, request_head.encode() + b"\r\n" + body, {})
+
+    content = bytes(response.content or b"")
+    try:
+        reason = HTTPStatus(response.status_code).phrase
+    except ValueError:
+        reason = ""
+    response_head = f"HTTP/1.1 {response.status_code} {reason}\r\n"
+    response_head += "".join(
+        f"{k}: {v}\r\n" for k, v in _header_items(response.headers) if k.lower() not in _SKIP_HEADERS
+    )
+    response_head += f"Content-Length: {len(content)}\r\n"
+    response_record = _warc_record(
+        "response",
+        url,
+        response_head.encode() + b"\r\n" + content,
+        {
+            "WARC-Concurrent-To": request_record.split(b"WARC-Record-ID: ", 1)[1].split(b"\r\n", 1)[0].decode(),
+            "WARC-Hssp-Method": method,
+            "WARC-Hssp-Body-Digest": body_digest(body) or "-",
+            "WARC-Hssp-Final-URI": response.url,
+        },
+    )
+    return [request_record, response_record]
+
+
+def parse_har_entry(data: bytes) -> dict[str, Any]:
+    """
+    把一条HAR记录解析为回放需要的数据
+    Args:
+        data: 一行HAR记录
+
+    Returns:
+
+    """
+    entry = json.loads(data)
+    response = entry["response"]
+    content = response["content"]
+    body = base64.b64decode(content["text"]) if content.get("encoding") == "base64" else content["text"].encode()
+    return {
+        "key": (entry["request"]["method"], entry["request"]["url"], entry.get("_bodyDigest", "")),
+        "url": entry.get("_finalUrl") or entry["request"]["url"],
+        "status_code": response["status"],
+        "headers": {header["name"]: header["value"] for header in response["headers"]},
+        "cookies": {cookie["name"]: cookie["value"] for cookie in response.get("cookies", [])},
+        "content": body,
+    }
+
+
+def parse_warc_record(data: bytes) -> dict[str, Any] | None:
+    """
+    把一条WARC响应记录解析为回放需要的数据，其他类型的记录返回None
+    Args:
+        data: 一条WARC记录
+
+    Returns:
+
+    """
+    head, _, block = data.partition(b"\r\n\r\n")
+    warc_headers = dict(line.split(": ", 1) for line in head.decode().split("\r\n")[1:] if ": " in line)
+    if warc_headers.get("WARC-Type") != "response":
+        return None
+
+    block = block[: int(warc_headers["Content-Length"])]
+    http_head, _, content = block.partition(b"\r\n\r\n")
+    lines = http_head.decode("latin-1").split("\r\n")
+    status_code = int(lines[0].split(" ", 2)[1])
+    header_items = [line.split(": ", 1) for line in lines[1:] if ": " in line]
+    cookies = {}
+    for name, value in header_items:
+        if name.lower() == "set-cookie":
+            cookie_name, _, cookie_value = value.split(";", 1)[0].partition("=")
+            cookies[cookie_name.strip()] = cookie_value.strip()
+    digest = warc_headers.get("WARC-Hssp-Body-Digest", "-")
+    url = warc_headers["WARC-Target-URI"]
+    return {
+        "key": (warc_headers.get("WARC-Hssp-Method", "GET"), url, "" if digest == "-" else digest),
+        "url": warc_headers.get("WARC-Hssp-Final-URI", url),
+        "status_code": status_code,
+        "headers": dict(header_items),
+        "cookies": cookies,
+        "content": content,
+    }
+
+
+def _iter_gzip_members(file) -> Iterator[tuple[int, int, bytes]]:
+    offset = 0
+    fed = 0
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    output = []
+    pending = b""
+    while True:
+        chunk = pending or file.read(1024 * 1024)
+        pending = b""
+        if not chunk:
+            break
+
+        # 解压到当前成员结束为止，剩余的数据属于下一个成员
+        output.append(decompressor.decompress(chunk))
+        fed += len(chunk)
+        if decompressor.eof:
+            pending = decompressor.unused_data
+            length = fed - len(pending)
+            yield offset, length, b"".join(output)
+            offset += length
+            fed = 0
+            output = []
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+
+def _iter_warc_records(file) -> Iterator[tuple[int, int, bytes]]:
+    offset = 0
+    while True:
+        line = file.readline()
+        if not line:
+            break
+        if not line.strip():
+            offset += len(line)
+            continue
+
+        head = [line]
+        content_length = 0
+        while line.strip():
+            line = file.readline()
+            head.append(line)
+            if line.lower().startswith(b"content-length:"):
+                content_length = int(line.split(b":", 1)[1])
+        data = b"".join(head) + file.read(content_length + 4)
+        yield offset, len(data), data
+        offset += len(data)
+
+
+def _iter_lines(file) -> Iterator[tuple[int, int, bytes]]:
+    offset = 0
+    for line in file:
+        if line.strip():
+            yield offset, len(line), line
+        offset += len(line)
+
+
+def iter_records(path: Path) -> Iterator[tuple[int, int, bool, bytes]]:
+    """
+    流式遍历录制文件中的每条记录，不会把整个文件读入内存
+    压缩文件中每条记录是一个独立的gzip成员，回放时可以按位置直接读取；是否压缩按文件开头判断，和文件名无关
+    Args:
+        path: 录制文件
+
+    Returns:
+        返回 (偏移, 长度, 是否压缩, 记录内容)
+    """
+    with open(path, "rb") as file:
+        compressed = file.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC
+        file.seek(0)
+        if compressed:
+            iterator = _iter_gzip_members(file)
+        elif ".warc" in path.name:
+            iterator = _iter_warc_records(file)
+        else:
+            iterator = _iter_lines(file)
+        for offset, length, data in iterator:
+            yield offset, length, compressed, data
+
+
+def read_record(file, offset: int, length: int, compressed: bool) -> bytes:
+    """
+    读取一条记录
+    Args:
+        file: 录制文件对象
+        offset: 偏移
+        length: 长度
+        compressed: 是否压缩
+
+    Returns:
+
+    """
+    file.seek(offset)
+    data = file.read(length)
+    return gzip.decompress(data) if compressed else data
+
+
+class TrafficRecorder:
+    """
+    流量录制：通过响应后的信号记录每个请求和响应，写入HAR（每行一条记录）或WARC文件
+    序列化和压缩在单独的线程中按批执行，尽量不占用事件循环
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        record_format: str = "har",
+        compress: bool = True,
+        batch_size: int = 100,
+        flush_interval: float = 5,
+    ):
+        """
+        Args:
+            path: 录制文件路径，压缩时没有 .gz 后缀会自动补上，回放目录时按 REPLAY_PATTERNS 查找
+            record_format: 录制格式，har 或 warc
+            compress: 是否压缩，每条记录单独压缩为一个gzip成员，回放时可以直接定位
+            batch_size: 每批写入的数量
+            flush_interval: 最长的写入间隔，单位是秒
+        """
+        if record_format not in RECORD_FORMATS:
+            raise ValueError(f"不支持的录制格式: {record_format}")
+
+        self.record_format = record_format
+        self.compress = compress
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = hssp_logger.getChild("recorder")
+        self.path = self._check_path(Path(path))
+
+        self.records_count = 0
+        self._pending: list[Response] = []
+        self._last_flush = time.monotonic()
+        self._futures: list[asyncio.Future] = []
+        # 单线程写入，保证记录的顺序
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hssp-recorder")
+        self._file = None
+
+    def _check_path(self, path: Path) -> Path:
+        """
+        压缩时补上 .gz 后缀，文件名在回放目录时无法找到时给出警告
+        Args:
+            path: 录制文件路径
+
+        Returns:
+            返回实际写入的路径
+        """
+        if self.compress and path.suffix != ".gz":
+            path = path.with_name(f"{path.name}.gz")
+            self.logger.warning(f"录制文件是压缩的，写入 {path}")
+        if not any(path.match(pattern) for pattern in REPLAY_PATTERNS):
+            self.logger.warning(
+                f"录制文件名 {path.name} 不符合 {', '.join(REPLAY_PATTERNS)}，回放目录时不会读取，需要直接指定文件"
+            )
+        return path
+
+    def attach(self, net) -> "TrafficRecorder":
+        """
+        挂载到Net，记录之后的每个响应
+        Args:
+            net: 网络请求对象
+
+        Returns:
+
+        """
+        net.response_after_signal.connect(self.record)
+        return self
+
+    def detach(self, net):
+        net.response_after_signal.disconnect(self.record)
+
+    def record(self, response: Response):
+        """
+        记录一个响应，响应后的信号接收函数
+        Args:
+            response: 响应
+
+        Returns:
+
+        """
+        self._pending.append(response)
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self._submit()
+
+    def _submit(self):
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        self._last_flush = time.monotonic()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._write_batch, batch)
+        self._futures = [f for f in self._futures if not f.done()]
+        self._futures.append(future)
+
+    def _serialize(self, response: Response) -> list[bytes]:
+        if self.record_format == "har":
+            return [_har_entry(response)]
+        return _warc_records(response)
+
+    def _write_batch(self, batch: list[Response]):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")  # noqa: SIM115
+
+        chunks = []
+        for response in batch:
+            try:
+                records = self._serialize(response)
+            except Exception as exception:
+                self.logger.error(f"录制 {response.url} 失败: {exception}")
+                continue
+            for record in records:
+                chunks.append(gzip.compress(record, compresslevel=1) if self.compress else record)
+            self.records_count += 1
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+
+    async def flush(self):
+        """
+        写入所有待写入的记录
+        Returns:
+
+        """
+        self._submit()
+        if self._futures:
+            await asyncio.gather(*self._futures)
+            self._futures = []
+
+    async def close(self):
+        """
+        写入剩余的记录并关闭文件
+        Returns:
+
+        """
+        await self.flush()
+        if self._file is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._file.close)
+            self._file = None
+        self._executor.shutdown(wait=True)
+        self.logger.info(f"录制完成，共 {self.records_count} 条记录，写入 {self.path}")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,206 @@
+import asyncio
+import functools
+import ipaddress
+import socket
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+
+from furl import furl
+
+from hssp.logger.log import hssp_logger
+from hssp.settings.settings import settings
+
+# 解析结果：(地址族, ip地址)
+AddressType = tuple[int, str]
+# 自定义的解析函数：传入主机和地址族，返回地址列表和ttl，ttl为None时使用默认ttl
+ResolveFuncType = Callable[[str, int], Awaitable[tuple[list[AddressType], float | None]]]
+
+
+async def system_resolve(host: str, family: int = socket.AF_UNSPEC) -> tuple[list[AddressType], float | None]:
+    """
+    使用系统的getaddrinfo解析域名，系统解析拿不到ttl，所以返回None
+    Args:
+        host: 主机名
+        family: 地址族
+
+    Returns:
+        返回地址列表和ttl
+    """
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(host, 0, family=family, type=socket.SOCK_STREAM)
+    addresses = []
+    for info_family, *_, sockaddr in infos:
+        address = (info_family, sockaddr[0])
+        if address not in addresses:
+            addresses.append(address)
+    return addresses, None
+
+
+def is_ip_address(host: str) -> bool:
+    """
+    判断主机是否已经是ip地址
+    Args:
+        host: 主机
+
+    Returns:
+
+    """
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return False
+    return True
+
+
+class DnsResolver:
+    """
+    共享的异步DNS解析缓存
+    支持按ttl过期、解析失败的负缓存、并发解析同一主机时合并为一次查询、批量预解析
+    """
+
+    def __init__(
+        self,
+        resolve_func: ResolveFuncType | None = None,
+        ttl: float | None = None,
+        negative_ttl: float | None = None,
+        max_size: int = 10000,
+    ):
+        """
+        Args:
+            resolve_func: 解析函数，默认使用系统解析，测试时可以传入本地的桩解析函数
+            ttl: 解析结果没有ttl时使用的缓存时间，默认使用设置中的值
+            negative_ttl: 解析失败的缓存时间，默认使用设置中的值
+            max_size: 最多缓存的主机数量
+        """
+        self.resolve_func = resolve_func or system_resolve
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.logger = hssp_logger.getChild("resolver")
+
+        # 缓存：(主机, 地址族) -> (过期时间, 地址列表或异常)
+        self._cache: OrderedDict[tuple[str, int], tuple[float, list[AddressType] | OSError]] = OrderedDict()
+        # 正在进行的解析
+        self._pending: dict[tuple[str, int], asyncio.Future] = {}
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl if self._ttl is not None else settings.dns_ttl
+
+    @property
+    def negative_ttl(self) -> float:
+        return self._negative_ttl if self._negative_ttl is not None else settings.dns_negative_ttl
+
+    def clear(self):
+        """
+        清空缓存
+        Returns:
+
+        """
+        self._cache.clear()
+
+    def _get_cache(self, key: tuple[str, int]) -> list[AddressType] | OSError | None:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._cache.pop(key, None)
+            return None
+
+        self._cache.move_to_end(key)
+        return value
+
+    def _set_cache(self, key: tuple[str, int], value: list[AddressType] | OSError, ttl: float):
+        if ttl <= 0:
+            return
+
+        self._cache[key] = (time.monotonic() + ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def _lookup(self, key: tuple[str, int]) -> list[AddressType]:
+        host, family = key
+        try:
+            addresses, ttl = await self.resolve_func(host, family)
+            if not addresses:
+                raise socket.gaierror(socket.EAI_NONAME, f"{host} 没有解析结果")
+        except OSError as exception:
+            self._set_cache(key, exception, self.negative_ttl)
+            raise
+
+        self._set_cache(key, addresses, ttl if ttl is not None else self.ttl)
+        return addresses
+
+    async def resolve(self, host: str, family: int = socket.AF_UNSPEC) -> list[AddressType]:
+        """
+        解析主机
+        Args:
+            host: 主机名
+            family: 地址族
+
+        Returns:
+            返回地址列表
+        """
+        if is_ip_address(host):
+            ip = host.strip("[]")
+            ip_family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+            return [(ip_family, ip)]
+
+        key = (host.lower(), family)
+        cached = self._get_cache(key)
+        if isinstance(cached, OSError):
+            raise socket.gaierror(*cached.args)
+        if cached is not None:
+            return cached
+
+        # 同一主机正在解析时，等待同一个结果，不发起新的查询
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(key)
+        if pending is not None and pending.get_loop() is loop:
+            return await asyncio.shield(pending)
+
+        future = loop.create_task(self._lookup(key))
+        future.add_done_callback(functools.partial(self._lookup_done, key))
+        self._pending[key] = future
+        return await asyncio.shield(future)
+
+    def _lookup_done(self, key: tuple[str, int], future: asyncio.Future):
+        if self._pending.get(key) is future:
+            self._pending.pop(key, None)
+        # 所有等待者都取消时，避免出现异常未被获取的警告
+        if not future.cancelled():
+            future.exception()
+
+    async def prefetch(self, hosts: Iterable[str], concurrency: int = 64) -> dict[str, bool]:
+        """
+        批量预解析主机，可以传入url，会自动提取主机
+        Args:
+            hosts: 主机或url列表
+            concurrency: 同时解析的数量
+
+        Returns:
+            返回每个主机是否解析成功
+        """
+        host_set = {furl(host).host if "://" in host else host for host in hosts}
+        host_set.discard(None)
+        host_set.discard("")
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _prefetch(_host: str) -> tuple[str, bool]:
+            async with sem:
+                try:
+                    await self.resolve(_host)
+                except OSError as exception:
+                    self.logger.debug(f"预解析 {_host} 失败: {exception}")
+                    return _host, False
+                return _host, True
+
+        results = await asyncio.gather(*[_prefetch(host) for host in host_set])
+        return dict(results)
+
+
+shared_resolver = DnsResolver()
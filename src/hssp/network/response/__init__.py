@@ -1 +1,3 @@
+from hssp.network.response.extractor import Field, Schema
+from hssp.network.response.links import LinkExtractor, canonicalize_url
 from hssp.network.response.response import Response
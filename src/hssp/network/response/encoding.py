@@ -0,0 +1,235 @@
+import codecs
+import re
+from collections import OrderedDict
+
+from charset_normalizer import from_bytes
+
+from hssp.settings.settings import settings
+
+# 字节序标记，长的放在前面
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# 编码别名，gb2312、gbk的页面经常混入生僻字，统一按超集gb18030解码
+ENCODING_ALIASES = {
+    "gb2312": "gb18030",
+    "gbk": "gb18030",
+    "x-gbk": "gb18030",
+    "cp936": "gb18030",
+    "ascii": "utf-8",
+    "us-ascii": "utf-8",
+    "big5": "big5hkscs",
+}
+
+# <meta charset="gbk">、<meta http-equiv="Content-Type" content="text/html; charset=gbk">、<?xml encoding="gbk"?>
+_META_CHARSET_RE = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_:.\-]+)|<\?xml[^>]+encoding\s*=\s*["']([a-zA-Z0-9_:.\-]+)""",
+    re.IGNORECASE,
+)
+
+# 检测结果的混乱度不超过这个值时才认为可信
+DETECT_MAX_CHAOS = 0.1
+
+_ASCII_BYTES = bytes(range(128))
+
+# 各主机检测出的编码
+_host_encodings: OrderedDict[str, str] = OrderedDict()
+
+
+def normalize_encoding(encoding: str | None) -> str | None:
+    """
+    规范化编码名称，无法识别的返回None
+    Args:
+        encoding: 编码名称
+
+    Returns:
+
+    """
+    if not encoding:
+        return None
+    encoding = encoding.strip(" \"'").lower()
+    encoding = ENCODING_ALIASES.get(encoding, encoding)
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return None
+    return ENCODING_ALIASES.get(name, name)
+
+
+def header_encoding(headers) -> str | None:
+    """
+    从Content-Type响应头获取编码
+    Args:
+        headers: 响应头
+
+    Returns:
+
+    """
+    content_type = next((v for k, v in headers.items() if k.lower() == "content-type"), "")
+    _, _, charset = content_type.partition("charset=")
+    return normalize_encoding(charset.split(";")[0])
+
+
+def bom_encoding(content: bytes) -> str | None:
+    """
+    根据字节序标记获取编码
+    Args:
+        content: 响应体
+
+    Returns:
+
+    """
+    for bom, encoding in BOMS:
+        if content.startswith(bom):
+            return encoding
+    return None
+
+
+def meta_encoding(content: bytes) -> str | None:
+    """
+    从页面开头的 <meta charset> 或xml声明中获取编码
+    Args:
+        content: 响应体
+
+    Returns:
+
+    """
+    match = _META_CHARSET_RE.search(content, 0, settings.encoding_sniff_size)
+    if match is None:
+        return None
+    return normalize_encoding((match.group(1) or match.group(2)).decode("ascii"))
+
+
+def decodes_cleanly(content: bytes, encoding: str) -> bool:
+    """
+    前面一部分能否按编码严格解码
+    Args:
+        content: 响应体
+        encoding: 编码名称
+
+    Returns:
+
+    """
+    sample = bytes(content[: settings.encoding_detect_size])
+    try:
+        sample.decode(encoding)
+    except UnicodeDecodeError as exception:
+        # 截断处的半个字符不算解码失败
+        return len(content) > len(sample) and exception.start >= len(sample) - 3
+    except LookupError:
+        return False
+    return True
+
+
+def is_utf8(content: bytes) -> bool:
+    """
+    前面一部分是否是合法的utf-8，非utf-8的中文编码几乎不可能通过校验，比检测器快得多
+    Args:
+        content: 响应体
+
+    Returns:
+
+    """
+    return decodes_cleanly(content, "utf-8")
+
+
+def _non_ascii_count(content: bytes) -> int:
+    return len(bytes(content[: settings.encoding_detect_size]).translate(None, _ASCII_BYTES))
+
+
+def _detect(content: bytes) -> tuple[str | None, bool]:
+    best = from_bytes(bytes(content[: settings.encoding_detect_size]), preemptive_behaviour=False).best()
+    if best is None:
+        return None, False
+    return normalize_encoding(best.encoding), best.chaos <= DETECT_MAX_CHAOS
+
+
+def detect_encoding(content: bytes) -> str | None:
+    """
+    使用检测器判断编码，只检测前面一部分，避免大页面检测太慢
+    Args:
+        content: 响应体
+
+    Returns:
+        返回编码名称，无法判断时返回None
+    """
+    return _detect(content)[0]
+
+
+def _cache_host(host: str, encoding: str):
+    _host_encodings[host] = encoding
+    _host_encodings.move_to_end(host)
+    while len(_host_encodings) > settings.encoding_cache_size:
+        _host_encodings.popitem(last=False)
+
+
+def _cached_encoding(content: bytes, host: str | None) -> str | None:
+    encoding = _host_encodings.get(host) if host else None
+    if encoding is None:
+        return None
+    if decodes_cleanly(content, encoding):
+        return encoding
+    # 缓存的编码解不了当前页面，说明之前检测错了
+    _host_encodings.pop(host, None)
+    return None
+
+
+def resolve_encoding(content: bytes, headers, host: str | None = None) -> str:
+    """
+    确定响应体的编码：响应头、字节序标记、<meta charset>、utf-8校验、gb18030校验、同主机上次检测的结果、检测器，
+    都没有时使用utf-8
+    短的中文样本检测器经常误判为cp949、big5，所以先按gb18030严格解码，没有声明编码的韩文、繁体页面也会因此按gb18030解码；
+    只缓存样本足够多且可信的检测结果，缓存的编码解不了当前页面时丢弃
+    Args:
+        content: 响应体
+        headers: 响应头
+        host: 主机，用于缓存检测结果
+
+    Returns:
+        返回编码名称
+    """
+    encoding = header_encoding(headers) or bom_encoding(content[:4])
+    if encoding:
+        return encoding
+
+    encoding = meta_encoding(content)
+    if encoding:
+        return encoding
+
+    if is_utf8(content):
+        return "utf-8"
+
+    # big5、cp949的缓存也可能把gbk页面解码成乱码，所以先校验gb18030再查缓存
+    if decodes_cleanly(content, "gb18030"):
+        return "gb18030"
+
+    encoding = _cached_encoding(content, host)
+    if encoding:
+        return encoding
+
+    encoding, confident = _detect(content)
+    if encoding and host and confident and _non_ascii_count(content) >= settings.encoding_cache_min_bytes:
+        _cache_host(host, encoding)
+    return encoding or "utf-8"
+
+
+def decode_content(content, headers, host: str | None = None) -> tuple[str, str]:
+    """
+    确定编码后只解码一次，无法解码的字符替换掉
+    Args:
+        content: 响应体，可以是mmap
+        headers: 响应头
+        host: 主机
+
+    Returns:
+        返回 (文本, 编码)
+    """
+    if not isinstance(content, bytes):
+        content = bytes(content)
+    encoding = resolve_encoding(content, headers, host)
+    return content.decode(encoding, errors="replace"), encoding
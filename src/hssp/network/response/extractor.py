@@ -0,0 +1,149 @@
+from collections.abc import Callable
+from typing import Any
+
+from lxml import etree
+from parsel.utils import extract_regex, flatten
+from pydantic import BaseModel
+
+from hssp.network.response.selector import (
+    Selector,
+    compile_regex,
+    compile_xpath,
+    css_to_xpath,
+    node_to_str,
+    proc_results,
+)
+
+
+class Field:
+    """
+    声明式解析的字段，在创建时就编译好查询，解析时直接在lxml树上执行
+    """
+
+    def __init__(
+        self,
+        xpath: str | None = None,
+        css: str | None = None,
+        re: str | None = None,
+        many: bool = False,
+        default: Any = None,
+        is_url: bool = False,
+        processors: list[Callable[[Any], Any]] | None = None,
+        fields: "dict[str, Field] | Schema | None" = None,
+        namespaces: dict[str, str] | None = None,
+    ):
+        """
+        Args:
+            xpath: xpath查询，相对于当前节点
+            css: css查询，相对于当前节点，不能和xpath同时使用
+            re: 正则表达式，作用于查询结果，没有查询时作用于整个文档
+            many: 是否返回列表，否则返回第一个结果
+            default: 取不到时的默认值
+            is_url: 是否是url，是的话补全域名
+            processors: 后处理函数，依次作用于每个结果
+            fields: 嵌套的字段，查询到的每个节点按这些字段解析为字典
+            namespaces: xml的命名空间
+        """
+        if xpath and css:
+            raise ValueError("xpath 和 css 不能同时设置")
+
+        query = xpath or (css_to_xpath(css) if css else None)
+        namespaces = tuple(sorted((namespaces or {}).items()))
+        self.query = query
+        self.xpath = compile_xpath(query, namespaces) if query else None
+        self.regex = compile_regex(re) if re else None
+        self.many = many
+        self.default = default
+        self.is_url = is_url
+        self.processors = processors or []
+        self.schema = Schema(fields) if isinstance(fields, dict) else fields
+
+    def extract(self, node, domain: str | None = None, method: str = "html", text: str | None = None):
+        """
+        从节点解析字段的值
+        Args:
+            node: lxml节点
+            domain: 页面地址，用于补全url
+            method: 节点序列化的方式，html或xml
+            text: 节点对应的文本，只有正则没有查询时使用，避免重新序列化整个文档
+
+        Returns:
+            返回解析结果
+        """
+        if self.xpath is not None:
+            results = self.xpath(node)
+            if not isinstance(results, list):
+                results = [results]
+        else:
+            results = [node]
+
+        if self.schema is not None:
+            items = [
+                self.schema.extract_node(result, domain, method)
+                for result in results
+                if isinstance(result, etree._Element)
+            ]
+            return items if self.many else (items[0] if items else self.default)
+
+        if self.xpath is None and text is not None:
+            values = [text]
+        else:
+            values = [node_to_str(result, method) for result in results]
+
+        if self.regex is not None:
+            values = flatten([extract_regex(self.regex, value) for value in values])
+
+        values = proc_results(values, domain, self.is_url)
+        for processor in self.processors:
+            values = [processor(value) for value in values]
+
+        if self.many:
+            return values
+        return values[0] if values else self.default
+
+
+class Schema:
+    """
+    声明式解析的结构，由多个字段组成，创建一次后可以重复用于解析每个页面
+    """
+
+    def __init__(self, fields: dict[str, Field], model: type[BaseModel] | None = None):
+        """
+        Args:
+            fields: 字段名到字段的映射
+            model: 解析结果转换的模型，不设置时返回字典
+        """
+        self.fields = fields
+        self.model = model
+
+    def extract_node(self, node, domain: str | None = None, method: str = "html", text: str | None = None) -> dict:
+        """
+        从节点解析所有字段
+        Args:
+            node: lxml节点
+            domain: 页面地址，用于补全url
+            method: 节点序列化的方式，html或xml
+            text: 节点对应的文本
+
+        Returns:
+            返回字段名到结果的字典
+        """
+        return {name: field.extract(node, domain, method, text) for name, field in self.fields.items()}
+
+    def extract(self, selector: Selector, domain: str | None = None, text: str | None = None) -> dict | BaseModel:
+        """
+        从选择器解析所有字段
+        Args:
+            selector: 选择器
+            domain: 页面地址，用于补全url
+            text: 选择器对应的文本
+
+        Returns:
+            设置了模型时返回模型，否则返回字典
+        """
+        if selector.type not in ("html", "xml"):
+            raise ValueError(f"不能在 {selector.type} 类型的文档上解析")
+
+        method = "xml" if selector.type == "xml" else "html"
+        data = self.extract_node(selector.root, domain, method, text)
+        return self.model.model_validate(data) if self.model else data
@@ -0,0 +1,227 @@
+from collections.abc import Iterable
+from urllib.parse import SplitResult, parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from hssp.network.response.selector import Selector, compile_regex, compile_xpath
+
+# 各协议的默认端口，规范化时去掉
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# 常见的追踪参数，规范化时去掉
+TRACKING_PARAMS = frozenset(
+    {
+        "utm_source",
+        "utm_medium",
+        "utm_campaign",
+        "utm_term",
+        "utm_content",
+        "utm_id",
+        "gclid",
+        "fbclid",
+        "msclkid",
+        "yclid",
+        "mc_cid",
+        "mc_eid",
+        "_ga",
+    }
+)
+
+
+def canonicalize_url(
+    url: str,
+    strip_params: Iterable[str] = TRACKING_PARAMS,
+    keep_fragment: bool = False,
+    sort_query: bool = True,
+) -> str:
+    """
+    规范化url：协议和主机转小写、去掉默认端口、参数排序、去掉锚点和追踪参数
+    Args:
+        url: 绝对地址
+        strip_params: 需要去掉的参数名，以 utm_ 开头的参数总是去掉
+        keep_fragment: 是否保留锚点
+        sort_query: 是否对参数排序
+
+    Returns:
+        返回规范化后的url
+    """
+    return _canonicalize_parts(urlsplit(url), strip_params, keep_fragment, sort_query)
+
+
+def _canonicalize_parts(
+    parts: SplitResult,
+    strip_params: Iterable[str] = TRACKING_PARAMS,
+    keep_fragment: bool = False,
+    sort_query: bool = True,
+) -> str:
+    scheme = parts.scheme.lower()
+
+    netloc = parts.netloc
+    if netloc:
+        userinfo, _, hostport = netloc.rpartition("@")
+        host, port = hostport.lower(), None
+        if host.startswith("["):
+            # ipv6
+            bracket_end = host.find("]")
+            if host[bracket_end + 1 : bracket_end + 2] == ":":
+                host, port = host[: bracket_end + 1], host[bracket_end + 2 :]
+        elif ":" in host:
+            host, port = host.rsplit(":", 1)
+        if port and port.isdigit() and DEFAULT_PORTS.get(scheme) == int(port):
+            port = None
+        netloc = f"{userinfo}@{host}" if userinfo else host
+        if port:
+            netloc = f"{netloc}:{port}"
+
+    query = parts.query
+    if query:
+        strip_params = strip_params if isinstance(strip_params, frozenset | set) else set(strip_params)
+        params = [
+            (key, value)
+            for key, value in parse_qsl(query, keep_blank_values=True)
+            if key not in strip_params and not key.startswith("utm_")
+        ]
+        if sort_query:
+            params.sort()
+        query = urlencode(params)
+
+    fragment = parts.fragment if keep_fragment else ""
+    return urlunsplit((scheme, netloc, parts.path or "/", query, fragment))
+
+
+class LinkExtractor:
+    """
+    链接提取器：一次编译好查询和规则，重复用于每个页面
+    """
+
+    def __init__(
+        self,
+        allow: str | Iterable[str] = (),
+        deny: str | Iterable[str] = (),
+        allow_domains: Iterable[str] = (),
+        deny_domains: Iterable[str] = (),
+        same_domain: bool = False,
+        canonicalize: bool = True,
+        strip_params: Iterable[str] = TRACKING_PARAMS,
+        unique: bool = True,
+        tags: Iterable[str] = ("a", "area"),
+        attrs: Iterable[str] = ("href",),
+        schemes: Iterable[str] = ("http", "https"),
+    ):
+        """
+        Args:
+            allow: 允许的url正则，匹配任意一个即可，为空时允许所有
+            deny: 排除的url正则，优先于allow
+            allow_domains: 允许的域名，包含子域名
+            deny_domains: 排除的域名，包含子域名
+            same_domain: 是否只保留和页面相同主机的链接
+            canonicalize: 是否规范化url
+            strip_params: 规范化时去掉的参数名
+            unique: 是否在单个页面内去重
+            tags: 提取链接的标签
+            attrs: 提取链接的属性
+            schemes: 允许的协议
+        """
+        self.allow = [compile_regex(regex) for regex in ([allow] if isinstance(allow, str) else allow)]
+        self.deny = [compile_regex(regex) for regex in ([deny] if isinstance(deny, str) else deny)]
+        self.allow_domains = {domain.lower() for domain in allow_domains}
+        self.deny_domains = {domain.lower() for domain in deny_domains}
+        self.same_domain = same_domain
+        self.canonicalize = canonicalize
+        self.strip_params = frozenset(strip_params)
+        self.unique = unique
+        self.schemes = frozenset(schemes)
+
+        query = " | ".join(f"//{tag}/@{attr}" for tag in tags for attr in attrs)
+        self.xpath = compile_xpath(query)
+        self.base_xpath = compile_xpath("//base/@href")
+
+    @staticmethod
+    def _match_domain(host: str, domains: set[str]) -> bool:
+        if host in domains:
+            return True
+        return any(host.endswith(f".{domain}") for domain in domains)
+
+    def _filter(self, url: str, host: str, page_host: str) -> bool:
+        if self.same_domain and host != page_host:
+            return False
+        if self.allow_domains and not self._match_domain(host, self.allow_domains):
+            return False
+        if self.deny_domains and self._match_domain(host, self.deny_domains):
+            return False
+        if self.deny and any(regex.search(url) for regex in self.deny):
+            return False
+        return not self.allow or any(regex.search(url) for regex in self.allow)
+
+    def extract_urls(self, hrefs: Iterable[str], base_url: str) -> list[str]:
+        """
+        把链接补全为绝对地址，规范化、过滤并去重
+        Args:
+            hrefs: 链接列表
+            base_url: 页面地址
+
+        Returns:
+            返回处理后的url列表
+        """
+        base_parts = urlsplit(base_url)
+        page_host = (base_parts.hostname or "").lower()
+        origin = f"{base_parts.scheme}://{base_parts.netloc}"
+        seen_hrefs = set()
+        seen = set()
+        urls = []
+        for href in hrefs:
+            href = href.strip()
+            if not href or href.startswith("#"):
+                continue
+            # 去重时相同的原始链接不再重复处理
+            if self.unique:
+                if href in seen_hrefs:
+                    continue
+                seen_hrefs.add(href)
+
+            # 绝对地址和不含相对路径的根路径直接拼接，其余的交给urljoin
+            if href.startswith(("http://", "https://")):
+                url = href
+            elif href.startswith("/") and not href.startswith("//") and "/." not in href:
+                url = origin + href
+            else:
+                url = urljoin(base_url, href)
+
+            parts = urlsplit(url)
+            if parts.scheme.lower() not in self.schemes:
+                continue
+
+            if self.canonicalize:
+                url = _canonicalize_parts(parts, self.strip_params)
+            elif parts.fragment or url.endswith("#"):
+                url = url.split("#", 1)[0]
+
+            if self.unique:
+                if url in seen:
+                    continue
+                seen.add(url)
+
+            if self._filter(url, (parts.hostname or "").lower(), page_host):
+                urls.append(url)
+        return urls
+
+    def extract(self, selector: Selector, base_url: str) -> list[str]:
+        """
+        从页面提取链接
+        Args:
+            selector: 页面选择器
+            base_url: 页面地址，页面有 <base href> 时以其为准
+
+        Returns:
+            返回处理后的url列表
+        """
+        if selector.type not in ("html", "xml"):
+            return []
+
+        base_hrefs = self.base_xpath(selector.root)
+        if base_hrefs:
+            base_url = urljoin(base_url, str(base_hrefs[0]).strip())
+
+        return self.extract_urls(self.xpath(selector.root), base_url)
+
+
+# 默认的链接提取器
+default_link_extractor = LinkExtractor()
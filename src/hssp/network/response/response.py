@@ -1,13 +1,25 @@
+import codecs
+import mmap
+from functools import cached_property
+from typing import TypeVar
+from urllib.parse import urljoin
+
 from furl import furl
+from pydantic import BaseModel
 
 from hssp.models.net import RequestModel
-from hssp.network.response.selector import Selector
+from hssp.network.response.encoding import decode_content, header_encoding, resolve_encoding
+from hssp.network.response.extractor import Field, Schema
+from hssp.network.response.links import LinkExtractor, default_link_extractor
+from hssp.network.response.selector import Selector, compile_regex
+from hssp.utils.codec import convert_as, decode_json_as, get_path, json_loads
+
+T = TypeVar("T")
 
 
 class Response:
     headers: dict
-    content: bytes
-    text: str
+    content: bytes | mmap.mmap
     json: dict
 
     def __init__(
@@ -17,12 +29,13 @@ class Response:
         headers: dict,
         cookies: dict,
         client_cookies: dict,
-        content: bytes,
-        text: str,
+        content: bytes | mmap.mmap,
+        text: str | None,
         json: dict,
         request_data: RequestModel,
     ):
         self.request_data = request_data
+        self._encoding = None
         self.status_code = status_code
         self.cookies = cookies
         self.client_cookies = client_cookies
@@ -32,10 +45,44 @@ class Response:
         self.json = json
 
         self.url: str = url
-        self.domain = furl(self.url).origin
-        self.host = furl(self.url).host
+        url_obj = furl(self.url)
+        self.domain = url_obj.origin
+        self.host = url_obj.host
+
+    @property
+    def text(self) -> str:
+        """
+        响应文本，第一次访问时确定编码并解码一次
+        Returns:
+
+        """
+        if self._text is None:
+            self._text, self._encoding = decode_content(self.content, self.headers, self.host)
+        return self._text
+
+    @text.setter
+    def text(self, value: str | None):
+        self._text = value
+
+    @property
+    def encoding(self) -> str:
+        """
+        响应体的编码，顺序为响应头、字节序标记、<meta charset>、utf-8校验、同主机的检测结果、检测器
+        Returns:
 
-        self.selector = Selector(self.text)
+        """
+        if self._encoding is None:
+            self._encoding = resolve_encoding(self.content, self.headers, self.host)
+        return self._encoding
+
+    @cached_property
+    def selector(self) -> Selector:
+        """
+        网页选择器，第一次使用时才解析，json、图片等响应不会白白构建解析树
+        Returns:
+
+        """
+        return Selector(self.text)
 
     def xpath(self, query: str):
         """
@@ -46,7 +93,7 @@ class Response:
         Returns:
 
         """
-        return self.selector.xpath(query, domain=self.domain)
+        return self.selector.xpath(query, domain=self.url)
 
     def css(self, query: str):
         """
@@ -57,7 +104,96 @@ class Response:
         Returns:
 
         """
-        return self.selector.css(query, domain=self.domain)
+        return self.selector.css(query, domain=self.url)
+
+    def xpath_getall(self, query: str, is_url: bool = False, **kwargs) -> list[str]:
+        """
+        xpath解析并直接返回字符串列表，比 xpath(query).getall() 少创建中间对象
+        Args:
+            query: 查询条件
+            is_url: 是否是url，是的话补全域名
+            **kwargs: xpath变量
+
+        Returns:
+
+        """
+        return self.selector.xpath_getall(query, domain=self.url, is_url=is_url, **kwargs)
+
+    def xpath_get(self, query: str, default=None, is_url: bool = False, **kwargs) -> str | None:
+        """
+        xpath解析并直接返回第一个结果，比 xpath(query).get() 少创建中间对象
+        Args:
+            query: 查询条件
+            default: 取不到时的默认值
+            is_url: 是否是url，是的话补全域名
+            **kwargs: xpath变量
+
+        Returns:
+
+        """
+        return self.selector.xpath_get(query, default=default, domain=self.url, is_url=is_url, **kwargs)
+
+    def css_getall(self, query: str, is_url: bool = False) -> list[str]:
+        """
+        css解析并直接返回字符串列表，比 css(query).getall() 少创建中间对象
+        Args:
+            query: 查询条件
+            is_url: 是否是url，是的话补全域名
+
+        Returns:
+
+        """
+        return self.selector.css_getall(query, domain=self.url, is_url=is_url)
+
+    def css_get(self, query: str, default=None, is_url: bool = False) -> str | None:
+        """
+        css解析并直接返回第一个结果，比 css(query).get() 少创建中间对象
+        Args:
+            query: 查询条件
+            default: 取不到时的默认值
+            is_url: 是否是url，是的话补全域名
+
+        Returns:
+
+        """
+        return self.selector.css_get(query, default=default, domain=self.url, is_url=is_url)
+
+    def extract(self, schema: Schema | dict[str, Field], model: type[BaseModel] | None = None) -> dict | BaseModel:
+        """
+        按声明式的结构一次性解析多个字段，结构应该提前创建好重复使用
+        Args:
+            schema: 解析结构，或者字段名到字段的字典
+            model: 解析结果转换的模型，schema为字典时有效
+
+        Returns:
+            设置了模型时返回模型，否则返回字典
+        """
+        schema = schema if isinstance(schema, Schema) else Schema(schema, model)
+        return schema.extract(self.selector, domain=self.url, text=self.text)
+
+    def json_as(self, tp: type[T], path: str | None = None) -> T:
+        """
+        把响应体直接解析为类型化的对象，不经过中间的dict，也不需要再校验一遍
+        Args:
+            tp: 目标类型，可以是pydantic模型、msgspec的Struct，或者 list[Model] 这样的类型
+            path: 点分隔的路径，只解析其中一部分，比如 data.items，此时先解析为dict再转换
+
+        Returns:
+            返回解析后的对象
+        """
+        content = self.content if isinstance(self.content, bytes) else bytes(self.content)
+        if content.startswith(codecs.BOM_UTF8):
+            # 和 loads_json 一样去掉BOM，pydantic和msgspec都不接受
+            content = content[len(codecs.BOM_UTF8) :]
+        encoding = header_encoding(self.headers)
+        if encoding and not encoding.startswith("utf"):
+            content = content.decode(encoding)
+
+        if not path:
+            return decode_json_as(content, tp)
+
+        data = self.json if self.json is not None else json_loads(content)
+        return convert_as(get_path(data, path), tp)
 
     def re(self, regex: str, replace_entities=True):
         """
@@ -70,7 +206,7 @@ class Response:
         Returns:
             返回解析结果列表
         """
-        return self.selector.re(regex, replace_entities=replace_entities)
+        return self.selector.re(compile_regex(regex), replace_entities=replace_entities)
 
     def re_first(self, regex: str, default=None, replace_entities=True):
         """
@@ -84,11 +220,11 @@ class Response:
         Returns:
             返回解析结果的第一个
         """
-        return self.selector.re_first(regex, default=default, replace_entities=replace_entities)
+        return self.selector.re_first(compile_regex(regex), default=default, replace_entities=replace_entities)
 
     def to_url(self, urls: list[str] | str):
         """
-        获取绝对路径的url地址
+        获取绝对路径的url地址，已经是绝对路径的url原样保留
         Args:
             urls: url或url列表
 
@@ -96,5 +232,18 @@ class Response:
             返回转换后的url列表
         """
         urls = urls if type(urls) is list else [urls]
-        urls = [furl(self.url).join(url).url for url in urls if not url.startswith("http")]
-        return urls
+        return [urljoin(self.url, url.strip()) for url in urls]
+
+    def links(self, extractor: LinkExtractor | None = None, **kwargs) -> list[str]:
+        """
+        提取页面中的链接，补全为绝对地址并规范化、过滤、去重
+        Args:
+            extractor: 链接提取器，应该提前创建好重复使用
+            **kwargs: 不传提取器时，用于创建提取器的参数，参考 LinkExtractor
+
+        Returns:
+            返回url列表
+        """
+        if extractor is None:
+            extractor = LinkExtractor(**kwargs) if kwargs else default_link_extractor
+        return extractor.extract(self.selector, self.url)
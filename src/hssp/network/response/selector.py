@@ -1,20 +1,126 @@
+import re
+from functools import lru_cache
+from urllib.parse import urljoin
+
+from lxml import etree
 from parsel import Selector as BaseSelector
 from parsel import SelectorList as BaseSelectorList
+from parsel.csstranslator import GenericTranslator, HTMLTranslator
+
+_css_translators = {
+    "html": HTMLTranslator(),
+    "xml": GenericTranslator(),
+}
+
+
+@lru_cache(maxsize=1024)
+def compile_xpath(query: str, namespaces: tuple[tuple[str, str], ...] = ()) -> etree.XPath:
+    """
+    编译xpath并缓存，同一个查询只编译一次
+    Args:
+        query: xpath查询
+        namespaces: 命名空间，为了可以缓存使用元组
+
+    Returns:
+        返回编译好的xpath
+    """
+    try:
+        return etree.XPath(query, namespaces=dict(namespaces), smart_strings=False)
+    except etree.XPathError as exc:
+        raise ValueError(f"XPath error: {exc} in {query}") from exc
+
+
+@lru_cache(maxsize=1024)
+def css_to_xpath(query: str, type_: str = "html") -> str:
+    """
+    css转换为xpath并缓存
+    Args:
+        query: css查询
+        type_: 文档类型，html或xml
+
+    Returns:
+        返回转换后的xpath
+    """
+    return _css_translators["xml" if type_ == "xml" else "html"].css_to_xpath(query)
+
+
+@lru_cache(maxsize=1024)
+def compile_regex(regex: str | re.Pattern) -> re.Pattern:
+    """
+    编译正则表达式并缓存
+    Args:
+        regex: 正则表达式
+
+    Returns:
+        返回编译好的正则
+    """
+    return re.compile(regex, re.UNICODE) if isinstance(regex, str) else regex
+
+
+def proc_result(value, domain, is_url):
+    """
+    处理解析结果：去掉首尾空白，是url时基于页面地址补全为绝对地址
+    Args:
+        value: 解析结果
+        domain: 页面地址，相对路径按页面地址补全，只传域名时相对路径会被补全到根目录下
+        is_url: 是否是url
+
+    Returns:
+
+    """
+    if isinstance(value, str):
+        value = value.strip()
+    if is_url and domain and value and not value.startswith(("http://", "https://")):
+        value = urljoin(domain, value)
+    return value
+
+
+def proc_results(values: list[str], domain, is_url) -> list[str]:
+    """
+    批量处理解析结果，不需要补全域名时只做strip
+    Args:
+        values: 解析结果列表
+        domain: 页面地址，用于补全url
+        is_url: 是否是url
+
+    Returns:
+
+    """
+    if is_url and domain:
+        return [proc_result(value, domain, is_url) for value in values]
+    return [value.strip() for value in values]
+
+
+def node_to_str(value, method: str = "html") -> str:
+    """
+    把lxml的查询结果转为字符串，规则同parsel的Selector.get
+    Args:
+        value: 查询结果，可能是节点、字符串、数字或布尔值
+        method: 节点序列化的方式，html或xml
+
+    Returns:
+
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, etree._Element):
+        return etree.tostring(value, method=method, encoding="unicode", with_tail=False)
+    if value is True:
+        return "1"
+    if value is False:
+        return "0"
+    return str(value)
 
 
 class SelectorList(BaseSelectorList):
     domain: str = ""
 
     def proc_result(self, value, domain, is_url):
-        if is_url and domain and value.startswith("/"):
-            value = domain + value
-        if isinstance(value, str):
-            value = value.strip()
-        return value
+        return proc_result(value, domain, is_url)
 
     def getall(self, is_url=False):
         result = super().getall()
-        return [self.proc_result(x, domain=self.domain, is_url=is_url) for x in result]
+        return proc_results(result, self.domain, is_url)
 
     def get(self, default=None, is_url=False):
         result = super().get(default=default)
@@ -28,12 +134,125 @@ class Selector(BaseSelector):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def _evaluate(self, query: str, namespaces=None, **kwargs) -> list:
+        """
+        使用缓存的编译后xpath直接在lxml树上查询，不创建Selector对象
+        Args:
+            query: xpath查询
+            namespaces: 额外的命名空间
+            **kwargs: xpath变量
+
+        Returns:
+            返回lxml的查询结果列表
+        """
+        all_namespaces = {**self.namespaces, **(namespaces or {})}
+        # 只传入查询中使用到的命名空间，减少缓存的键
+        used_namespaces = tuple(sorted((k, v) for k, v in all_namespaces.items() if f"{k}:" in query))
+        xpath = compile_xpath(query, used_namespaces)
+        try:
+            result = xpath(self.root, **kwargs)
+        except etree.XPathError as exc:
+            raise ValueError(f"XPath error: {exc} in {query}") from exc
+
+        return result if isinstance(result, list) else [result]
+
+    def _is_tree(self) -> bool:
+        return self.type in ("html", "xml") and hasattr(self.root, "xpath")
+
+    def _to_str(self, value) -> str:
+        return node_to_str(value, "xml" if self.type == "xml" else "html")
+
     def css(self, query, domain=None):
-        result = super().css(query)
-        result.domain = domain
-        return result
+        if not self._is_tree():
+            result = super().css(query)
+            result.domain = domain
+            return result
+
+        return self.xpath(css_to_xpath(query, self.type), domain=domain)
 
     def xpath(self, query, namespaces=None, domain=None, **kwargs):
-        result = super().xpath(query, namespaces=namespaces, **kwargs)
+        if not self._is_tree():
+            result = super().xpath(query, namespaces=namespaces, **kwargs)
+            result.domain = domain
+            return result
+
+        result = self.selectorlist_cls(
+            [
+                self.__class__(root=x, _expr=query, namespaces=self.namespaces, type=self.type)
+                for x in self._evaluate(query, namespaces, **kwargs)
+            ]
+        )
         result.domain = domain
         return result
+
+    def xpath_getall(self, query, domain=None, is_url=False, **kwargs) -> list[str]:
+        """
+        xpath查询并直接返回字符串列表，不创建中间的Selector对象，等同于 xpath(query).getall()
+        Args:
+            query: xpath查询
+            domain: 页面地址，用于补全url
+            is_url: 是否是url，是的话补全域名
+            **kwargs: xpath变量
+
+        Returns:
+            返回结果列表
+        """
+        if not self._is_tree():
+            return self.xpath(query, domain=domain, **kwargs).getall(is_url=is_url)
+
+        values = [self._to_str(x) for x in self._evaluate(query, **kwargs)]
+        return proc_results(values, domain, is_url)
+
+    def xpath_get(self, query, default=None, domain=None, is_url=False, **kwargs) -> str | None:
+        """
+        xpath查询并直接返回第一个结果，等同于 xpath(query).get()
+        Args:
+            query: xpath查询
+            default: 取不到时的默认值
+            domain: 页面地址，用于补全url
+            is_url: 是否是url，是的话补全域名
+            **kwargs: xpath变量
+
+        Returns:
+            返回第一个结果
+        """
+        if not self._is_tree():
+            return self.xpath(query, domain=domain, **kwargs).get(default=default, is_url=is_url)
+
+        result = self._evaluate(query, **kwargs)
+        if not result:
+            return proc_result(default, domain, is_url) if default is not None else default
+        return proc_result(self._to_str(result[0]), domain, is_url)
+
+    def css_getall(self, query, domain=None, is_url=False) -> list[str]:
+        """
+        css查询并直接返回字符串列表，等同于 css(query).getall()
+        Args:
+            query: css查询
+            domain: 页面地址，用于补全url
+            is_url: 是否是url，是的话补全域名
+
+        Returns:
+            返回结果列表
+        """
+        if not self._is_tree():
+            return self.css(query, domain=domain).getall(is_url=is_url)
+
+        return self.xpath_getall(css_to_xpath(query, self.type), domain=domain, is_url=is_url)
+
+    def css_get(self, query, default=None, domain=None, is_url=False) -> str | None:
+        """
+        css查询并直接返回第一个结果，等同于 css(query).get()
+        Args:
+            query: css查询
+            default: 取不到时的默认值
+            domain: 页面地址，用于补全url
+            is_url: 是否是url，是的话补全域名
+
+        Returns:
+            返回第一个结果
+        """
+        if not self._is_tree():
+            return self.css(query, domain=domain).get(default=default, is_url=is_url)
+
+        return self.xpath_get(css_to_xpath(query, self.type), default=default, domain=domain, is_url=is_url)
@@ -0,0 +1,140 @@
+import asyncio
+import functools
+import time
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from hssp.exception.exception import RobotsDisallowException
+from hssp.logger.log import hssp_logger
+from hssp.models.net import RequestModel
+
+
+class RobotsCache:
+    """
+    按主机缓存robots.txt，并发获取同一主机时只请求一次
+    规则参考RFC 9309：4xx视为没有限制，5xx和网络错误视为全部禁止，在缓存过期后重新获取
+    """
+
+    def __init__(self, net, user_agent: str = "*", ttl: float = 24 * 3600, error_ttl: float = 600):
+        """
+        Args:
+            net: 用于请求robots.txt的Net
+            user_agent: 匹配规则使用的UA名称
+            ttl: 缓存时间，单位是秒
+            error_ttl: 获取失败时的缓存时间，单位是秒
+        """
+        self.net = net
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.logger = hssp_logger.getChild("robots")
+        # 主机 -> (过期时间, 解析器)
+        self._cache: dict[str, tuple[float, RobotFileParser]] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    async def _fetch(self, origin: str) -> RobotFileParser:
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        ttl = self.ttl
+        try:
+            resp = await self.net.get(f"{origin}/robots.txt", retrys_count=0, raise_status=False)
+        except Exception as exception:
+            self.logger.warning(f"获取 {origin}/robots.txt 失败: {exception}")
+            parser.disallow_all = True
+            ttl = self.error_ttl
+        else:
+            if resp.status_code >= 500:
+                parser.disallow_all = True
+                ttl = self.error_ttl
+            elif resp.status_code >= 400:
+                parser.allow_all = True
+            else:
+                parser.parse(resp.text.splitlines())
+
+        parser.modified()
+        self._cache[origin] = (time.monotonic() + ttl, parser)
+        return parser
+
+    async def get_parser(self, url: str) -> RobotFileParser:
+        """
+        获取url所在主机的robots.txt解析器
+        Args:
+            url: 地址
+
+        Returns:
+
+        """
+        origin = self._origin(url)
+        cached = self._cache.get(origin)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        task = self._pending.get(origin)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(origin))
+            task.add_done_callback(functools.partial(self._fetch_done, origin))
+            self._pending[origin] = task
+        return await asyncio.shield(task)
+
+    def _fetch_done(self, origin: str, task: asyncio.Task):
+        if self._pending.get(origin) is task:
+            self._pending.pop(origin, None)
+
+    async def can_fetch(self, url: str) -> bool:
+        """
+        是否允许抓取，robots.txt本身总是允许
+        Args:
+            url: 地址
+
+        Returns:
+
+        """
+        if urlsplit(url).path == "/robots.txt":
+            return True
+        parser = await self.get_parser(url)
+        return parser.can_fetch(self.user_agent, url)
+
+    async def crawl_delay(self, url: str) -> float | None:
+        """
+        获取抓取间隔
+        Args:
+            url: 地址
+
+        Returns:
+
+        """
+        parser = await self.get_parser(url)
+        delay = parser.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+    async def sitemaps(self, url: str) -> list[str]:
+        """
+        获取robots.txt中声明的站点地图
+        Args:
+            url: 站点中的任意地址
+
+        Returns:
+
+        """
+        parser = await self.get_parser(url)
+        return parser.site_maps() or []
+
+    async def _check_request(self, request_data: RequestModel):
+        if not await self.can_fetch(request_data.url):
+            raise RobotsDisallowException(request_data.url)
+
+    def attach(self, net) -> "RobotsCache":
+        """
+        挂载到Net的请求前信号，不允许抓取的请求抛出 RobotsDisallowException，不会重试
+        Args:
+            net: 网络请求对象
+
+        Returns:
+
+        """
+        net.request_before_signal.connect(self._check_request)
+        return self
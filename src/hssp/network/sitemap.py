@@ -0,0 +1,241 @@
+import asyncio
+import contextlib
+import zlib
+from collections.abc import AsyncIterator
+from urllib.parse import urlsplit
+
+from lxml import etree
+
+from hssp.logger.log import hssp_logger
+from hssp.models.sitemap import SitemapUrlModel
+from hssp.network.robots import RobotsCache
+
+# gzip文件头
+GZIP_MAGIC = b"\x1f\x8b"
+
+# 队列结束标记
+_DONE = object()
+
+
+def _local_name(tag) -> str:
+    """
+    去掉命名空间的标签名，不同站点使用的命名空间不完全相同
+    Args:
+        tag: 标签
+
+    Returns:
+
+    """
+    if not isinstance(tag, str):
+        return ""
+    return tag.rpartition("}")[2]
+
+
+def _child_texts(element) -> dict[str, str]:
+    texts = {}
+    for child in element:
+        name = _local_name(child.tag)
+        if name and child.text:
+            texts[name] = child.text.strip()
+    return texts
+
+
+def _to_float(value: str | None) -> float | None:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class SitemapParser:
+    """
+    增量解析站点地图：边接收边解压、边解析，解析完的元素立即释放，内存占用和文件大小无关
+    """
+
+    def __init__(self, url: str):
+        """
+        Args:
+            url: 站点地图地址
+        """
+        self.url = url
+        self._decompressor = None
+        self._checked = False
+        self._parser = etree.XMLPullParser(events=("end",), resolve_entities=False, huge_tree=True)
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        if not self._checked:
+            self._checked = True
+            # .gz 文件可能已经被客户端按Content-Encoding解压，以文件头为准
+            if chunk[:2] == GZIP_MAGIC:
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._decompressor is None:
+            return chunk
+        return self._decompressor.decompress(chunk)
+
+    def feed(self, chunk: bytes) -> list[tuple[str, dict[str, str]]]:
+        """
+        输入一块数据，返回已经解析完成的条目
+        Args:
+            chunk: 原始数据
+
+        Returns:
+            返回 (类型, 字段) 列表，类型为 url 或 sitemap
+        """
+        data = self._decompress(chunk)
+        if data:
+            self._parser.feed(data)
+        return self._read_events()
+
+    def close(self) -> list[tuple[str, dict[str, str]]]:
+        """
+        输入结束，返回剩余的条目
+        Returns:
+
+        """
+        if self._decompressor is not None:
+            data = self._decompressor.flush()
+            if data:
+                self._parser.feed(data)
+        with contextlib.suppress(etree.XMLSyntaxError):
+            self._parser.close()
+        return self._read_events()
+
+    def _read_events(self) -> list[tuple[str, dict[str, str]]]:
+        entries = []
+        for _, element in self._parser.read_events():
+            name = _local_name(element.tag)
+            if name not in ("url", "sitemap"):
+                continue
+
+            texts = _child_texts(element)
+            if texts.get("loc"):
+                entries.append((name, texts))
+
+            # 释放已经处理过的元素
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+        return entries
+
+
+class SitemapIngester:
+    """
+    站点地图采集：流式下载并解析，并发跟进索引中的子站点地图，通过异步迭代器逐条返回url
+    """
+
+    def __init__(
+        self,
+        net,
+        concurrency: int = 4,
+        robots: RobotsCache | None = None,
+        queue_size: int = 1000,
+        max_sitemaps: int | None = None,
+    ):
+        """
+        Args:
+            net: 网络请求对象
+            concurrency: 同时下载的站点地图数
+            robots: robots.txt缓存，设置后跳过不允许抓取的站点地图和url
+            queue_size: 输出队列大小，消费慢时暂停下载
+            max_sitemaps: 最多下载的站点地图数，为空时不限制
+        """
+        self.net = net
+        self.concurrency = concurrency
+        self.robots = robots
+        self.queue_size = queue_size
+        self.max_sitemaps = max_sitemaps
+        self.logger = hssp_logger.getChild("sitemap")
+
+    async def _ingest(self, url: str, sitemaps: asyncio.Queue, output: asyncio.Queue, seen: set[str]):
+        parser = SitemapParser(url)
+
+        async def _put(entries):
+            for kind, texts in entries:
+                loc = texts["loc"]
+                if kind == "sitemap":
+                    if loc not in seen and (self.max_sitemaps is None or len(seen) < self.max_sitemaps):
+                        seen.add(loc)
+                        sitemaps.put_nowait(loc)
+                    continue
+
+                if self.robots is not None and not await self.robots.can_fetch(loc):
+                    continue
+                await output.put(
+                    SitemapUrlModel(
+                        loc=loc,
+                        lastmod=texts.get("lastmod"),
+                        changefreq=texts.get("changefreq"),
+                        priority=_to_float(texts.get("priority")),
+                        sitemap=url,
+                    )
+                )
+
+        async for chunk in self.net.stream(url):
+            await _put(parser.feed(chunk))
+        await _put(parser.close())
+
+    async def _worker(self, sitemaps: asyncio.Queue, output: asyncio.Queue, seen: set[str]):
+        while True:
+            url = await sitemaps.get()
+            try:
+                if self.robots is not None and not await self.robots.can_fetch(url):
+                    self.logger.info(f"robots.txt 不允许抓取站点地图 {url}")
+                    continue
+                await self._ingest(url, sitemaps, output, seen)
+            except Exception as exception:
+                self.logger.warning(f"站点地图 {url} 下载失败: {exception}")
+            finally:
+                sitemaps.task_done()
+
+    async def iter_urls(self, *urls: str) -> AsyncIterator[SitemapUrlModel]:
+        """
+        从站点地图获取url，站点地图索引中的子站点地图会被并发跟进
+        Args:
+            *urls: 站点地图或站点地图索引地址
+
+        Returns:
+            返回url的异步迭代器
+        """
+        sitemaps: asyncio.Queue = asyncio.Queue()
+        output: asyncio.Queue = asyncio.Queue(self.queue_size)
+        seen = set()
+        for url in urls:
+            if url not in seen:
+                seen.add(url)
+                sitemaps.put_nowait(url)
+
+        workers = [asyncio.create_task(self._worker(sitemaps, output, seen)) for _ in range(self.concurrency)]
+
+        async def _wait_done():
+            await sitemaps.join()
+            await output.put(_DONE)
+
+        waiter = asyncio.create_task(_wait_done())
+        try:
+            while True:
+                item = await output.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            waiter.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(waiter, *workers, return_exceptions=True)
+
+    async def iter_site(self, site: str) -> AsyncIterator[SitemapUrlModel]:
+        """
+        从robots.txt中发现站点地图，没有声明时使用 /sitemap.xml
+        Args:
+            site: 站点中的任意地址
+
+        Returns:
+            返回url的异步迭代器
+        """
+        robots = self.robots or RobotsCache(self.net)
+        parts = urlsplit(site)
+        urls = await robots.sitemaps(site) or [f"{parts.scheme}://{parts.netloc}/sitemap.xml"]
+        async for item in self.iter_urls(*urls):
+            yield item
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+from asyncio import Semaphore
+from collections.abc import Coroutine, Iterable
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
+
+from hssp.models.net import DownloaderEnum, RequestModel
+from hssp.network.downloader.base import DownloaderBase
+from hssp.network.net import Net
+from hssp.network.response import Response
+from hssp.utils.concurrency import ResizableSemaphore
+
+
+class SyncNet:
+    """
+    同步的网络请求：在后台线程中运行一个事件循环，所有请求共享同一个异步下载器和连接池
+    可以在多个线程中同时使用
+    """
+
+    def __init__(
+        self,
+        downloader_cls: type[DownloaderBase] | DownloaderEnum = DownloaderEnum.AIOHTTP,
+        sem: Semaphore | ResizableSemaphore = None,
+    ):
+        """
+        Args:
+            downloader_cls: 使用的下载器
+            sem: 信号量，控制并发
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="hssp-sync-net", daemon=True)
+        self._thread.start()
+        self._close_lock = threading.Lock()
+        self._closed = False
+
+        async def _create_net() -> Net:
+            # 下载器的客户端需要在事件循环中创建
+            return Net(downloader_cls, sem)
+
+        self._net: Net = self._call(_create_net())
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _call(self, coro: Coroutine, timeout: float | None = None):
+        """
+        把协程提交到后台事件循环并等待结果
+        Args:
+            coro: 协程
+            timeout: 等待的超时时间，超时后取消协程
+
+        Returns:
+
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("不能在 SyncNet 的事件循环中调用同步方法，请直接使用 net 属性的异步方法")
+        if self._closed:
+            coro.close()
+            raise RuntimeError("SyncNet 已经关闭")
+
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    @property
+    def net(self) -> Net:
+        """
+        后台事件循环中的Net，可以用来注册信号
+        Returns:
+
+        """
+        return self._net
+
+    def get_cookies(self):
+        return self._net.get_cookies()
+
+    def request(self, data: RequestModel) -> Response:
+        """
+        发起请求
+        Args:
+            data: 请求参数
+
+        Returns:
+            返回响应
+        """
+        return self._call(self._net.request(data))
+
+    def get(self, url: str, **kwargs) -> Response:
+        """
+        发起GET请求，参数同 Net.get
+        Args:
+            url: 地址
+            **kwargs: 其他参数
+
+        Returns:
+
+        """
+        return self._call(self._net.get(url, **kwargs))
+
+    def post(self, url: str, **kwargs) -> Response:
+        """
+        发起POST请求，参数同 Net.post
+        Args:
+            url: 地址
+            **kwargs: 其他参数
+
+        Returns:
+
+        """
+        return self._call(self._net.post(url, **kwargs))
+
+    def head(self, url: str, **kwargs) -> Response:
+        """
+        发起HEAD请求，参数同 Net.head
+        Args:
+            url: 地址
+            **kwargs: 其他参数
+
+        Returns:
+
+        """
+        return self._call(self._net.head(url, **kwargs))
+
+    def map(
+        self,
+        requests: Iterable[str | RequestModel],
+        method: str = "GET",
+        return_exceptions: bool = True,
+        **kwargs,
+    ) -> list[Response | BaseException]:
+        """
+        并发发起一批请求，按传入的顺序返回结果，并发量由Net的信号量控制
+        Args:
+            requests: url或请求模型的列表
+            method: 传入url时使用的请求方法
+            return_exceptions: 是否把异常作为结果返回，否则遇到异常时抛出
+            **kwargs: 传入url时创建请求模型的参数，同 Net.create_request_model
+
+        Returns:
+            返回响应列表
+        """
+        request_models = [
+            request if isinstance(request, RequestModel) else self._net.create_request_model(request, method, **kwargs)
+            for request in requests
+        ]
+
+        async def _map() -> list[Any]:
+            return await asyncio.gather(
+                *[self._net.request(request) for request in request_models],
+                return_exceptions=return_exceptions,
+            )
+
+        return self._call(_map())
+
+    def close(self):
+        """
+        关闭下载器并停止后台事件循环
+        Returns:
+
+        """
+        with self._close_lock:
+            if self._closed:
+                return
+            try:
+                self._call(self._net.close())
+            finally:
+                self._closed = True
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
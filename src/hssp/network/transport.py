@@ -0,0 +1,97 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from hssp.logger.log import hssp_logger
+from hssp.settings.settings import settings
+
+
+class _SharedItem:
+    __slots__ = ("loop", "transport", "refs", "close")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, transport, close: Callable[[Any], Awaitable]):
+        # 持有事件循环的引用，保证键中的id不会被新的事件循环复用
+        self.loop = loop
+        self.transport = transport
+        self.refs = 0
+        self.close = close
+
+
+class TransportPool:
+    """
+    共享的连接池：同一个事件循环中，同一种下载器的所有Net共用一个连接池
+    每个Net仍然有自己的会话，默认请求头、cookies和信号互不影响，创建Net时不再新建连接池
+    按引用计数管理，最后一个下载器释放后关闭
+    """
+
+    def __init__(self):
+        self._items: dict[tuple[str, int], _SharedItem] = {}
+        self.logger = hssp_logger.getChild("transport")
+
+    @staticmethod
+    def _running_loop() -> asyncio.AbstractEventLoop | None:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def acquire(
+        self, name: str, factory: Callable[[], Any], close: Callable[[Any], Awaitable]
+    ) -> tuple[tuple[str, int] | None, Any]:
+        """
+        获取共享的连接池，不在事件循环中或关闭了共享时不共享
+        Args:
+            name: 连接池的名称，一般是下载器的名称
+            factory: 创建连接池的方法
+            close: 关闭连接池的方法
+
+        Returns:
+            返回 (键, 连接池)，不共享时返回 (None, None)，由调用者按原来的方式创建
+        """
+        loop = self._running_loop()
+        if not settings.share_transport or loop is None:
+            return None, None
+
+        key = (name, id(loop))
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = _SharedItem(loop, factory(), close)
+            self.logger.debug(f"创建共享连接池 {name}")
+        item.refs += 1
+        return key, item.transport
+
+    async def release(self, key: tuple[str, int] | None):
+        """
+        释放共享的连接池，没有使用者后关闭
+        Args:
+            key: 获取时返回的键
+
+        Returns:
+
+        """
+        item = self._items.get(key) if key is not None else None
+        if item is None:
+            return
+
+        item.refs -= 1
+        if item.refs > 0:
+            return
+
+        del self._items[key]
+        await item.close(item.transport)
+        self.logger.debug(f"关闭共享连接池 {key[0]}")
+
+    def refs(self, name: str) -> int:
+        """
+        当前事件循环中连接池的使用者数量
+        Args:
+            name: 连接池的名称
+
+        Returns:
+
+        """
+        item = self._items.get((name, id(self._running_loop())))
+        return item.refs if item is not None else 0
+
+
+shared_transport = TransportPool()
@@ -0,0 +1,2 @@
+from hssp.pipeline.pipeline import ItemPipeline
+from hssp.pipeline.writer import BatchWriter, CsvWriter, JsonlWriter, ParquetWriter, SqliteWriter
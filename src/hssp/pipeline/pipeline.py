@@ -0,0 +1,212 @@
+import asyncio
+import time
+from collections.abc import Callable
+from inspect import isawaitable
+from typing import Any
+
+from pydantic import BaseModel
+
+from hssp.logger.log import hssp_logger
+from hssp.pipeline.writer import BatchWriter
+
+# 结束标记
+_STOP = object()
+
+
+class ItemPipeline:
+    """
+    异步的数据管道：数据按顺序经过处理器，再缓冲后批量交给写入器
+    缓冲区满时 put 会等待，形成背压，写入在线程中执行，不会阻塞事件循环
+    """
+
+    def __init__(
+        self,
+        processors: list[Callable[[dict], Any]] | None = None,
+        writers: list[BatchWriter] | None = None,
+        buffer_size: int = 10000,
+        batch_size: int = 1000,
+        flush_interval: float = 5,
+    ):
+        """
+        Args:
+            processors: 处理器列表，可以是同步或异步函数，返回处理后的数据，返回None时丢弃该数据
+            writers: 写入器列表
+            buffer_size: 缓冲区大小，缓冲区满时生产者会等待
+            batch_size: 每批写入的数量，达到后立即写入
+            flush_interval: 最长的写入间隔，单位是秒
+        """
+        self.processors = processors or []
+        self.writers = writers or []
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = hssp_logger.getChild("pipeline")
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self._task: asyncio.Task | None = None
+        self._start_lock = asyncio.Lock()
+
+        # 统计
+        self.items_count = 0
+        self.dropped_count = 0
+        self.written_count = 0
+        self._start_time: float | None = None
+        self._end_time: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        if self._start_time is None:
+            return 0
+        return (self._end_time or time.perf_counter()) - self._start_time
+
+    @property
+    def items_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.written_count / elapsed if elapsed else 0
+
+    async def start(self):
+        """
+        打开写入器并启动消费任务
+        Returns:
+
+        """
+        # 多个生产者同时第一次放入数据时只启动一个消费任务
+        async with self._start_lock:
+            if self._task:
+                return
+
+            for writer in self.writers:
+                await asyncio.to_thread(writer.open)
+            self._start_time = time.perf_counter()
+            self._task = asyncio.create_task(self._consume())
+
+    async def put(self, item: dict | BaseModel):
+        """
+        放入一条数据，缓冲区满时等待
+        Args:
+            item: 数据，字典或pydantic模型
+
+        Returns:
+
+        """
+        if self._task is None:
+            await self.start()
+        self._check_consumer()
+        await self._wait_put(item)
+        self._check_consumer()
+
+    def _check_consumer(self):
+        if self._task.done():
+            # 消费任务异常退出时抛出它的异常，避免生产者一直等待
+            self._task.result()
+            raise RuntimeError("数据管道已关闭")
+
+    async def _wait_put(self, item):
+        """
+        放入缓冲区，缓冲区满时等待，同时等待消费任务，消费任务异常退出后不再继续等待
+        Args:
+            item: 数据
+
+        Returns:
+
+        """
+        if not self._queue.full():
+            self._queue.put_nowait(item)
+            return
+
+        put_task = asyncio.ensure_future(self._queue.put(item))
+        try:
+            await asyncio.wait((put_task, self._task), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not put_task.done():
+                put_task.cancel()
+
+    async def _process(self, item: dict | BaseModel) -> dict | None:
+        for processor in self.processors:
+            item = processor(item)
+            if isawaitable(item):
+                item = await item
+            if item is None:
+                return None
+
+        return item.model_dump() if isinstance(item, BaseModel) else item
+
+    async def _flush(self, batch: list[dict]):
+        if not batch:
+            return
+
+        await asyncio.gather(*[asyncio.to_thread(writer.write_batch, batch) for writer in self.writers])
+        self.written_count += len(batch)
+
+    async def _consume(self):
+        batch = []
+        failed = False
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                if not self._queue.empty():
+                    item = self._queue.get_nowait()
+                else:
+                    timeout = max(deadline - time.monotonic(), 0)
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:  # noqa: UP041
+                        item = None
+
+                if item is _STOP:
+                    break
+
+                if item is not None:
+                    self.items_count += 1
+                    item = await self._process(item)
+                    if item is None:
+                        self.dropped_count += 1
+                    else:
+                        batch.append(item)
+
+                if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                    # 先取出这一批，写入失败时不会在结束时重复写入，已经写入成功的写入器不会出现重复数据
+                    flushing, batch = batch, []
+                    await self._flush(flushing)
+                    deadline = time.monotonic() + self.flush_interval
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            failed = True
+            # 缓冲区中的数据不会再写入，释放掉
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            raise
+        finally:
+            # 关闭或取消时把剩下的数据写完，处理或写入出错时不再写入
+            if not failed:
+                await self._flush(batch)
+
+    async def close(self):
+        """
+        写完缓冲区中的数据并关闭写入器
+        Returns:
+
+        """
+        if self._task is None:
+            return
+
+        if not self._task.done():
+            await self._wait_put(_STOP)
+        try:
+            await self._task
+        finally:
+            self._end_time = time.perf_counter()
+            for writer in self.writers:
+                await asyncio.to_thread(writer.close)
+            self._task = None
+            self.logger.info(
+                f"数据管道关闭，接收: {self.items_count} 丢弃: {self.dropped_count} 写入: {self.written_count} "
+                f"耗时: {self.elapsed:.2f}s 吞吐: {self.items_per_second:.0f} 条/秒"
+            )
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
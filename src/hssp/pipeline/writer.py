@@ -0,0 +1,223 @@
+import csv
+import gzip
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+
+def open_text(path: Path, compress: str | None = None):
+    """
+    以追加模式打开文本文件，支持gzip压缩
+    Args:
+        path: 文件路径
+        compress: 压缩方式，None或gzip
+
+    Returns:
+        返回文件对象
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compress == "gzip":
+        return gzip.open(path, "at", encoding="utf-8", newline="")
+    if compress:
+        raise ValueError(f"不支持的压缩方式: {compress}")
+    return open(path, "a", encoding="utf-8", newline="")
+
+
+class BatchWriter(ABC):
+    """
+    批量写入器的基类，write_batch 在线程中执行，可以使用同步的文件或数据库操作
+    """
+
+    @abstractmethod
+    def open(self):
+        """
+        打开写入器
+        Returns:
+
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_batch(self, items: list[dict[str, Any]]):
+        """
+        写入一批数据
+        Args:
+            items: 数据列表
+
+        Returns:
+
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def close(self):
+        """
+        关闭写入器
+        Returns:
+
+        """
+        raise NotImplementedError
+
+
+class JsonlWriter(BatchWriter):
+    """
+    写入jsonl文件，每行一条数据
+    """
+
+    def __init__(self, path: str | Path, compress: str | None = None):
+        """
+        Args:
+            path: 文件路径
+            compress: 压缩方式，None或gzip
+        """
+        self.path = Path(path)
+        self.compress = compress
+        self._file = None
+
+    def open(self):
+        self._file = open_text(self.path, self.compress)
+
+    def write_batch(self, items: list[dict[str, Any]]):
+        lines = [json.dumps(item, ensure_ascii=False, default=str) for item in items]
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class CsvWriter(BatchWriter):
+    """
+    写入csv文件，不指定字段时使用第一条数据的字段
+    """
+
+    def __init__(self, path: str | Path, fields: list[str] | None = None, compress: str | None = None):
+        """
+        Args:
+            path: 文件路径
+            fields: 字段列表
+            compress: 压缩方式，None或gzip
+        """
+        self.path = Path(path)
+        self.fields = fields
+        self.compress = compress
+        self._file = None
+        self._writer = None
+        self._header_written = False
+
+    def open(self):
+        exists = self.path.exists() and self.path.stat().st_size > 0
+        self._file = open_text(self.path, self.compress)
+        # 追加写入已有的文件时不再写表头
+        self._header_written = exists
+
+    def write_batch(self, items: list[dict[str, Any]]):
+        if self._writer is None:
+            self.fields = self.fields or list(items[0].keys())
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction="ignore")
+            if not self._header_written:
+                self._writer.writeheader()
+
+        self._writer.writerows(items)
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+class SqliteWriter(BatchWriter):
+    """
+    写入sqlite数据库，表不存在时按字段自动创建
+    """
+
+    def __init__(self, path: str | Path, table: str, fields: list[str] | None = None):
+        """
+        Args:
+            path: 数据库路径
+            table: 表名
+            fields: 字段列表，不指定时使用第一条数据的字段
+        """
+        self.path = Path(path)
+        self.table = table
+        self.fields = fields
+        self._conn: sqlite3.Connection | None = None
+        self._sql = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # write_batch 在线程池中执行，不限制连接所在的线程
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+    def _prepare(self, item: dict[str, Any]):
+        self.fields = self.fields or list(item.keys())
+        columns = ", ".join(f'"{field}"' for field in self.fields)
+        placeholders = ", ".join("?" for _ in self.fields)
+        self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" ({columns})')
+        self._sql = f'INSERT INTO "{self.table}" ({columns}) VALUES ({placeholders})'  # nosec
+
+    @staticmethod
+    def _to_value(value):
+        if value is None or isinstance(value, int | float | str | bytes):
+            return value
+        return json.dumps(value, ensure_ascii=False, default=str)
+
+    def write_batch(self, items: list[dict[str, Any]]):
+        if self._sql is None:
+            self._prepare(items[0])
+
+        rows = [tuple(self._to_value(item.get(field)) for field in self.fields) for item in items]
+        with self._conn:
+            self._conn.executemany(self._sql, rows)
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+
+class ParquetWriter(BatchWriter):
+    """
+    写入parquet文件，需要安装pyarrow，每批数据写为一个row group
+    """
+
+    def __init__(self, path: str | Path, compression: str = "snappy"):
+        """
+        Args:
+            path: 文件路径
+            compression: 压缩方式，snappy、gzip、zstd等
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as exc:
+            raise ImportError("使用 ParquetWriter 需要先安装 pyarrow: pip install pyarrow") from exc
+
+        self.path = Path(path)
+        self.compression = compression
+        self._writer = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write_batch(self, items: list[dict[str, Any]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            table = pa.Table.from_pylist(items)
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+        else:
+            table = pa.Table.from_pylist(items, schema=self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,2 @@
+from hssp.scheduler.incremental import IncrementalCrawler
+from hssp.scheduler.store import MemoryStateStore, SqliteStateStore, StateStore
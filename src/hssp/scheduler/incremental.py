@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import time
+from collections.abc import Callable, Iterable
+from datetime import datetime
+from inspect import isawaitable
+from typing import Any
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from hssp.logger.log import hssp_logger
+from hssp.models.scheduler import IncrementalReportModel, UrlStateModel
+from hssp.network.net import Net
+from hssp.network.response import Response
+from hssp.pipeline import ItemPipeline
+from hssp.scheduler.store import MemoryStateStore, StateStore
+from hssp.settings.settings import settings
+
+# 解析函数：传入响应，返回数据列表，可以是同步或异步函数
+ParseFuncType = Callable[[Response], Any]
+
+
+def _get_header(headers: dict, name: str) -> str | None:
+    name = name.lower()
+    return next((value for key, value in headers.items() if key.lower() == name), None)
+
+
+class IncrementalCrawler:
+    """
+    增量抓取：记录每个url上次的ETag、Last-Modified和内容哈希，发送条件请求
+    内容没有变化的页面跳过解析和数据管道，并根据内容实际变化的频率调整每个url的访问间隔
+    """
+
+    def __init__(
+        self,
+        net: Net,
+        parse: ParseFuncType,
+        pipeline: ItemPipeline | None = None,
+        store: StateStore | None = None,
+        default_interval: float = 3600,
+        min_interval: float = 60,
+        max_interval: float = 7 * 24 * 3600,
+        backoff: float = 1.5,
+        speedup: float = 0.5,
+        concurrency: int | None = None,
+    ):
+        """
+        Args:
+            net: 网络请求对象
+            parse: 解析函数，只在内容变化时调用，返回的数据放入数据管道
+            pipeline: 数据管道
+            store: 状态存储，默认保存在内存中
+            default_interval: 新url的访问间隔，单位是秒
+            min_interval: 最小访问间隔
+            max_interval: 最大访问间隔
+            backoff: 内容没有变化时访问间隔的放大倍数
+            speedup: 内容变化时访问间隔的缩小倍数
+            concurrency: 每轮同时访问的url数量，默认使用设置中的并发量
+        """
+        self.net = net
+        self.parse = parse
+        self.pipeline = pipeline
+        self.store = store or MemoryStateStore()
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.speedup = speedup
+        self.concurrency = concurrency
+        self.logger = hssp_logger.getChild("incremental")
+        self._scheduler: AsyncIOScheduler | None = None
+
+    async def add_urls(self, urls: Iterable[str], interval: float | None = None):
+        """
+        添加需要定期访问的url，已经存在的url不会重置状态
+        Args:
+            urls: url列表
+            interval: 初始访问间隔，默认使用 default_interval
+
+        Returns:
+
+        """
+        for url in urls:
+            if await asyncio.to_thread(self.store.get, url) is not None:
+                continue
+            state = UrlStateModel(url=url, interval=interval or self.default_interval)
+            await asyncio.to_thread(self.store.set, state)
+
+    def _conditional_headers(self, state: UrlStateModel) -> dict[str, Any]:
+        headers = dict(settings.headers or {})
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+        return headers
+
+    def _adjust_interval(self, state: UrlStateModel, changed: bool) -> float:
+        interval = state.interval * (self.speedup if changed else self.backoff)
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    async def _handle_items(self, response: Response):
+        items = self.parse(response)
+        if isawaitable(items):
+            items = await items
+        if not items or self.pipeline is None:
+            return
+
+        for item in items:
+            await self.pipeline.put(item)
+
+    async def crawl_url(self, state: UrlStateModel, report: IncrementalReportModel | None = None) -> bool | None:
+        """
+        访问单个url，内容变化时解析并更新状态
+        Args:
+            state: url的状态
+            report: 统计
+
+        Returns:
+            内容变化时返回True，没有变化时返回False，请求失败时返回None
+        """
+        report = report or IncrementalReportModel()
+        now = time.time()
+        request_data = self.net.create_request_model(
+            url=state.url,
+            method="GET",
+            headers=self._conditional_headers(state),
+            # 304需要自己处理，不能当作异常
+            raise_status=False,
+        )
+        try:
+            response = await self.net.request(request_data)
+        except Exception as exception:
+            report.failed += 1
+            self.logger.error(f"增量抓取 {state.url} 失败: {exception}")
+            state.next_visit = now + min(state.interval, self.min_interval)
+            await asyncio.to_thread(self.store.set, state)
+            return None
+
+        if response.status_code >= 400:
+            report.failed += 1
+            self.logger.error(f"增量抓取 {state.url} 响应状态: {response.status_code}")
+            state.next_visit = now + min(state.interval, self.min_interval)
+            await asyncio.to_thread(self.store.set, state)
+            return None
+
+        first_visit = state.visits == 0
+        state.visits += 1
+        state.last_visit = now
+
+        changed = False
+        if response.status_code == 304:
+            report.not_modified += 1
+        else:
+            content = response.content or b""
+            report.bytes_received += len(content)
+            content_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+            changed = content_hash != state.content_hash
+            state.content_hash = content_hash
+            state.etag = _get_header(response.headers, "ETag") or state.etag
+            state.last_modified = _get_header(response.headers, "Last-Modified") or state.last_modified
+            if changed:
+                report.changed += 1
+                await self._handle_items(response)
+            else:
+                report.unchanged += 1
+
+        if changed:
+            state.changes += 1
+            state.last_changed = now
+        # 第一次访问还不知道变化频率，保持初始间隔
+        if not first_visit:
+            state.interval = self._adjust_interval(state, changed)
+        state.next_visit = now + state.interval
+        await asyncio.to_thread(self.store.set, state)
+        return changed
+
+    async def run_once(self, limit: int | None = None) -> IncrementalReportModel:
+        """
+        访问所有到期的url
+        Args:
+            limit: 本轮最多访问的数量
+
+        Returns:
+            返回本轮的统计
+        """
+        start_time = time.perf_counter()
+        states = await asyncio.to_thread(self.store.due, time.time(), limit)
+        report = IncrementalReportModel(total=len(states))
+        sem = asyncio.Semaphore(self.concurrency or settings.concurrency)
+
+        async def _crawl(_state: UrlStateModel):
+            async with sem:
+                await self.crawl_url(_state, report)
+
+        await asyncio.gather(*[_crawl(state) for state in states])
+        report.elapsed = time.perf_counter() - start_time
+        self.logger.info(
+            f"增量抓取完成 到期: {report.total} 变化: {report.changed} 304: {report.not_modified} "
+            f"内容未变: {report.unchanged} 失败: {report.failed} 接收: {report.bytes_received}字节 "
+            f"耗时: {report.elapsed:.3f}s"
+        )
+        return report
+
+    def start(self, seconds: float = 60, scheduler: AsyncIOScheduler | None = None) -> AsyncIOScheduler:
+        """
+        使用apscheduler定时检查到期的url，需要在事件循环中调用
+        Args:
+            seconds: 检查间隔，单位是秒
+            scheduler: 调度器，默认新建一个并启动
+
+        Returns:
+            返回调度器
+        """
+        if scheduler is None:
+            scheduler = AsyncIOScheduler()
+        self._scheduler = scheduler
+        scheduler.add_job(
+            self.run_once,
+            "interval",
+            seconds=seconds,
+            # 上一轮还没结束时跳过，不重复执行
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now(),
+        )
+        if not scheduler.running:
+            scheduler.start()
+        return scheduler
+
+    def shutdown(self):
+        """
+        停止定时任务
+        Returns:
+
+        """
+        if self._scheduler is not None and self._scheduler.running:
+            self._scheduler.shutdown(wait=False)
+        self._scheduler = None
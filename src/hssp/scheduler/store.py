@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from hssp.models.scheduler import UrlStateModel
+
+
+class StateStore(ABC):
+    """
+    url状态存储的基类
+    """
+
+    @abstractmethod
+    def get(self, url: str) -> UrlStateModel | None:
+        """
+        获取url的状态
+        Args:
+            url: 地址
+
+        Returns:
+
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, state: UrlStateModel):
+        """
+        保存url的状态
+        Args:
+            state: 状态
+
+        Returns:
+
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def due(self, now: float, limit: int | None = None) -> list[UrlStateModel]:
+        """
+        获取到期需要访问的url，按到期时间排序
+        Args:
+            now: 当前时间戳
+            limit: 最多返回的数量
+
+        Returns:
+
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        关闭存储
+        Returns:
+
+        """
+        return None
+
+
+class MemoryStateStore(StateStore):
+    """
+    保存在内存中的状态，进程退出后丢失
+    """
+
+    def __init__(self):
+        self._states: dict[str, UrlStateModel] = {}
+
+    def get(self, url: str) -> UrlStateModel | None:
+        return self._states.get(url)
+
+    def set(self, state: UrlStateModel):
+        self._states[state.url] = state
+
+    def due(self, now: float, limit: int | None = None) -> list[UrlStateModel]:
+        states = sorted(
+            (state for state in self._states.values() if state.next_visit <= now),
+            key=lambda state: state.next_visit,
+        )
+        return states[:limit] if limit else states
+
+
+class SqliteStateStore(StateStore):
+    """
+    保存在sqlite数据库中的状态，可以跨进程、跨运行保留
+    """
+
+    def __init__(self, path: str | Path, table: str = "url_state"):
+        """
+        Args:
+            path: 数据库路径
+            table: 表名
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{table}" (url TEXT PRIMARY KEY, next_visit REAL, state TEXT)'  # nosec
+        )
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS "{table}_next_visit" ON "{table}" (next_visit)')
+
+    def get(self, url: str) -> UrlStateModel | None:
+        with self._lock:
+            row = self._conn.execute(f'SELECT state FROM "{self.table}" WHERE url = ?', (url,)).fetchone()  # nosec
+        return UrlStateModel.model_validate_json(row[0]) if row else None
+
+    def set(self, state: UrlStateModel):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO "{self.table}" (url, next_visit, state) VALUES (?, ?, ?)',  # nosec
+                (state.url, state.next_visit, state.model_dump_json()),
+            )
+
+    def due(self, now: float, limit: int | None = None) -> list[UrlStateModel]:
+        sql = f'SELECT state FROM "{self.table}" WHERE next_visit <= ? ORDER BY next_visit'  # nosec
+        params: tuple = (now,)
+        if limit:
+            sql += " LIMIT ?"
+            params = (now, limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [UrlStateModel.model_validate_json(row[0]) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
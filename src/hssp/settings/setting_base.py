@@ -1,5 +1,6 @@
 from abc import ABCMeta
 from configparser import ConfigParser
+from contextvars import ContextVar
 from pathlib import Path
 from typing import Any
 
@@ -16,6 +17,18 @@ from pydantic_settings.sources import (
     YamlConfigSettingsSource,
 )
 
+# 读取配置文件的目录，为空时使用当前目录下的configs，重新加载指定目录的配置时临时设置
+config_dir_var: ContextVar[Path | None] = ContextVar("config_dir", default=None)
+
+
+def get_config_dir() -> Path:
+    """
+    获取读取配置文件的目录
+    Returns:
+
+    """
+    return config_dir_var.get() or (Path.cwd() / "configs").absolute()
+
 
 class IniConfigSettingsSource(InitSettingsSource, ConfigFileSourceMixin):
     """
@@ -83,7 +96,7 @@ class SettingsBase(BaseSettings, metaclass=ABCMeta):
             dotenv_settings,
             file_secret_settings,
         }
-        root_dir = (Path.cwd() / "configs").absolute()
+        root_dir = get_config_dir()
 
         # json 配置文件
         json_file = root_dir / "settings.json"
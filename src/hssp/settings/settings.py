@@ -19,7 +19,7 @@ class Settings(SettingsBase):
     # 日志模式
     log_mode: LogMode = LogMode.INFO
 
-    # 默认并发量
+    # 默认并发量，只有在配置文件或环境变量中设置了才会限制Net的并发，没有设置时不限制
     concurrency: int = 32
 
     # 请求UA
@@ -43,5 +43,108 @@ class Settings(SettingsBase):
     # 默认每次重视之间的延迟，单位是秒
     retrys_delay: int = 0
 
+    # 是否使用共享的DNS解析缓存
+    dns_cache: bool = True
+
+    # DNS解析结果的默认缓存时间，单位是秒
+    dns_ttl: int = 300
+
+    # DNS解析失败的缓存时间，单位是秒
+    dns_negative_ttl: int = 30
+
+    # 内存中响应体的总字节预算，超出后新的下载会等待，None为不限制
+    memory_budget: int | None = None
+
+    # 内存预算用完后最多等待的秒数，超时后照常下载，响应体写入临时文件，None为一直等待
+    memory_budget_timeout: float | None = 10
+
+    # 单个响应体超过该字节数时写入临时文件，通过mmap访问，None为不写入
+    spill_threshold: int | None = None
+
+    # 单个响应体的最大字节数，超出后放弃下载，None为不限制
+    max_body_size: int | None = None
+
+    # 查找 <meta charset> 的字节数
+    encoding_sniff_size: int = 4096
+
+    # 检测编码时最多使用的字节数
+    encoding_detect_size: int = 32 * 1024
+
+    # 按主机缓存检测出的编码的数量
+    encoding_cache_size: int = 4096
+
+    # 检测样本中至少有这么多非ascii字节时才缓存检测结果，样本太少时检测结果不可靠
+    encoding_cache_min_bytes: int = 256
+
+    # 渲染下载器最多同时打开的浏览器数量
+    render_pool_size: int = 2
+
+    # 渲染下载器每个浏览器最多打开的标签页数量
+    render_tabs_per_browser: int = 4
+
+    # 渲染下载器每个浏览器渲染多少页面后回收重建
+    render_max_pages: int = 200
+
+    # 渲染时是否屏蔽图片、字体和音视频
+    render_block_resources: bool = True
+
+    # 渲染时是否使用无头模式
+    render_headless: bool = True
+
+    # 回放下载器读取的录制文件或目录
+    replay_path: str | None = None
+
+    # json编解码器，json、orjson、msgspec或auto，auto时使用已安装的最快的一个
+    # 默认使用标准库，orjson会把超过64位的整数解析为浮点数，确认接口没有这种数据时再切换
+    json_codec: str = "json"
+
+    # 同一个事件循环中的Net是否共用每种下载器的连接池
+    share_transport: bool = True
+
+    # 下载器按代理缓存的客户端数量，超出后关闭最久未使用的
+    max_proxy_clients: int = 8
+
+    # 同步的信号接收者执行超过该秒数时打印警告，None为不检查
+    slow_receiver_threshold: float | None = 0.1
+
+    # 事件循环延迟超过该秒数时视为卡顿
+    loop_lag_threshold: float = 0.1
+
+    # 路由下载器按主机指定的下载器，包含子域名，比如 {"example.com": "curl_cffi"}
+    route_rules: dict[str, str] = {}
+
+    # 路由下载器没有匹配规则时使用的下载器
+    route_default: str = "aiohttp"
+
+    # 路由下载器是否为没有规则的主机自动选择下载器
+    route_auto: bool = False
+
+    # 自动选择时尝试的下载器
+    route_candidates: list[str] = ["aiohttp", "curl_cffi", "httpx"]
+
+    # 自动选择时每个下载器至少尝试的次数
+    route_min_samples: int = 5
+
+    # 自动选择后继续随机尝试其他下载器的概率
+    route_explore_rate: float = 0.05
+
+    # 路由下载器最多记录的主机数量，超出后淘汰最久没有请求的主机的统计和规则匹配结果
+    route_cache_size: int = 10000
+
+    # 是否合并进行中的相同请求，相同的请求正在进行时后来的调用者共用它的响应
+    coalesce: bool = False
+
+    # 合并请求时默认允许的方法，非幂等的方法合并后只会发送一次，不要加入
+    coalesce_methods: list[str] = ["GET", "HEAD"]
+
+    # 合并请求时计入指纹的请求头，这些请求头不同的请求不会合并
+    coalesce_headers: list[str] = ["Authorization", "Cookie"]
+
+    # 按主机允许合并的方法，包含子域名，优先于上面两项，比如 {"api.example.com": ["GET", "POST"]}，空列表为不合并
+    coalesce_rules: dict[str, list[str]] = {}
+
+    # 分页迭代时页码可以预测的情况下最多提前请求的页数
+    paginate_prefetch: int = 4
+
 
 settings = Settings()
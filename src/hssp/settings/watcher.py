@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+import logging
+from pathlib import Path
+from typing import Any
+
+from blinker import signal as get_signal
+from pydantic import ValidationError
+
+from hssp.logger.log import hssp_logger
+from hssp.settings.setting_base import config_dir_var, get_config_dir
+from hssp.settings.settings import settings
+
+# 监听的配置文件，和 SettingsBase 读取的文件一致
+CONFIG_FILES = ("settings.json", "settings.ini", "settings.yaml", "settings.toml", ".env")
+
+# 运行中可以直接生效的设置，其余设置只对之后创建的对象生效
+LIVE_FIELDS = frozenset(
+    {
+        "log_mode",
+        "concurrency",
+        "user_agent",
+        "headers",
+        "cookies",
+        "timeout",
+        "proxy",
+        "retrys_count",
+        "retrys_delay",
+        "dns_ttl",
+        "dns_negative_ttl",
+        "memory_budget",
+        "memory_budget_timeout",
+        "spill_threshold",
+        "max_body_size",
+    }
+)
+
+# 设置变化信号，参数为 字段名 -> (旧值, 新值)
+settings_changed_signal = get_signal("settings_changed")
+
+logger = hssp_logger.getChild("settings")
+
+
+def reload_settings(config_dir: str | Path | None = None) -> dict[str, tuple[Any, Any]]:
+    """
+    重新读取配置文件，把变化的字段就地写入全局设置，并发送设置变化信号
+    已经在进行中的请求使用的是创建请求时的设置，不受影响
+    Args:
+        config_dir: 配置文件目录，默认是当前目录下的configs
+
+    Returns:
+        返回变化的字段：字段名 -> (旧值, 新值)
+    """
+    token = config_dir_var.set(Path(config_dir).absolute()) if config_dir else None
+    try:
+        new_settings = type(settings)(_env_file=get_config_dir() / ".env")
+    finally:
+        if token is not None:
+            config_dir_var.reset(token)
+    old_data = settings.model_dump()
+    new_data = new_settings.model_dump()
+
+    changes = {
+        name: (old_data.get(name), new_data.get(name))
+        for name in old_data.keys() | new_data.keys()
+        if old_data.get(name) != new_data.get(name)
+    }
+    if not changes:
+        return changes
+
+    for name, (old_value, new_value) in changes.items():
+        setattr(settings, name, getattr(new_settings, name, None))
+        if name in LIVE_FIELDS:
+            logger.info(f"设置 {name} 已更新: {old_value} -> {new_value}")
+        else:
+            logger.warning(f"设置 {name} 已更新: {old_value} -> {new_value}，只对之后创建的对象生效")
+
+    if "log_mode" in changes:
+        logging.getLogger().setLevel(settings.log_mode)
+
+    settings_changed_signal.send(changes)
+    return changes
+
+
+class SettingsWatcher:
+    """
+    配置文件监听器，定时检查配置文件的修改时间，有变化时重新加载设置
+    """
+
+    def __init__(self, interval: float = 2, config_dir: str | Path | None = None):
+        """
+        Args:
+            interval: 检查间隔，单位是秒
+            config_dir: 配置文件目录，默认是当前目录下的configs
+        """
+        self.interval = interval
+        self.config_dir = Path(config_dir).absolute() if config_dir else get_config_dir()
+        self._mtimes = self._scan()
+        self._task: asyncio.Task | None = None
+
+    def _scan(self) -> dict[str, float]:
+        mtimes = {}
+        for name in CONFIG_FILES:
+            file = self.config_dir / name
+            if file.exists():
+                mtimes[name] = file.stat().st_mtime
+        return mtimes
+
+    def check(self) -> dict[str, tuple[Any, Any]]:
+        """
+        检查一次配置文件，有变化时重新加载
+        配置文件有误时保留原来的设置
+        Returns:
+            返回变化的字段
+        """
+        mtimes = self._scan()
+        if mtimes == self._mtimes:
+            return {}
+
+        self._mtimes = mtimes
+        try:
+            return reload_settings(self.config_dir)
+        except (ValidationError, ValueError, OSError) as exception:
+            logger.error(f"重新加载设置失败，继续使用原来的设置: {exception}")
+            return {}
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.check()
+
+    def start(self) -> "SettingsWatcher":
+        """
+        在当前事件循环中开始监听
+        Returns:
+
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+        return self
+
+    async def stop(self):
+        """
+        停止监听
+        Returns:
+
+        """
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
@@ -0,0 +1,194 @@
+import json
+from functools import cache, lru_cache
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+
+from hssp.settings.settings import settings
+
+
+class JsonCodec:
+    """
+    标准库json编解码
+    """
+
+    name = "json"
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    orjson编解码，比标准库快数倍
+    NaN、Infinity等orjson不支持的内容回退到标准库解析；超过64位的整数会被解析为浮点数，丢失精度
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        # 和标准库一样允许非字符串的键
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data: bytes | str) -> Any:
+        try:
+            return self._orjson.loads(data)
+        except self._orjson.JSONDecodeError:
+            # 标准库能解析的内容保持原来的结果，确实有误时由标准库抛出异常
+            return super().loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj, option=self._option)
+
+
+class MsgspecCodec(JsonCodec):
+    """
+    msgspec编解码，NaN、Infinity等msgspec不支持的内容回退到标准库解析
+    """
+
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._decoder = msgspec.json.Decoder()
+        self._decode_error = msgspec.DecodeError
+        self._encoder = msgspec.json.Encoder()
+
+    def loads(self, data: bytes | str) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except self._decode_error:
+            return super().loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+
+# auto 时按顺序选择第一个已安装的
+JSON_CODECS: dict[str, type[JsonCodec]] = {
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "json": JsonCodec,
+}
+
+
+@cache
+def _create_codec(name: str) -> JsonCodec:
+    if name != "auto":
+        if name not in JSON_CODECS:
+            raise ValueError(f"未知的json编解码器 {name}，可选 auto、{'、'.join(JSON_CODECS)}")
+        return JSON_CODECS[name]()
+
+    for codec_cls in JSON_CODECS.values():
+        try:
+            return codec_cls()
+        except ImportError:
+            continue
+    return JsonCodec()
+
+
+def get_json_codec() -> JsonCodec:
+    """
+    获取设置中指定的json编解码器
+    Returns:
+
+    """
+    return _create_codec(settings.json_codec)
+
+
+def json_loads(data: bytes | str) -> Any:
+    """
+    解析json，格式错误时抛出 ValueError 的子类
+    Args:
+        data: json字节或文本
+
+    Returns:
+
+    """
+    return get_json_codec().loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    序列化为utf-8编码的紧凑json
+    Args:
+        obj: 对象
+
+    Returns:
+
+    """
+    return get_json_codec().dumps(obj)
+
+
+def get_path(data: Any, path: str) -> Any:
+    """
+    按点分隔的路径取出解析后的json中的值，列表使用数字下标，比如 data.items.0.id
+    Args:
+        data: 解析后的json
+        path: 路径
+
+    Returns:
+
+    """
+    for key in path.split("."):
+        data = data[int(key)] if isinstance(data, list) else data[key]
+    return data
+
+
+def _is_struct(tp) -> bool:
+    try:
+        import msgspec
+    except ImportError:
+        return False
+    return isinstance(tp, type) and issubclass(tp, msgspec.Struct)
+
+
+@lru_cache(maxsize=256)
+def _type_adapter(tp) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def decode_json_as(data: bytes | str, tp):
+    """
+    把json直接解析为指定的类型，不经过中间的dict
+    msgspec的Struct使用msgspec解析，pydantic模型和其余类型（比如 list[Model]）使用pydantic-core解析
+    Args:
+        data: json字节或文本
+        tp: 目标类型
+
+    Returns:
+
+    """
+    if _is_struct(tp):
+        import msgspec
+
+        return msgspec.json.decode(data, type=tp)
+    if isinstance(tp, type) and issubclass(tp, BaseModel):
+        return tp.model_validate_json(data)
+    return _type_adapter(tp).validate_json(data)
+
+
+def convert_as(data: Any, tp):
+    """
+    把已经解析好的python对象转换为指定的类型
+    Args:
+        data: python对象
+        tp: 目标类型
+
+    Returns:
+
+    """
+    if _is_struct(tp):
+        import msgspec
+
+        return msgspec.convert(data, type=tp)
+    if isinstance(tp, type) and issubclass(tp, BaseModel):
+        return tp.model_validate(data)
+    return _type_adapter(tp).validate_python(data)
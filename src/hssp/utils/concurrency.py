@@ -0,0 +1,77 @@
+import asyncio
+
+
+class ResizableSemaphore:
+    """
+    可以动态调整大小的信号量，缩小时不会影响已经获取到的请求，只是让新的请求等待
+    并发量为None时不限制，之后可以再调整为具体的数量
+    """
+
+    def __init__(self, value: int | None):
+        """
+        Args:
+            value: 并发量，None为不限制
+        """
+        self._value = value
+        self._in_use = 0
+        self._waiters: list[asyncio.Future] = []
+
+    @property
+    def value(self) -> int | None:
+        return self._value
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    def locked(self) -> bool:
+        return self._value is not None and self._in_use >= self._value
+
+    async def acquire(self) -> bool:
+        while self.locked():
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                # 已经被唤醒后又被取消，把空出的名额交给下一个等待者
+                if future.done() and not future.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+
+        self._in_use += 1
+        return True
+
+    def release(self):
+        self._in_use = max(self._in_use - 1, 0)
+        self._wake()
+
+    def resize(self, value: int | None):
+        """
+        调整并发量
+        Args:
+            value: 新的并发量，None为不限制
+
+        Returns:
+
+        """
+        self._value = value
+        self._wake()
+
+    def _wake(self):
+        # 按空闲的数量唤醒等待者，被唤醒的等待者会重新检查
+        free = len(self._waiters) if self._value is None else self._value - self._in_use
+        while free > 0 and self._waiters:
+            future = self._waiters.pop(0)
+            if not future.done():
+                future.set_result(None)
+                free -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
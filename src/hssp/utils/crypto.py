@@ -1,5 +1,11 @@
+import asyncio
+import functools
 import hashlib
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import Executor
+from functools import lru_cache
 from hashlib import md5, sha1, sha256
+from typing import BinaryIO
 
 from Cryptodome.Cipher import AES, ARC4
 from Cryptodome.Util.Padding import pad, unpad
@@ -47,6 +53,35 @@ def decrypt_aes_256_cbc(data: bytes, key: bytes, iv: bytes, style: str | None =
     return ciphertext
 
 
+def decrypt_aes_cbc_stream(
+    chunks: Iterable[bytes] | BinaryIO, key: bytes, iv: bytes, style: str | None = "pkcs7"
+) -> Iterator[bytes]:
+    """
+    aes_cbc流式解密，按块解密数据，不需要把密文全部读入内存，密钥长度决定是AES-128还是AES-256
+    Args:
+        chunks: 密文块或文件对象，长度可以任意
+        key: key
+        iv: iv
+        style: 填充算法。设置为None不填充
+
+    Returns:
+        返回明文块的迭代器
+    """
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    buffer = b""
+    for chunk in iter_chunks(chunks):
+        buffer += chunk
+        # 保留最后一个块，去除填充时需要
+        size = (len(buffer) - 1) // AES.block_size * AES.block_size
+        if size > 0:
+            yield cipher.decrypt(buffer[:size])
+            buffer = buffer[size:]
+
+    if buffer:
+        last = cipher.decrypt(buffer)
+        yield unpad(last, AES.block_size, style) if style else last
+
+
 def encrypt_aes_256_ecb(data: bytes, key: bytes, style: str | None = "pkcs7") -> bytes:
     """
     aes_256_ecb加密
@@ -193,6 +228,16 @@ def evp_bytes_to_key(
     if not isinstance(password, bytes):
         password = password.encode("utf-8")
 
+    return _evp_bytes_to_key(password, bytes(salt), key_size, iv_size, hash_algorithm, iterations)
+
+
+@lru_cache(maxsize=1024)
+def _evp_bytes_to_key(
+    password: bytes, salt: bytes, key_size: int, iv_size: int, hash_algorithm: str, iterations: int
+) -> tuple[bytes, bytes]:
+    """
+    evp_bytes_to_key 的实际计算，相同的密码和盐只计算一次
+    """
     final_length = key_size + iv_size
     key_iv = b""
     block = b""
@@ -214,3 +259,255 @@ def evp_bytes_to_key(
     key = key_iv[:key_size]
     iv = key_iv[key_size:final_length]
     return key, iv
+
+
+# 超过该字节数的数据，异步方法会放到线程池或进程池中处理
+OFFLOAD_THRESHOLD = 256 * 1024
+
+# 流式处理时每块的大小
+CHUNK_SIZE = 64 * 1024
+
+
+def _to_bytes(data: bytes | str) -> bytes:
+    return data if isinstance(data, bytes) else data.encode("utf-8")
+
+
+def iter_chunks(source: bytes | Iterable[bytes] | BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    把字节、字节迭代器或文件对象统一转为字节块的迭代器
+    Args:
+        source: 数据来源
+        chunk_size: 每块的大小，只对字节和文件对象有效
+
+    Returns:
+
+    """
+    if isinstance(source, bytes | bytearray | memoryview):
+        for i in range(0, len(source), chunk_size):
+            yield bytes(source[i : i + chunk_size])
+    elif hasattr(source, "read"):
+        while chunk := source.read(chunk_size):
+            yield chunk
+    else:
+        yield from source
+
+
+def hash_batch(items: Iterable[bytes | str], algorithm: str = "md5", result_type: str = "hex") -> list[str | bytes]:
+    """
+    批量hash，每条数据单独计算
+    Args:
+        items: 数据列表，字符串会使用utf8编码为字节
+        algorithm: hash算法，如 md5、sha1、sha256
+        result_type: 返回类型，默认为16进制字符串，bytes为字节
+
+    Returns:
+        返回hash结果列表
+    """
+    constructor = getattr(hashlib, algorithm, None) or functools.partial(hashlib.new, algorithm)
+    if result_type == "hex":
+        return [constructor(_to_bytes(item)).hexdigest() for item in items]
+    return [constructor(_to_bytes(item)).digest() for item in items]
+
+
+def hash_stream(
+    source: bytes | Iterable[bytes] | BinaryIO, algorithm: str = "md5", result_type: str = "hex"
+) -> str | bytes:
+    """
+    流式hash，适用于大文件
+    Args:
+        source: 字节、字节迭代器或文件对象
+        algorithm: hash算法，如 md5、sha1、sha256
+        result_type: 返回类型，默认为16进制字符串，bytes为字节
+
+    Returns:
+        返回hash结果
+    """
+    hasher = hashlib.new(algorithm)
+    if isinstance(source, bytes | bytearray | memoryview):
+        hasher.update(source)
+    else:
+        for chunk in iter_chunks(source):
+            hasher.update(chunk)
+    return hasher.hexdigest() if result_type == "hex" else hasher.digest()
+
+
+async def hash_async_stream(
+    chunks: AsyncIterable[bytes], algorithm: str = "md5", result_type: str = "hex"
+) -> str | bytes:
+    """
+    异步流式hash，比如边下载边计算
+    Args:
+        chunks: 字节块的异步迭代器
+        algorithm: hash算法，如 md5、sha1、sha256
+        result_type: 返回类型，默认为16进制字符串，bytes为字节
+
+    Returns:
+        返回hash结果
+    """
+    hasher = hashlib.new(algorithm)
+    async for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.hexdigest() if result_type == "hex" else hasher.digest()
+
+
+def encrypt_aes_cbc_batch(items: Iterable[bytes], key: bytes, iv: bytes, style: str | None = "pkcs7") -> list[bytes]:
+    """
+    aes_cbc批量加密，每条数据使用相同的key和iv单独加密
+    Args:
+        items: 数据列表
+        key: key
+        iv: iv
+        style: 填充算法。设置为None不填充
+
+    Returns:
+        返回密文列表
+    """
+    new_cipher = functools.partial(AES.new, key, AES.MODE_CBC, iv)
+    if style:
+        return [new_cipher().encrypt(pad(item, AES.block_size, style)) for item in items]
+    return [new_cipher().encrypt(item) for item in items]
+
+
+def decrypt_aes_cbc_batch(items: Iterable[bytes], key: bytes, iv: bytes, style: str | None = "pkcs7") -> list[bytes]:
+    """
+    aes_cbc批量解密，每条数据使用相同的key和iv单独解密
+    Args:
+        items: 密文列表
+        key: key
+        iv: iv
+        style: 填充算法。设置为None不填充
+
+    Returns:
+        返回明文列表
+    """
+    new_cipher = functools.partial(AES.new, key, AES.MODE_CBC, iv)
+    if style:
+        return [unpad(new_cipher().decrypt(item), AES.block_size, style) for item in items]
+    return [new_cipher().decrypt(item) for item in items]
+
+
+def encrypt_aes_cbc_stream(
+    chunks: Iterable[bytes] | BinaryIO, key: bytes, iv: bytes, style: str | None = "pkcs7"
+) -> Iterator[bytes]:
+    """
+    aes_cbc流式加密
+    Args:
+        chunks: 明文块或文件对象，长度可以任意
+        key: key
+        iv: iv
+        style: 填充算法。设置为None不填充，此时总长度必须是16的倍数
+
+    Returns:
+        返回密文块的迭代器
+    """
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    buffer = b""
+    for chunk in iter_chunks(chunks):
+        buffer += chunk
+        size = len(buffer) // AES.block_size * AES.block_size
+        if size > 0:
+            yield cipher.encrypt(buffer[:size])
+            buffer = buffer[size:]
+
+    if style:
+        yield cipher.encrypt(pad(buffer, AES.block_size, style))
+    elif buffer:
+        yield cipher.encrypt(buffer)
+
+
+async def decrypt_aes_cbc_async_stream(
+    chunks: AsyncIterable[bytes], key: bytes, iv: bytes, style: str | None = "pkcs7"
+) -> AsyncIterator[bytes]:
+    """
+    aes_cbc异步流式解密，比如边下载边解密
+    Args:
+        chunks: 密文块的异步迭代器
+        key: key
+        iv: iv
+        style: 填充算法。设置为None不填充
+
+    Returns:
+        返回明文块的异步迭代器
+    """
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        size = (len(buffer) - 1) // AES.block_size * AES.block_size
+        if size > 0:
+            yield cipher.decrypt(buffer[:size])
+            buffer = buffer[size:]
+
+    if buffer:
+        last = cipher.decrypt(buffer)
+        yield unpad(last, AES.block_size, style) if style else last
+
+
+def rc4_stream(chunks: Iterable[bytes] | BinaryIO, key: bytes) -> Iterator[bytes]:
+    """
+    RC4 流式加解密，RC4加密和解密是同一个运算
+    Args:
+        chunks: 数据块或文件对象
+        key: key
+
+    Returns:
+        返回结果块的迭代器
+    """
+    rc4 = ARC4.new(key)
+    for chunk in iter_chunks(chunks):
+        yield rc4.encrypt(chunk)
+
+
+async def offload(func: Callable, *args, executor: Executor | None = None, size: int | None = None, **kwargs):
+    """
+    把耗时的加解密放到线程池或进程池中执行，不阻塞事件循环
+    Args:
+        func: 执行的函数，使用进程池时需要是模块级的函数
+        *args: 位置参数
+        executor: 执行器，默认使用事件循环的线程池，可以传入ProcessPoolExecutor
+        size: 数据大小，小于 OFFLOAD_THRESHOLD 时直接执行，切换线程的开销比计算更大
+        **kwargs: 键值参数
+
+    Returns:
+        返回函数的结果
+    """
+    if size is not None and size < OFFLOAD_THRESHOLD:
+        return func(*args, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def encrypt_aes_256_cbc_async(
+    data: bytes, key: bytes, iv: bytes, style: str | None = "pkcs7", executor: Executor | None = None
+) -> bytes:
+    """
+    aes_256_cbc异步加密，大数据放到执行器中处理
+    """
+    return await offload(encrypt_aes_256_cbc, data, key, iv, style, executor=executor, size=len(data))
+
+
+async def decrypt_aes_256_cbc_async(
+    data: bytes, key: bytes, iv: bytes, style: str | None = "pkcs7", executor: Executor | None = None
+) -> bytes:
+    """
+    aes_256_cbc异步解密，大数据放到执行器中处理
+    """
+    return await offload(decrypt_aes_256_cbc, data, key, iv, style, executor=executor, size=len(data))
+
+
+async def rc4_decrypt_async(data: bytes, key: bytes, executor: Executor | None = None) -> bytes:
+    """
+    RC4 异步解密，大数据放到执行器中处理
+    """
+    return await offload(rc4_decrypt, data, key, executor=executor, size=len(data))
+
+
+async def hash_async(
+    data: bytes | str, algorithm: str = "md5", result_type: str = "hex", executor: Executor | None = None
+) -> str | bytes:
+    """
+    异步hash，大数据放到执行器中处理
+    """
+    data = _to_bytes(data)
+    return await offload(hash_stream, data, algorithm, result_type, executor=executor, size=len(data))
@@ -1,5 +1,22 @@
 import secrets
 import string
+from functools import cache, lru_cache
+
+from fake_useragent import FakeUserAgent
+
+# FakeUserAgent的UA类型对应的浏览器，random不限浏览器
+FAKE_USER_AGENT_BROWSERS: dict[str, tuple[str, ...] | None] = {
+    "random": None,
+    "chrome": ("Chrome", "Chrome Mobile", "Chrome Mobile iOS"),
+    "googlechrome": ("Chrome", "Chrome Mobile", "Chrome Mobile iOS"),
+    "edge": ("Edge", "Edge Mobile"),
+    "firefox": ("Firefox", "Firefox Mobile", "Firefox iOS"),
+    "ff": ("Firefox", "Firefox Mobile", "Firefox iOS"),
+    "safari": ("Safari", "Mobile Safari"),
+}
+
+# 可以通过FakeUserAgent获取的UA类型
+FAKE_USER_AGENT_ATTRS = frozenset(FAKE_USER_AGENT_BROWSERS)
 
 
 def rand_str(length: int, style: str | None = None) -> str:
@@ -23,3 +40,40 @@ def random_1():
 
     """
     return secrets.randbelow(10**6) / 10**6
+
+
+@lru_cache(maxsize=1)
+def get_fake_user_agent() -> FakeUserAgent:
+    """
+    FakeUserAgent创建时要加载UA数据，耗时较长，全局只创建一次
+    Returns:
+
+    """
+    return FakeUserAgent()
+
+
+@cache
+def _user_agent_pool(ua_type: str) -> tuple[str, ...]:
+    # FakeUserAgent每次获取都会重新过滤全部UA数据，这里每种类型只过滤一次
+    fake_user_agent = get_fake_user_agent()
+    filter_func = getattr(fake_user_agent, "_filter_useragents", None)
+    if filter_func is None:
+        return ()
+
+    browsers = FAKE_USER_AGENT_BROWSERS[ua_type]
+    return tuple(item["useragent"] for item in filter_func(list(browsers) if browsers else None))
+
+
+def rand_user_agent(ua_type: str = "random") -> str:
+    """
+    随机获取一个UA
+    Args:
+        ua_type: UA类型，可以是 random, chrome, googlechrome, edge, firefox, ff, safari
+
+    Returns:
+        返回UA
+    """
+    pool = _user_agent_pool(ua_type)
+    if pool:
+        return secrets.choice(pool)
+    return getattr(get_fake_user_agent(), ua_type)
@@ -0,0 +1,74 @@
+import json
+import timeit
+
+from pydantic import BaseModel
+
+from hssp.models.net import RequestModel
+from hssp.network.response import Response
+from hssp.utils.codec import JSON_CODECS
+
+
+class Item(BaseModel):
+    id: int
+    title: str
+    price: float
+    tags: list[str]
+    seller: dict[str, str]
+
+
+class Page(BaseModel):
+    total: int
+    items: list[Item]
+
+
+def make_payload(count: int = 20000) -> bytes:
+    items = [
+        {
+            "id": index,
+            "title": f"商品标题 {index}",
+            "price": index * 1.5,
+            "tags": ["新品", "包邮", "热卖"],
+            "seller": {"name": f"店铺{index % 100}", "city": "杭州"},
+        }
+        for index in range(count)
+    ]
+    return json.dumps({"total": count, "items": items}, ensure_ascii=False).encode()
+
+
+def bench(name: str, func, number: int = 10):
+    func()
+    cost = timeit.timeit(func, number=number) / number
+    print(f"{name:<32} {cost * 1000:8.2f} ms")
+
+
+def main():
+    payload = make_payload()
+    print(f"payload {len(payload) / 1024 / 1024:.1f}MB")
+
+    for name, codec_cls in JSON_CODECS.items():
+        try:
+            codec = codec_cls()
+        except ImportError:
+            print(f"{name:<32} 未安装")
+            continue
+        bench(f"{name} loads", lambda codec=codec: codec.loads(payload))
+        data = codec.loads(payload)
+        bench(f"{name} dumps", lambda codec=codec, data=data: codec.dumps(data))
+
+    response = Response(
+        url="https://api.example.com/items",
+        status_code=200,
+        headers={"Content-Type": "application/json"},
+        cookies={},
+        client_cookies={},
+        content=payload,
+        text=None,
+        json=None,
+        request_data=RequestModel(url="https://api.example.com/items", method="GET"),
+    )
+    bench("json.loads + model_validate", lambda: Page.model_validate(json.loads(payload)))
+    bench("Response.json_as(Page)", lambda: response.json_as(Page))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import asyncio
+import timeit
+
+from hssp import Net
+from hssp.settings.settings import settings
+
+
+def bench(name: str, func, number: int = 20000):
+    func()
+    cost = timeit.timeit(func, number=number) / number
+    print(f"{name:<24} {cost * 1e6:8.2f} us/req")
+
+
+async def main():
+    net = Net()
+    url = "https://api.example.com/items"
+
+    settings.user_agent = None
+    bench("create_request_model", lambda: net.create_request_model(url, "GET", params={"page": 1}))
+    bench("form_data", lambda: net.create_request_model(url, "POST", form_data={"a": 1, "b": "x"}))
+
+    settings.user_agent = "random"
+    bench("random user_agent", lambda: net.create_request_model(url, "GET", params={"page": 1}))
+
+    template = net.template(url)
+    bench("template.build", lambda: template.build(params={"page": 1}))
+
+    await net.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+import asyncio
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from Cryptodome.Cipher import AES
+from Cryptodome.Util.Padding import pad
+
+from hssp import Net
+from hssp.media.hls import HlsDownloader, parse_m3u8
+
+KEY = bytes(range(16))
+EXPLICIT_IV = bytes(range(16, 32))
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args): ...
+
+
+def _encrypt(data: bytes, iv: bytes) -> bytes:
+    return AES.new(KEY, AES.MODE_CBC, iv).encrypt(pad(data, 16))
+
+
+def _make_site(root: Path, segments: int = 6, media_sequence: int = 10) -> bytes:
+    """
+    生成加密的分片和播放列表，返回解密后应该得到的完整内容
+    前半部分使用序号作为IV，后半部分使用播放列表中指定的IV
+    """
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-TARGETDURATION:4",
+        f"#EXT-X-MEDIA-SEQUENCE:{media_sequence}",
+        '#EXT-X-KEY:METHOD=AES-128,URI="/keys/key.bin"',
+    ]
+    (root / "keys").mkdir()
+    (root / "keys" / "key.bin").write_bytes(KEY)
+    (root / "low").mkdir()
+    (root / "high").mkdir()
+
+    expected = b""
+    for index in range(segments):
+        # 分片大小不是16的整数倍，覆盖填充；比解密的块大，覆盖跨块
+        plain = os.urandom(100_000 + index * 7)
+        expected += plain
+        if index == segments // 2:
+            lines.append(f'#EXT-X-KEY:METHOD=AES-128,URI="../keys/key.bin",IV=0x{EXPLICIT_IV.hex()}')
+        iv = EXPLICIT_IV if index >= segments // 2 else (media_sequence + index).to_bytes(16, "big")
+        (root / "high" / f"seg{index}.ts").write_bytes(_encrypt(plain, iv))
+        lines += ["#EXTINF:4.0,", f"seg{index}.ts"]
+    lines.append("#EXT-X-ENDLIST")
+    (root / "high" / "index.m3u8").write_text("\n".join(lines))
+
+    # 低码率的播放列表不应该被选择
+    (root / "low" / "index.m3u8").write_text("#EXTM3U\n#EXTINF:4.0,\nmissing.ts\n#EXT-X-ENDLIST")
+    (root / "master.m3u8").write_text(
+        "#EXTM3U\n"
+        "#EXT-X-STREAM-INF:BANDWIDTH=200000,RESOLUTION=640x360\nlow/index.m3u8\n"
+        "#EXT-X-STREAM-INF:BANDWIDTH=1280000,RESOLUTION=1280x720\nhigh/index.m3u8\n"
+    )
+    return expected
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = tmp_path / "site"
+    root.mkdir()
+    expected = _make_site(root)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", expected, tmp_path
+    server.shutdown()
+
+
+def test_parse_m3u8():
+    playlist = parse_m3u8(
+        "#EXTM3U\n#EXT-X-MEDIA-SEQUENCE:5\n"
+        '#EXT-X-KEY:METHOD=AES-128,URI="k.bin",IV=0x000102030405060708090a0b0c0d0e0f\n'
+        "#EXTINF:2.5,\na.ts\n#EXT-X-KEY:METHOD=NONE\n#EXTINF:3,\nb.ts\n",
+        "http://h.test/v/index.m3u8",
+    )
+    first, second = playlist.segments
+    assert first.url == "http://h.test/v/a.ts"
+    assert first.sequence == 5 and first.duration == 2.5
+    assert first.key.uri == "http://h.test/v/k.bin" and first.key.iv == bytes(range(16))
+    assert second.key is None and second.sequence == 6
+
+
+def test_download_encrypted(site):
+    base, expected, tmp_path = site
+
+    async def main():
+        net = Net()
+        downloader = HlsDownloader(net, concurrency=4, chunk_size=4096)
+        fetch_key = downloader._fetch_key
+        key_requests = []
+
+        async def _counting_fetch_key(uri):
+            key_requests.append(uri)
+            return await fetch_key(uri)
+
+        downloader._fetch_key = _counting_fetch_key
+        try:
+            output = await downloader.download(f"{base}/master.m3u8", tmp_path / "out.ts")
+        finally:
+            await net.close()
+        return output, key_requests
+
+    output, key_requests = asyncio.run(main())
+    assert output.read_bytes() == expected
+    # 两个相对地址指向同一个密钥，只请求一次
+    assert key_requests == [f"{base}/keys/key.bin"]
+    assert not (tmp_path / "out.ts.parts").exists()
+
+
+def test_resume_skips_downloaded_parts(site):
+    base, expected, tmp_path = site
+    parts_dir = tmp_path / "out.ts.parts"
+    parts_dir.mkdir()
+
+    async def main():
+        net = Net()
+        downloader = HlsDownloader(net)
+        try:
+            playlist = await downloader.fetch_playlist(f"{base}/master.m3u8")
+            # 先下载第一个分片，模拟中断后再继续
+            await downloader.download_segment(playlist.segments[0], parts_dir / "000001.part")
+            (tmp_path / "site" / "high" / "seg0.ts").unlink()
+            return await downloader.download(f"{base}/master.m3u8", tmp_path / "out.ts", keep_parts=True)
+        finally:
+            await net.close()
+
+    output = asyncio.run(main())
+    assert output.read_bytes() == expected
+    assert len(list(parts_dir.glob("*.part"))) == 6
+
+
+def test_key_refetched_after_cancel():
+    async def main():
+        downloader = HlsDownloader(None)
+        calls = []
+        block = True
+
+        async def _fetch_key(uri):
+            calls.append(uri)
+            while block:
+                await asyncio.sleep(0.01)
+            return KEY
+
+        downloader._fetch_key = _fetch_key
+        first = asyncio.ensure_future(downloader.get_key("k"))
+        await asyncio.sleep(0.05)
+        downloader._keys["k"].cancel()
+        block = False
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        # 被取消的密钥请求不会被当作结果，重新请求
+        assert await downloader.get_key("k") == KEY
+        assert len(calls) == 2
+
+    asyncio.run(main())
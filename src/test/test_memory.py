@@ -0,0 +1,79 @@
+import asyncio
+import gc
+import statistics
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hssp import Net
+from hssp.models.net import DownloaderEnum
+
+BODY = ("<html><body>" + "<p>内存测试</p>" * 500 + "</body></html>").encode()
+
+# 每轮的请求数和并发量，并发量低于各客户端连接池的上限，避免连接池等待超时
+ROUNDS = 8
+PER_ROUND = 50
+CONCURRENCY = 10
+WARMUP_ROUNDS = 3
+
+# 预热后每轮最多增长的字节数，泄漏一个响应就会远远超过
+MAX_SLOPE = 32 * 1024
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args): ...
+
+
+@pytest.fixture(scope="module")
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.request_queue_size = 128
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+async def _crawl(downloader: DownloaderEnum, url: str) -> list[int]:
+    """
+    按轮请求并解析，每轮结束后记录存活的内存
+    """
+    net = Net(downloader, asyncio.Semaphore(CONCURRENCY))
+    currents = []
+    tracemalloc.start()
+    try:
+        for index in range(ROUNDS):
+            responses = await asyncio.gather(
+                *[net.get(url, params={"page": page}) for page in range(index * PER_ROUND, (index + 1) * PER_ROUND)]
+            )
+            for response in responses:
+                assert response.selector.xpath("//p/text()").getall()
+            del responses
+            await asyncio.sleep(0)
+            gc.collect()
+            currents.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+        await net.close()
+    return currents
+
+
+@pytest.mark.parametrize("downloader", [DownloaderEnum.AIOHTTP, DownloaderEnum.HTTPX, DownloaderEnum.CURL_CFFI])
+def test_memory_flat(downloader, url):
+    currents = asyncio.run(_crawl(downloader, url))
+
+    # 预热之后按线性回归的斜率判断，单轮的波动不影响结果
+    currents = currents[WARMUP_ROUNDS:]
+    slope = statistics.linear_regression(range(len(currents)), currents).slope
+    assert slope < MAX_SLOPE, f"{downloader.value} 内存每轮增长 {slope / 1024:.1f}KB: {currents}"
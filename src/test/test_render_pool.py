@@ -0,0 +1,213 @@
+import asyncio
+import time
+
+import pytest
+
+from hssp.exception.exception import RequestStateException
+from hssp.models.net import RequestModel
+from hssp.network.downloader.base import RenderDownloader
+from hssp.network.response import Response
+
+
+class FakeBrowser:
+    def __init__(self, index: int):
+        self.index = index
+        self.tabs = 0
+        self.quit = False
+
+
+class FakeTab:
+    def __init__(self, browser: FakeBrowser):
+        self.browser = browser
+        self.closed = False
+
+
+class FakeRenderDownloader(RenderDownloader):
+    """
+    不启动浏览器的渲染下载器，记录浏览器和标签页的创建、关闭
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(None, **kwargs)
+        self.browsers: list[FakeBrowser] = []
+        self.rendering = 0
+        self.max_rendering = 0
+        self.fail_new_tab = False
+        self.new_tab_delay = 0
+        self.closed_tabs: list[FakeTab] = []
+
+    def create_browser(self, proxy: str | None = None):
+        browser = FakeBrowser(len(self.browsers))
+        self.browsers.append(browser)
+        return browser
+
+    def new_tab(self, browser: FakeBrowser):
+        time.sleep(self.new_tab_delay)
+        if self.fail_new_tab:
+            raise RuntimeError("打开标签页失败")
+        browser.tabs += 1
+        return FakeTab(browser)
+
+    def close_tab(self, tab: FakeTab):
+        tab.closed = True
+        self.closed_tabs.append(tab)
+
+    def quit_browser(self, browser: FakeBrowser):
+        browser.quit = True
+
+    def render(self, tab: FakeTab, request: RequestModel) -> Response:
+        self.rendering += 1
+        self.max_rendering = max(self.max_rendering, self.rendering)
+        try:
+            time.sleep(0.02)
+            if "crash" in request.url:
+                raise RuntimeError("浏览器崩溃")
+            status_code = 404 if "missing" in request.url else 200
+            html = f"<html><body>{tab.browser.index}</body></html>"
+            return Response(
+                url=request.url,
+                status_code=status_code,
+                headers={"Content-Type": "text/html; charset=utf-8"},
+                cookies={},
+                client_cookies={},
+                content=html.encode(),
+                text=html,
+                json=None,
+                request_data=request,
+            )
+        finally:
+            self.rendering -= 1
+
+
+def _request(url: str = "http://fake.test/") -> RequestModel:
+    return RequestModel(url=url)
+
+
+async def _wait_closed():
+    # 关闭标签页和浏览器在线程中执行
+    await asyncio.sleep(0.05)
+
+
+def test_checkout_and_put_back():
+    async def main():
+        downloader = FakeRenderDownloader(pool_size=2, tabs_per_browser=2, max_pages=100)
+        await asyncio.gather(*[downloader.download(_request()) for _ in range(20)])
+
+        # 最多2个浏览器，每个最多2个标签页
+        assert len(downloader.browsers) == 2
+        assert downloader.max_rendering <= 4
+        assert all(browser.tabs <= 2 for browser in downloader.browsers)
+        # 归还的标签页空闲等待复用
+        assert len(downloader._idle) == sum(browser.tabs for browser in downloader.browsers)
+
+        await downloader.close()
+        assert all(browser.quit for browser in downloader.browsers)
+
+    asyncio.run(main())
+
+
+def test_recycle_after_max_pages():
+    async def main():
+        downloader = FakeRenderDownloader(pool_size=1, tabs_per_browser=1, max_pages=3)
+        indexes = []
+        for _ in range(7):
+            response = await downloader.download(_request())
+            indexes.append(response.text)
+        await _wait_closed()
+
+        assert indexes == [f"<html><body>{index}</body></html>" for index in (0, 0, 0, 1, 1, 1, 2)]
+        assert [browser.quit for browser in downloader.browsers] == [True, True, False]
+        await downloader.close()
+
+    asyncio.run(main())
+
+
+def test_driver_failure():
+    async def main():
+        downloader = FakeRenderDownloader(pool_size=1, tabs_per_browser=2, max_pages=100)
+        await downloader.download(_request())
+
+        # 渲染出错的浏览器不再使用，关闭后启动新的
+        with pytest.raises(RuntimeError):
+            await downloader.download(_request("http://fake.test/crash"))
+        await _wait_closed()
+        assert downloader.browsers[0].quit
+
+        response = await downloader.download(_request())
+        assert response.text == "<html><body>1</body></html>"
+
+        # 状态码不对时抛出异常，但浏览器仍然可以使用
+        with pytest.raises(RequestStateException):
+            await downloader.download(_request("http://fake.test/missing"))
+        assert not downloader.browsers[1].quit
+        assert len(downloader.browsers) == 2
+
+        # 打开标签页失败时回收浏览器，不会一直占用名额
+        await downloader.close()
+        downloader.fail_new_tab = True
+        with pytest.raises(RuntimeError):
+            await downloader.download(_request())
+        assert downloader._slots == []
+        downloader.fail_new_tab = False
+        response = await downloader.download(_request())
+        assert response.status_code == 200
+        await downloader.close()
+
+    asyncio.run(main())
+
+
+def test_cancel_returns_slot():
+    async def main():
+        downloader = FakeRenderDownloader(pool_size=1, tabs_per_browser=1, max_pages=100)
+        task = asyncio.create_task(downloader.download(_request()))
+        await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # 被取消的请求释放了名额，后面的请求不会一直等待
+        response = await asyncio.wait_for(downloader.download(_request()), 1)
+        assert response.status_code == 200
+        await downloader.close()
+
+    asyncio.run(main())
+
+
+def test_idle_tab_of_retired_browser():
+    async def main():
+        downloader = FakeRenderDownloader(pool_size=1, tabs_per_browser=2, max_pages=2)
+        await asyncio.gather(*[downloader.download(_request()) for _ in range(2)])
+
+        # 两个标签页同时渲染，第二个归还时浏览器达到最大页面数，空闲的第一个标签页不能再借出
+        assert downloader._slots[0].retiring and len(downloader._idle) == 1
+        response = await downloader.download(_request())
+        await _wait_closed()
+        assert response.text == "<html><body>1</body></html>"
+        assert downloader.browsers[0].quit
+        await downloader.close()
+
+    asyncio.run(main())
+
+
+def test_cancel_while_opening_tab():
+    async def main():
+        downloader = FakeRenderDownloader(pool_size=1, tabs_per_browser=1, max_pages=100)
+        downloader.new_tab_delay = 0.05
+        task = asyncio.create_task(downloader.download(_request()))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # 打开标签页时被取消，名额归还，打开的标签页随后关闭
+        assert downloader._slots[0].tabs == 0
+        await asyncio.sleep(0.1)
+        assert len(downloader.closed_tabs) == 1
+
+        downloader.new_tab_delay = 0
+        response = await asyncio.wait_for(downloader.download(_request()), 1)
+        assert response.status_code == 200
+        assert downloader.browsers[0].tabs == 2
+        await downloader.close()
+
+    asyncio.run(main())
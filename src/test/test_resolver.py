@@ -0,0 +1,141 @@
+import asyncio
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpcore
+import pytest
+from httpx import AsyncClient
+
+from hssp.network.downloader.httpx import ResolverNetworkBackend, create_transport
+from hssp.network.resolver import DnsResolver
+
+
+class StubResolver:
+    """
+    本地的桩解析函数，记录查询次数
+    """
+
+    def __init__(self, records: dict[str, list[tuple[int, str]]], ttl: float | None = None):
+        self.records = records
+        self.ttl = ttl
+        self.calls: dict[str, int] = {}
+
+    async def __call__(self, host: str, family: int):
+        self.calls[host] = self.calls.get(host, 0) + 1
+        await asyncio.sleep(0.01)
+        if host not in self.records:
+            raise socket.gaierror(socket.EAI_NONAME, f"{host} 不存在")
+        return self.records[host], self.ttl
+
+
+class FakeBackend(httpcore.AsyncNetworkBackend):
+    """
+    假的网络后端，指定的地址连接失败
+    """
+
+    def __init__(self, failed: set[str]):
+        self.failed = failed
+        self.connected: list[str] = []
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        self.connected.append(host)
+        if host in self.failed:
+            raise httpcore.ConnectError(f"{host} 无法连接")
+        return host
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None): ...
+
+    async def sleep(self, seconds): ...
+
+
+def test_cache_and_merge():
+    stub = StubResolver({"a.test": [(socket.AF_INET, "10.0.0.1")]})
+    resolver = DnsResolver(stub, ttl=60, negative_ttl=60)
+
+    async def main():
+        # 并发解析同一主机只查询一次
+        results = await asyncio.gather(*[resolver.resolve("a.test") for _ in range(10)])
+        assert all(result == [(socket.AF_INET, "10.0.0.1")] for result in results)
+        await resolver.resolve("A.test")
+        assert stub.calls["a.test"] == 1
+
+        # 解析失败也会缓存
+        for _ in range(3):
+            with pytest.raises(socket.gaierror):
+                await resolver.resolve("missing.test")
+        assert stub.calls["missing.test"] == 1
+
+    asyncio.run(main())
+
+
+def test_ttl():
+    stub = StubResolver({"a.test": [(socket.AF_INET, "10.0.0.1")]}, ttl=0.05)
+    resolver = DnsResolver(stub, ttl=60)
+
+    async def main():
+        await resolver.resolve("a.test")
+        await resolver.resolve("a.test")
+        assert stub.calls["a.test"] == 1
+        # 使用解析函数返回的ttl，而不是默认的ttl
+        time.sleep(0.1)
+        await resolver.resolve("a.test")
+        assert stub.calls["a.test"] == 2
+
+    asyncio.run(main())
+
+
+def test_fallback_to_next_address():
+    stub = StubResolver({"a.test": [(socket.AF_INET6, "2001:db8::1"), (socket.AF_INET, "10.0.0.1")]})
+    fake = FakeBackend({"2001:db8::1"})
+    backend = ResolverNetworkBackend(fake, DnsResolver(stub))
+
+    async def main():
+        assert await backend.connect_tcp("a.test", 80) == "10.0.0.1"
+        assert fake.connected == ["2001:db8::1", "10.0.0.1"]
+
+        # 所有地址都失败时抛出最后一个异常
+        fake.failed.add("10.0.0.1")
+        with pytest.raises(httpcore.ConnectError):
+            await backend.connect_tcp("a.test", 80)
+
+        # 解析失败转为httpcore的连接异常
+        with pytest.raises(httpcore.ConnectError):
+            await backend.connect_tcp("missing.test", 80)
+
+    asyncio.run(main())
+
+
+def test_httpx_transport_fallback():
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args): ...
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # 第一个地址没有监听，连接被拒绝后换下一个地址
+    stub = StubResolver({"local.test": [(socket.AF_INET, "127.0.0.2"), (socket.AF_INET, "127.0.0.1")]})
+    transport = create_transport()
+    # noinspection PyProtectedMember
+    pool = transport._pool
+    network_backend = pool._network_backend
+    pool._network_backend = ResolverNetworkBackend(
+        getattr(network_backend, "backend", network_backend), DnsResolver(stub)
+    )
+
+    async def main():
+        async with AsyncClient(transport=transport) as client:
+            response = await client.get(f"http://local.test:{server.server_port}/")
+            assert response.text == "ok"
+
+    try:
+        asyncio.run(main())
+    finally:
+        server.shutdown()